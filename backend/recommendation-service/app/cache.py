@@ -0,0 +1,136 @@
+"""
+In-process recommendation cache
+
+LRU + TTL cache in front of HybridRecommender. Keys embed the model
+version, so reloading the model through /api/recommendations/refresh makes
+every old entry unreachable. An optional CacheBackend acts as a second,
+shared tier behind the in-memory LRU.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from app.data.cache_store import CacheBackend
+
+
+def cache_key(kind: str, model_version: str, *params: Any) -> str:
+    """Build a cache key such as 'user:20240101-ab12cd34:42:10'"""
+    return ':'.join([kind, str(model_version)] + [str(p) for p in params])
+
+
+class RecommendationCache:
+    """
+    Bounded LRU cache with per-entry TTL and hit/miss counters
+
+    Thread-safe; values are stored as-is (lists of recommendation dicts)
+    and must not be mutated by callers.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: float = 300.0,
+        backend: Optional[CacheBackend] = None,
+        backend_ttl_seconds: Optional[float] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.backend_ttl_seconds = backend_ttl_seconds
+
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.backend_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Look up both tiers (blocking when a backend is configured)"""
+        value = self.get_memory(key)
+        if value is None:
+            value = self.get_backend(key)
+        return value
+
+    def get_memory(self, key: str) -> Optional[Any]:
+        """Look up the in-memory tier only; never blocks, so safe on the event loop"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+        return None
+
+    def get_backend(self, key: str) -> Optional[Any]:
+        """Look up the backend tier after a memory miss, counting the miss (blocking)"""
+        if self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                with self._lock:
+                    self.backend_hits += 1
+                self.set_memory(key, value)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any):
+        """Store in both tiers (blocking when a backend is configured)"""
+        self.set_memory(key, value)
+        self.set_backend(key, value)
+
+    def set_memory(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_backend(self, key: str, value: Any):
+        if self.backend is not None:
+            self.backend.set(key, value, ttl=self.backend_ttl_seconds)
+
+    def purge_backend(self) -> int:
+        """Drop expired (and over-capacity) backend rows, returns the number removed (blocking)"""
+        if self.backend is None:
+            return 0
+        return self.backend.purge_expired()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        """Drop in-memory entries (the backend tier expires by key/TTL)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.backend_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'backend_hits': self.backend_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_ratio': (self.hits + self.backend_hits) / lookups if lookups else 0.0,
+                'backend': type(self.backend).__name__ if self.backend is not None else None,
+            }
@@ -6,15 +6,17 @@ Dataset Source: Amazon Product Reviews (publicly available)
 We use the "Electronics" and "Sports and Outdoors" categories to match your e-commerce store
 """
 import os
-import gzip
-import json
-import requests
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, Optional, Sequence, Tuple
 from loguru import logger
-from tqdm import tqdm
+
+from .synthetic import SyntheticDataGenerator
+from .downloader import ResumableDownloader
+from .jsonl_stream import REVIEW_COLUMNS, METADATA_COLUMNS, ColumnSpec, read_jsonl
+from .processed_cache import ProcessedDataCache
+from ..models.id_index import IdIndex
 
 # Amazon Review Dataset URLs (Small versions for faster training)
 # These are publicly available datasets
@@ -32,60 +34,41 @@ AMAZON_DATASETS = {
 # Alternative: Use sample data if download fails
 SAMPLE_DATASET_SIZE = 10000
 
+# Synthetic dataset used when Amazon data is unavailable
+SYNTHETIC_DEFAULTS = {'n_users': 1000, 'n_products': 200, 'n_interactions': 10000, 'seed': 42}
+
 
 class AmazonDatasetLoader:
     """
     Loads and processes Amazon product review data for recommendation model training.
     """
     
-    def __init__(self, data_dir: str = "data/amazon"):
+    def __init__(self, data_dir: str = "data/amazon", downloader: Optional[ResumableDownloader] = None):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.downloader = downloader or ResumableDownloader()
+        self.cache = ProcessedDataCache(self.data_dir / "processed")
         
     def download_file(self, url: str, filename: str) -> Path:
-        """Download a file with progress bar"""
-        filepath = self.data_dir / filename
-        
-        if filepath.exists():
-            logger.info(f"File already exists: {filepath}")
-            return filepath
-        
-        logger.info(f"Downloading {url}...")
-        
-        try:
-            response = requests.get(url, stream=True, timeout=60)
-            response.raise_for_status()
-            
-            total_size = int(response.headers.get('content-length', 0))
-            
-            with open(filepath, 'wb') as f:
-                with tqdm(total=total_size, unit='B', unit_scale=True, desc=filename) as pbar:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                        pbar.update(len(chunk))
-            
-            logger.info(f"Downloaded: {filepath}")
-            return filepath
-            
-        except Exception as e:
-            logger.error(f"Failed to download {url}: {e}")
-            raise
+        """Download a file (resumable, parallel ranges, verified against the manifest)"""
+        return self.downloader.download(url, self.data_dir / filename)
     
-    def load_json_gz(self, filepath: Path, max_lines: Optional[int] = None) -> pd.DataFrame:
-        """Load gzipped JSON lines file"""
+    def load_json_gz(
+        self,
+        filepath: Path,
+        columns: Sequence[ColumnSpec],
+        max_lines: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Load the projected, typed columns of a gzipped JSON lines file
+        
+        Parsing is streamed through worker processes (see jsonl_stream);
+        only the requested fields are ever materialized.
+        """
+        filepath = Path(filepath)
         logger.info(f"Loading {filepath}...")
         
-        data = []
-        with gzip.open(filepath, 'rt', encoding='utf-8') as f:
-            for i, line in enumerate(tqdm(f, desc="Loading")):
-                if max_lines and i >= max_lines:
-                    break
-                try:
-                    data.append(json.loads(line.strip()))
-                except json.JSONDecodeError:
-                    continue
-        
-        df = pd.DataFrame(data)
+        df = read_jsonl(filepath, columns, max_lines=max_lines).to_pandas()
         logger.info(f"Loaded {len(df)} records from {filepath.name}")
         return df
     
@@ -110,7 +93,7 @@ class AmazonDatasetLoader:
             dataset["reviews"], 
             f"{category}_reviews.json.gz"
         )
-        reviews_df = self.load_json_gz(reviews_file, max_lines=max_reviews)
+        reviews_df = self.load_json_gz(reviews_file, REVIEW_COLUMNS, max_lines=max_reviews)
         
         # Try to download metadata (optional, might be large)
         try:
@@ -118,7 +101,7 @@ class AmazonDatasetLoader:
                 dataset["metadata"],
                 f"{category}_meta.json.gz"
             )
-            products_df = self.load_json_gz(meta_file, max_lines=max_reviews)
+            products_df = self.load_json_gz(meta_file, METADATA_COLUMNS, max_lines=max_reviews)
         except Exception as e:
             logger.warning(f"Could not load metadata: {e}. Using reviews only.")
             products_df = pd.DataFrame()
@@ -127,9 +110,10 @@ class AmazonDatasetLoader:
     
     def process_reviews(self, reviews_df: pd.DataFrame) -> pd.DataFrame:
         """
-        Process raw reviews into interaction format
+        Process reviews into interaction format
         
-        Columns needed: user_id, product_id, rating, timestamp
+        Accepts the projected columns from load_json_gz (already named
+        user_id, product_id, rating, timestamp) or raw review fields.
         """
         logger.info("Processing reviews...")
         
@@ -200,37 +184,26 @@ class AmazonDatasetLoader:
         
         # Extract main category
         if 'categories' in df.columns:
+            # Category paths are flattened to a list of strings by the loader
             df['main_category'] = df['categories'].apply(
-                lambda x: x[0][0] if isinstance(x, list) and len(x) > 0 and len(x[0]) > 0 else 'Unknown'
+                lambda x: x[0] if x is not None and len(x) > 0 else 'Unknown'
             )
         
         return df
     
-    def create_interaction_matrix(self, interactions_df: pd.DataFrame) -> Tuple[np.ndarray, dict, dict]:
+    def create_interaction_matrix(self, interactions_df: pd.DataFrame) -> Tuple[np.ndarray, dict]:
         """
         Create user-item interaction matrix for training
         
         Returns:
             - interaction_matrix: Sparse matrix of user-item interactions
-            - user_id_map: Dict mapping original user_id to matrix index
-            - product_id_map: Dict mapping original product_id to matrix index
+            - mappings: IdIndex per axis (user_id_map, product_id_map) and the
+              code -> id arrays (idx_to_user, idx_to_product)
         """
         from scipy.sparse import csr_matrix
         
-        # Create mappings
-        unique_users = interactions_df['user_id'].unique()
-        unique_products = interactions_df['product_id'].unique()
-        
-        user_id_map = {uid: idx for idx, uid in enumerate(unique_users)}
-        product_id_map = {pid: idx for idx, pid in enumerate(unique_products)}
-        
-        # Reverse mappings for inference
-        idx_to_user = {idx: uid for uid, idx in user_id_map.items()}
-        idx_to_product = {idx: pid for pid, idx in product_id_map.items()}
-        
-        # Create matrix indices
-        rows = interactions_df['user_id'].map(user_id_map).values
-        cols = interactions_df['product_id'].map(product_id_map).values
+        rows, user_index = IdIndex.factorize(interactions_df['user_id'])
+        cols, product_index = IdIndex.factorize(interactions_df['product_id'])
         
         # Use ratings as values (or 1 for implicit feedback)
         if 'rating' in interactions_df.columns:
@@ -241,120 +214,111 @@ class AmazonDatasetLoader:
         # Create sparse matrix
         matrix = csr_matrix(
             (values, (rows, cols)),
-            shape=(len(unique_users), len(unique_products))
+            shape=(len(user_index), len(product_index))
         )
         
         mappings = {
-            'user_id_map': user_id_map,
-            'product_id_map': product_id_map,
-            'idx_to_user': idx_to_user,
-            'idx_to_product': idx_to_product
+            'user_id_map': user_index,
+            'product_id_map': product_index,
+            'idx_to_user': user_index.ids,
+            'idx_to_product': product_index.ids
         }
         
         logger.info(f"Created interaction matrix: {matrix.shape[0]} users x {matrix.shape[1]} products")
         
         return matrix, mappings
     
-    def generate_synthetic_data(self, n_users: int = 1000, n_products: int = 200, n_interactions: int = 10000) -> pd.DataFrame:
+    def generate_synthetic_data(
+        self,
+        n_users: int = 1000,
+        n_products: int = 200,
+        n_interactions: int = 10000,
+        seed: int = 42
+    ) -> pd.DataFrame:
         """
         Generate synthetic data if Amazon download fails
-        Useful for testing and development
+        Useful for testing and development (see SyntheticDataGenerator for
+        benchmark-scale datasets streamed to Parquet)
         """
         logger.info(f"Generating synthetic dataset: {n_users} users, {n_products} products, {n_interactions} interactions")
         
-        np.random.seed(42)
-        
-        # Generate user preferences (latent factors)
-        user_factors = np.random.randn(n_users, 10)
-        product_factors = np.random.randn(n_products, 10)
+        generator = SyntheticDataGenerator(n_users=n_users, n_products=n_products, seed=seed)
+        df = generator.generate(n_interactions)
         
-        # Generate interactions based on latent factor similarity
-        interactions = []
-        for _ in range(n_interactions):
-            user_id = np.random.randint(0, n_users)
-            
-            # Sample product with probability based on similarity
-            similarities = user_factors[user_id] @ product_factors.T
-            probs = np.exp(similarities) / np.exp(similarities).sum()
-            product_id = np.random.choice(n_products, p=probs)
-            
-            # Generate rating based on similarity
-            base_rating = 3 + similarities[product_id]
-            rating = np.clip(base_rating + np.random.randn() * 0.5, 1, 5)
-            
-            interactions.append({
-                'user_id': f'user_{user_id}',
-                'product_id': f'product_{product_id}',
-                'rating': round(rating, 1),
-                'timestamp': pd.Timestamp.now() - pd.Timedelta(days=np.random.randint(0, 365))
-            })
-        
-        df = pd.DataFrame(interactions)
         logger.info(f"Generated {len(df)} synthetic interactions")
         
         return df
     
-    def load_or_generate_data(self, use_amazon: bool = True, category: str = "electronics") -> Tuple[pd.DataFrame, dict]:
+    def _remove_legacy_cache(self):
+        """Drop the unkeyed cache files written by earlier versions"""
+        for name in ("processed_interactions.parquet", "mappings.json"):
+            path = self.data_dir / name
+            if path.exists():
+                logger.info(f"Removing legacy processed data cache {path}")
+                path.unlink()
+    
+    def load_or_generate_data(
+        self,
+        use_amazon: bool = True,
+        category: str = "electronics",
+        max_reviews: int = 50000,
+        columns: Optional[List[str]] = None
+    ) -> Tuple[pd.DataFrame, dict]:
         """
         Main method to load data for training
         
+        Processed data is cached under data_dir/processed, keyed by a
+        fingerprint of the source file and of these parameters, so changing
+        the category or the review limit never reuses another dataset.
+        
         Args:
             use_amazon: If True, try to download Amazon data. If False or download fails, use synthetic data.
             category: Amazon category to use
+            max_reviews: Maximum number of reviews to load
+            columns: Columns to return (default: all); only these are read from the cache
             
         Returns:
-            Tuple of (interactions_df, mappings_dict)
+            Tuple of (interactions_df, mappings_dict); user_id / product_id are categoricals
         """
-        cache_file = self.data_dir / "processed_interactions.parquet"
-        mappings_file = self.data_dir / "mappings.json"
+        self._remove_legacy_cache()
         
-        # Check for cached data
-        if cache_file.exists():
-            logger.info("Loading cached processed data...")
-            interactions_df = pd.read_parquet(cache_file)
-            
-            if mappings_file.exists():
-                import json
-                with open(mappings_file, 'r') as f:
-                    mappings = json.load(f)
-            else:
-                _, mappings = self.create_interaction_matrix(interactions_df)
-            
-            return interactions_df, mappings
+        key = params = interactions_df = None
         
         # Try Amazon data
         if use_amazon:
             try:
-                reviews_df, products_df = self.download_amazon_data(category, max_reviews=50000)
-                interactions_df = self.process_reviews(reviews_df)
+                if category not in AMAZON_DATASETS:
+                    raise ValueError(f"Unknown category: {category}. Choose from {list(AMAZON_DATASETS.keys())}")
+                reviews_file = self.download_file(
+                    AMAZON_DATASETS[category]["reviews"],
+                    f"{category}_reviews.json.gz"
+                )
+                params = {'source': 'amazon', 'category': category, 'max_reviews': max_reviews}
+                key = self.cache.fingerprint(params, [reviews_file])
                 
-                if len(interactions_df) < 100:
-                    raise ValueError("Not enough data after processing")
+                if key not in self.cache:
+                    reviews_df = self.load_json_gz(reviews_file, REVIEW_COLUMNS, max_lines=max_reviews)
+                    interactions_df = self.process_reviews(reviews_df)
+                    
+                    if len(interactions_df) < 100:
+                        raise ValueError("Not enough data after processing")
                     
             except Exception as e:
                 logger.warning(f"Amazon data loading failed: {e}. Using synthetic data.")
-                interactions_df = self.generate_synthetic_data()
-        else:
-            interactions_df = self.generate_synthetic_data()
+                key = None
         
-        # Create mappings
-        _, mappings = self.create_interaction_matrix(interactions_df)
+        if key is None:
+            params = {'source': 'synthetic', **SYNTHETIC_DEFAULTS}
+            key = self.cache.fingerprint(params)
+            if key not in self.cache:
+                interactions_df = self.generate_synthetic_data(**SYNTHETIC_DEFAULTS)
         
-        # Cache processed data
-        interactions_df.to_parquet(cache_file)
-        
-        import json
-        # Convert mappings to JSON-serializable format
-        json_mappings = {
-            'user_id_map': mappings['user_id_map'],
-            'product_id_map': mappings['product_id_map'],
-        }
-        with open(mappings_file, 'w') as f:
-            json.dump(json_mappings, f)
-        
-        logger.info(f"Data cached to {cache_file}")
+        if interactions_df is not None:
+            self.cache.save(key, interactions_df, params)
+        else:
+            logger.info(f"Loading cached processed data ({key})...")
         
-        return interactions_df, mappings
+        return self.cache.load(key, columns=columns)
 
 
 # Test the loader
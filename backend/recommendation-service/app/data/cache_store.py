@@ -0,0 +1,170 @@
+"""
+Backing stores for the second recommendation cache tier
+
+Values are JSON-serialized so entries survive process restarts (SQLite)
+and can be shared by workers on the same host.
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from loguru import logger
+
+
+def _json_default(value):
+    # NumPy scalars (e.g. product ids from pandas indexes)
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class CacheBackend:
+    """Key/value store with per-entry expiry"""
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def purge_expired(self) -> int:
+        """Delete expired entries, returns the number removed"""
+        return 0
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Process-local backend (useful for tests and single-worker deployments)"""
+
+    def __init__(self, default_ttl: Optional[float] = None):
+        self.default_ttl = default_ttl
+        self._data: Dict[str, Tuple[Optional[float], str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return None
+        return json.loads(payload)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = ttl if ttl is not None else self.default_ttl
+        expires_at = time.time() + ttl if ttl else None
+        payload = json.dumps(value, default=_json_default)
+        with self._lock:
+            self._data[key] = (expires_at, payload)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (expires_at, _) in self._data.items() if expires_at is not None and expires_at < now]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Persistent backend in a local SQLite file shared by all workers
+
+    Every call blocks on disk I/O and a process-wide lock: call it from a
+    worker thread, not the event loop. purge_expired() also trims the table
+    to max_rows, oldest writes first, so keys of retired model versions do
+    not accumulate.
+    """
+
+    def __init__(self, path: str, default_ttl: Optional[float] = None, max_rows: Optional[int] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.default_ttl = default_ttl
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS recommendation_cache (
+                cache_key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                expires_at REAL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at FROM recommendation_cache WHERE cache_key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload, expires_at = row
+            if expires_at is not None and expires_at < time.time():
+                self._conn.execute("DELETE FROM recommendation_cache WHERE cache_key = ?", (key,))
+                self._conn.commit()
+                return None
+        return json.loads(payload)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = ttl if ttl is not None else self.default_ttl
+        expires_at = time.time() + ttl if ttl else None
+        payload = json.dumps(value, default=_json_default)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO recommendation_cache (cache_key, payload, expires_at) VALUES (?, ?, ?)",
+                (key, payload, expires_at)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM recommendation_cache")
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete expired rows and rows beyond max_rows, returns the number removed"""
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM recommendation_cache WHERE expires_at IS NOT NULL AND expires_at < ?",
+                (time.time(),)
+            ).rowcount
+            if self.max_rows is not None:
+                # INSERT OR REPLACE assigns a new rowid, so low rowids are the oldest writes
+                removed += self._conn.execute(
+                    "DELETE FROM recommendation_cache WHERE rowid IN ("
+                    "SELECT rowid FROM recommendation_cache ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,)
+                ).rowcount
+            self._conn.commit()
+            return removed
+
+
+def create_cache_backend(
+    kind: str,
+    path: str = None,
+    default_ttl: Optional[float] = None,
+    max_rows: Optional[int] = None
+) -> Optional[CacheBackend]:
+    """Build the backend named by settings.CACHE_BACKEND ('memory', 'sqlite' or 'none')"""
+    kind = (kind or 'none').lower()
+    if kind == 'none':
+        return None
+    if kind == 'memory':
+        return MemoryCacheBackend(default_ttl=default_ttl)
+    if kind == 'sqlite':
+        return SQLiteCacheBackend(path, default_ttl=default_ttl, max_rows=max_rows)
+    logger.warning(f"Unknown cache backend '{kind}', second cache tier disabled")
+    return None
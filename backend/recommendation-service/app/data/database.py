@@ -2,14 +2,138 @@
 Database Loader for ShopAI
 Loads real user interactions from MySQL database
 """
+import threading
 import pandas as pd
-import mysql.connector
-from mysql.connector import Error
-from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 from loguru import logger
 import sys
 sys.path.append('..')
 from config import settings
+from app.data.cache_store import CacheBackend, create_cache_backend
+from app.data.db_pool import ConnectionPool, mysql_pool
+
+DB_NAME_RECOMMENDATIONS = 'shopai_recommendations'
+
+# Interaction sources shared by the full loads and the incremental extractor.
+# 'created_at' / 'id' are the keyset (watermark) columns; 'where' holds
+# constant filters only, values always go through bound parameters.
+INTERACTION_SOURCES = {
+    'orders': {
+        'database': settings.DB_NAME_ORDERS,
+        'select': """
+            SELECT 
+                oi.id AS row_id,
+                o.userId AS user_id,
+                oi.productId AS product_id,
+                5.0 AS rating,
+                oi.quantity AS quantity,
+                o.created_at AS timestamp
+            FROM orders o
+            JOIN order_items oi ON o.id = oi.order_id
+        """,
+        'where': ["o.status != 'CANCELLED'"],
+        'created_at': 'o.created_at',
+        'id': 'oi.id',
+    },
+    'user_interactions': {
+        'database': DB_NAME_RECOMMENDATIONS,
+        'select': """
+            SELECT 
+                id AS row_id,
+                user_id,
+                product_id,
+                CASE 
+                    WHEN interaction_type = 'purchase' THEN COALESCE(rating, 5.0)
+                    WHEN interaction_type = 'rating' THEN rating
+                    WHEN interaction_type = 'add_to_cart' THEN 4.0
+                    WHEN interaction_type = 'view' THEN 2.5
+                    ELSE 3.0
+                END AS rating,
+                quantity,
+                created_at AS timestamp,
+                interaction_type
+            FROM user_interactions
+        """,
+        'where': [],
+        'created_at': 'created_at',
+        'id': 'id',
+    },
+}
+
+INTERACTION_COLUMNS = ['user_id', 'product_id', 'rating', 'timestamp']
+
+
+def build_source_query(source: str, conditions: List[str] = (), order_by: Optional[str] = None) -> str:
+    """SELECT of an interaction source with extra constant conditions"""
+    spec = INTERACTION_SOURCES[source]
+    where = list(spec['where']) + list(conditions)
+    query = spec['select']
+    if where:
+        query += "WHERE " + "\n            AND ".join(where) + "\n"
+    if order_by:
+        query += f"ORDER BY {order_by}\n"
+    return query
+
+
+def build_delta_query(source: str) -> str:
+    """
+    Rows of source strictly after a (created_at, id) watermark, in keyset order
+    
+    Parameters: %(created_at)s and %(id)s. The keyset is index-friendly and
+    stable under created_at ties.
+    """
+    spec = INTERACTION_SOURCES[source]
+    created_at, row_id = spec['created_at'], spec['id']
+    return build_source_query(
+        source,
+        conditions=[f"({created_at} > %(created_at)s OR ({created_at} = %(created_at)s AND {row_id} > %(id)s))"],
+        order_by=f"{created_at}, {row_id}"
+    )
+
+
+def weight_source_ratings(source: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Scale purchase ratings by quantity (capped at 5)"""
+    df = df.copy()
+    if source == 'orders':
+        purchases = slice(None)
+    else:
+        purchases = df['interaction_type'] == 'purchase'
+    df.loc[purchases, 'rating'] = df.loc[purchases, 'rating'] * (1 + 0.1 * (df.loc[purchases, 'quantity'] - 1))
+    df['rating'] = df['rating'].clip(upper=5.0)
+    return df
+
+
+def combine_interactions(orders_df: pd.DataFrame, interactions_df: pd.DataFrame) -> pd.DataFrame:
+    """Concatenate both sources, keeping the orders row of duplicated (user, product) pairs"""
+    if not orders_df.empty and not interactions_df.empty:
+        combined = pd.concat([orders_df, interactions_df], ignore_index=True)
+        # Remove duplicates (prefer orders data)
+        combined = combined.drop_duplicates(subset=['user_id', 'product_id'], keep='first')
+        logger.info(f"Combined interactions: {len(combined)}")
+        return combined
+    elif not orders_df.empty:
+        return orders_df
+    elif not interactions_df.empty:
+        return interactions_df
+    else:
+        logger.warning("No interaction data found in any database")
+        return pd.DataFrame()
+
+
+def default_pool_factory(database: str) -> ConnectionPool:
+    """MySQL pool configured from settings"""
+    return mysql_pool(
+        database,
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        max_size=settings.DB_POOL_SIZE,
+        acquire_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        health_check_interval=settings.DB_POOL_HEALTH_CHECK_SECONDS,
+        statement_timeout=settings.DB_STATEMENT_TIMEOUT_SECONDS
+    )
 
 
 class DatabaseLoader:
@@ -17,23 +141,64 @@ class DatabaseLoader:
     Loads interaction data from ShopAI MySQL databases
     """
     
-    def __init__(self):
-        self.db_config = {
-            'host': settings.DB_HOST,
-            'port': settings.DB_PORT,
-            'user': settings.DB_USER,
-            'password': settings.DB_PASSWORD,
-        }
+    def __init__(
+        self,
+        cache_backend: Optional[CacheBackend] = None,
+        pool_factory: Optional[Callable[[str], ConnectionPool]] = None
+    ):
+        """
+        Args:
+            cache_backend: Second-tier recommendation cache (default from settings)
+            pool_factory: Builds the connection pool of a database name
+                (default: MySQL from settings; e.g. sqlite_pool for tests)
+        """
+        self.pool_factory = pool_factory or default_pool_factory
+        self._pools: Dict[str, ConnectionPool] = {}
+        self._pools_lock = threading.Lock()
+        
+        # Second-tier recommendation cache (memory, SQLite or disabled)
+        if cache_backend is None:
+            cache_backend = create_cache_backend(
+                settings.CACHE_BACKEND,
+                path=settings.CACHE_SQLITE_PATH,
+                default_ttl=settings.CACHE_BACKEND_TTL_SECONDS,
+                max_rows=settings.CACHE_BACKEND_MAX_ROWS
+            )
+        self.cache_backend = cache_backend
     
-    def get_connection(self, database: str):
-        """Get MySQL connection"""
-        try:
-            config = {**self.db_config, 'database': database}
-            conn = mysql.connector.connect(**config)
-            return conn
-        except Error as e:
-            logger.error(f"Database connection failed: {e}")
-            return None
+    def get_pool(self, database: str) -> ConnectionPool:
+        """Connection pool of a database, created on first use"""
+        with self._pools_lock:
+            pool = self._pools.get(database)
+            if pool is None:
+                pool = self._pools[database] = self.pool_factory(database)
+            return pool
+    
+    def query(
+        self,
+        database: str,
+        sql: str,
+        params: Optional[dict] = None,
+        timeout: Optional[float] = None
+    ) -> pd.DataFrame:
+        """Run a parameterized query on a pooled connection"""
+        return self.get_pool(database).query(sql, params, timeout=timeout)
+    
+    def pool_stats(self) -> Dict[str, dict]:
+        with self._pools_lock:
+            return {name: pool.stats() for name, pool in self._pools.items()}
+    
+    def pools(self) -> Dict[str, ConnectionPool]:
+        """Pools opened so far, by database name"""
+        with self._pools_lock:
+            return dict(self._pools)
+    
+    def close(self):
+        with self._pools_lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.close()
     
     def load_orders_interactions(self) -> pd.DataFrame:
         """
@@ -41,40 +206,18 @@ class DatabaseLoader:
         
         Returns DataFrame with columns: user_id, product_id, rating (implicit=5), timestamp
         """
-        conn = self.get_connection(settings.DB_NAME_ORDERS)
-        
-        if conn is None:
-            logger.warning("Could not connect to orders database")
-            return pd.DataFrame()
-        
         try:
-            query = """
-            SELECT 
-                o.userId AS user_id,
-                oi.productId AS product_id,
-                5.0 AS rating,
-                oi.quantity AS quantity,
-                o.created_at AS timestamp
-            FROM orders o
-            JOIN order_items oi ON o.id = oi.order_id
-            WHERE o.status != 'CANCELLED'
-            ORDER BY o.created_at DESC
-            """
-            
-            df = pd.read_sql(query, conn)
-            conn.close()
+            query = build_source_query('orders', order_by='o.created_at DESC')
+            df = self.query(settings.DB_NAME_ORDERS, query, timeout=settings.DB_BULK_STATEMENT_TIMEOUT_SECONDS)
             
             # Weight by quantity
-            df['rating'] = df['rating'] * (1 + 0.1 * (df['quantity'] - 1))
-            df['rating'] = df['rating'].clip(upper=5.0)
+            df = weight_source_ratings('orders', df)
             
             logger.info(f"Loaded {len(df)} purchase interactions from database")
-            return df[['user_id', 'product_id', 'rating', 'timestamp']]
+            return df[INTERACTION_COLUMNS]
             
         except Exception as e:
             logger.error(f"Failed to load orders: {e}")
-            if conn:
-                conn.close()
             return pd.DataFrame()
 
     def load_user_interactions(self) -> pd.DataFrame:
@@ -83,83 +226,37 @@ class DatabaseLoader:
         This includes views, add_to_cart, purchases, and ratings
         """
         try:
-            config = {**self.db_config, 'database': 'shopai_recommendations'}
-            conn = mysql.connector.connect(**config)
-        except Error as e:
-            logger.warning(f"Could not connect to recommendations database: {e}")
-            return pd.DataFrame()
-        
-        try:
-            query = """
-            SELECT 
-                user_id,
-                product_id,
-                CASE 
-                    WHEN interaction_type = 'purchase' THEN COALESCE(rating, 5.0)
-                    WHEN interaction_type = 'rating' THEN rating
-                    WHEN interaction_type = 'add_to_cart' THEN 4.0
-                    WHEN interaction_type = 'view' THEN 2.5
-                    ELSE 3.0
-                END AS rating,
-                quantity,
-                created_at AS timestamp,
-                interaction_type
-            FROM user_interactions
-            ORDER BY created_at DESC
-            """
-            
-            df = pd.read_sql(query, conn)
-            conn.close()
+            query = build_source_query('user_interactions', order_by='created_at DESC')
+            df = self.query(DB_NAME_RECOMMENDATIONS, query, timeout=settings.DB_BULK_STATEMENT_TIMEOUT_SECONDS)
             
             # Adjust rating by quantity for purchases
-            df.loc[df['interaction_type'] == 'purchase', 'rating'] = \
-                df.loc[df['interaction_type'] == 'purchase', 'rating'] * (1 + 0.1 * (df['quantity'] - 1))
-            df['rating'] = df['rating'].clip(upper=5.0)
+            df = weight_source_ratings('user_interactions', df)
             
             logger.info(f"Loaded {len(df)} user interactions from database")
-            return df[['user_id', 'product_id', 'rating', 'timestamp']]
+            return df[INTERACTION_COLUMNS]
             
         except Exception as e:
             logger.error(f"Failed to load user interactions: {e}")
-            if conn:
-                conn.close()
             return pd.DataFrame()
 
     def load_all_interactions(self) -> pd.DataFrame:
         """
         Load and combine all interactions from both orders and user_interactions tables
-        """
-        # Load from orders
-        orders_df = self.load_orders_interactions()
         
-        # Load from user_interactions
-        interactions_df = self.load_user_interactions()
+        The two databases are queried concurrently on separate pooled connections.
+        """
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix='db-load') as pool:
+            orders_future = pool.submit(self.load_orders_interactions)
+            interactions_future = pool.submit(self.load_user_interactions)
+            orders_df = orders_future.result()
+            interactions_df = interactions_future.result()
         
-        # Combine
-        if not orders_df.empty and not interactions_df.empty:
-            combined = pd.concat([orders_df, interactions_df], ignore_index=True)
-            # Remove duplicates (prefer orders data)
-            combined = combined.drop_duplicates(subset=['user_id', 'product_id'], keep='first')
-            logger.info(f"Combined interactions: {len(combined)}")
-            return combined
-        elif not orders_df.empty:
-            return orders_df
-        elif not interactions_df.empty:
-            return interactions_df
-        else:
-            logger.warning("No interaction data found in any database")
-            return pd.DataFrame()
+        return combine_interactions(orders_df, interactions_df)
     
     def load_products(self) -> pd.DataFrame:
         """
         Load product data from products database
         """
-        conn = self.get_connection(settings.DB_NAME_PRODUCTS)
-        
-        if conn is None:
-            logger.warning("Could not connect to products database")
-            return pd.DataFrame()
-        
         try:
             query = """
             SELECT 
@@ -178,27 +275,61 @@ class DatabaseLoader:
             LEFT JOIN categories c ON p.category_id = c.id
             """
             
-            df = pd.read_sql(query, conn)
-            conn.close()
+            df = self.query(settings.DB_NAME_PRODUCTS, query, timeout=settings.DB_BULK_STATEMENT_TIMEOUT_SECONDS)
             
             logger.info(f"Loaded {len(df)} products from database")
             return df
             
         except Exception as e:
             logger.error(f"Failed to load products: {e}")
-            conn.close()
             return pd.DataFrame()
     
-    def load_users(self) -> pd.DataFrame:
+    def load_product_categories(self) -> pd.DataFrame:
         """
-        Load user data from users database
+        product_id -> category name (for per-category popularity)
         """
-        conn = self.get_connection(settings.DB_NAME_USERS)
-        
-        if conn is None:
-            logger.warning("Could not connect to users database")
+        try:
+            query = """
+            SELECT 
+                p.id AS product_id,
+                c.name AS category
+            FROM products p
+            LEFT JOIN categories c ON p.category_id = c.id
+            """
+            return self.query(settings.DB_NAME_PRODUCTS, query, timeout=settings.DB_BULK_STATEMENT_TIMEOUT_SECONDS)
+            
+        except Exception as e:
+            logger.error(f"Failed to load product categories: {e}")
             return pd.DataFrame()
+    
+    def load_product_attributes(self) -> pd.DataFrame:
+        """
+        Stock, price and category of every product (for request-time filters)
         
+        Only the filterable columns, unlike load_products which also reads names
+        and descriptions for the content model.
+        """
+        try:
+            query = """
+            SELECT 
+                p.id AS product_id,
+                p.price,
+                p.stock,
+                c.id AS category_id,
+                c.name AS category_name
+            FROM products p
+            LEFT JOIN categories c ON p.category_id = c.id
+            """
+            return self.query(settings.DB_NAME_PRODUCTS, query, timeout=settings.DB_BULK_STATEMENT_TIMEOUT_SECONDS)
+            
+        except Exception as e:
+            logger.error(f"Failed to load product attributes: {e}")
+            return pd.DataFrame()
+    
+    def load_users(self) -> pd.DataFrame:
+        """
+        Load user data from users database
+        """
         try:
             query = """
             SELECT 
@@ -212,15 +343,13 @@ class DatabaseLoader:
             WHERE status = 'ACTIVE'
             """
             
-            df = pd.read_sql(query, conn)
-            conn.close()
+            df = self.query(settings.DB_NAME_USERS, query, timeout=settings.DB_BULK_STATEMENT_TIMEOUT_SECONDS)
             
             logger.info(f"Loaded {len(df)} users from database")
             return df
             
         except Exception as e:
             logger.error(f"Failed to load users: {e}")
-            conn.close()
             return pd.DataFrame()
     
     def get_popular_products(self, limit: int = 20) -> pd.DataFrame:
@@ -228,13 +357,8 @@ class DatabaseLoader:
         Get popular products based on order count
         Used for cold-start recommendations
         """
-        conn = self.get_connection(settings.DB_NAME_ORDERS)
-        
-        if conn is None:
-            return pd.DataFrame()
-        
         try:
-            query = f"""
+            query = """
             SELECT 
                 oi.productId AS product_id,
                 oi.productName AS name,
@@ -245,13 +369,10 @@ class DatabaseLoader:
             WHERE o.status != 'CANCELLED'
             GROUP BY oi.productId, oi.productName
             ORDER BY order_count DESC, total_quantity DESC
-            LIMIT {limit}
+            LIMIT %(limit)s
             """
             
-            df = pd.read_sql(query, conn)
-            conn.close()
-            
-            return df
+            return self.query(settings.DB_NAME_ORDERS, query, {'limit': int(limit)})
             
         except Exception as e:
             logger.error(f"Failed to get popular products: {e}")
@@ -261,13 +382,8 @@ class DatabaseLoader:
         """
         Get a specific user's purchase history
         """
-        conn = self.get_connection(settings.DB_NAME_ORDERS)
-        
-        if conn is None:
-            return pd.DataFrame()
-        
         try:
-            query = f"""
+            query = """
             SELECT 
                 oi.productId AS product_id,
                 oi.productName AS name,
@@ -276,26 +392,16 @@ class DatabaseLoader:
                 o.created_at AS purchase_date
             FROM order_items oi
             JOIN orders o ON oi.order_id = o.id
-            WHERE o.userId = {user_id}
+            WHERE o.userId = %(user_id)s
             AND o.status != 'CANCELLED'
             ORDER BY o.created_at DESC
             """
             
-            df = pd.read_sql(query, conn)
-            conn.close()
-            
-            return df
+            return self.query(settings.DB_NAME_ORDERS, query, {'user_id': user_id})
             
         except Exception as e:
             logger.error(f"Failed to get user history: {e}")
             return pd.DataFrame()
-    
-    def save_recommendations_cache(self, user_id: int, product_ids: list, scores: list):
-        """
-        Save recommendations to cache table (optional optimization)
-        """
-        # Could implement caching in Redis or MySQL for production
-        pass
 
 
 if __name__ == "__main__":
@@ -0,0 +1,388 @@
+"""
+Thread-safe connection pool for the ShopAI databases
+
+Connections are opened lazily up to max_size and reused (LIFO, so idle
+connections beyond the working set age out). A connection idle for longer
+than health_check_interval is pinged before being handed out, and one that
+raised while checked out is closed instead of returned, so a dropped server
+connection never reaches two requests in a row.
+
+Queries are always parameterized: SQL is written with pyformat placeholders
+(%(name)s, and %% for a literal %) and rewritten for drivers using the
+named style (:name and %, SQLite). Each statement runs under a timeout
+applied through a driver-specific hook (MAX_EXECUTION_TIME on MySQL, a
+progress-handler deadline on SQLite).
+
+mysql_pool() builds the production pool; sqlite_pool() is a local stand-in
+with the same interface for tests and development.
+"""
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import pandas as pd
+from loguru import logger
+
+from app.metrics import Histogram
+
+# Query duration buckets, in seconds
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# pyformat placeholders and the %% escape for a literal %
+_PYFORMAT = re.compile(r'%%|%\((\w+)\)s')
+
+
+class PoolTimeout(Exception):
+    """No connection became available within acquire_timeout"""
+
+
+def _select_one(conn) -> None:
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+class ConnectionPool:
+    """
+    Bounded pool of DB-API connections
+
+    Args:
+        connect: Opens a new connection
+        name: Label used in logs and stats
+        max_size: Maximum open connections
+        acquire_timeout: Seconds to wait for a free connection before PoolTimeout
+        health_check_interval: Idle seconds after which a connection is pinged before reuse
+        statement_timeout: Default per-statement timeout in seconds (0 = none)
+        paramstyle: 'pyformat' (MySQL) or 'named' (SQLite)
+        ping: Raises when a connection is unusable (defaults to SELECT 1)
+        apply_timeout: Sets the statement timeout of a connection, in seconds
+        stream_cursor: Opens an unbuffered (server-side) cursor for stream()
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        name: str = "db",
+        max_size: int = 8,
+        acquire_timeout: float = 5.0,
+        health_check_interval: float = 30.0,
+        statement_timeout: float = 0.0,
+        paramstyle: str = "pyformat",
+        ping: Callable[[Any], None] = _select_one,
+        apply_timeout: Optional[Callable[[Any, float], None]] = None,
+        stream_cursor: Callable[[Any], Any] = lambda conn: conn.cursor()
+    ):
+        if paramstyle not in ('pyformat', 'named'):
+            raise ValueError(f"Unsupported paramstyle: {paramstyle}")
+        self._connect = connect
+        self.name = name
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.statement_timeout = statement_timeout
+        self.paramstyle = paramstyle
+        self._ping = ping
+        self._apply_timeout = apply_timeout
+        self._stream_cursor = stream_cursor
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, released_at)
+        self._size = 0  # open connections, idle or checked out
+        self._timeouts: Dict[int, float] = {}  # id(connection) -> statement timeout in effect
+        self._closed = False
+
+        self.connections_opened = 0
+        self.connections_discarded = 0
+        self.health_check_failures = 0
+        self.acquire_timeouts = 0
+        self.queries = 0
+        self.query_errors = 0
+        self.query_seconds_total = 0.0
+        self.query_seconds = Histogram(QUERY_BUCKETS)
+
+    # Connections
+
+    def _open(self):
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.connections_opened += 1
+        return conn
+
+    def _close(self, conn):
+        self._timeouts.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception as e:
+            logger.debug(f"Closing a {self.name} connection failed: {e}")
+
+    def _discard(self, conn):
+        self._close(conn)
+        with self._cond:
+            self._size -= 1
+            self.connections_discarded += 1
+            self._cond.notify()
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError(f"Connection pool '{self.name}' is closed")
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.acquire_timeouts += 1
+                        raise PoolTimeout(f"No {self.name} connection available after {self.acquire_timeout}s")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                else:
+                    self._size += 1
+                    conn = released_at = None
+
+            if conn is None:
+                return self._open()
+            if time.monotonic() - released_at < self.health_check_interval:
+                return conn
+            try:
+                self._ping(conn)
+                return conn
+            except Exception as e:
+                logger.warning(f"Dropping stale {self.name} connection: {e}")
+                with self._cond:
+                    self.health_check_failures += 1
+                self._discard(conn)
+
+    def _release(self, conn):
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                self._close(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Check a connection out; it is discarded if the block raises"""
+        conn = self._acquire()
+        try:
+            yield conn
+        except BaseException:
+            self._discard(conn)
+            raise
+        self._release(conn)
+
+    # Queries
+
+    def _prepare(self, conn, timeout: float):
+        if self._apply_timeout is not None and self._timeouts.get(id(conn)) != timeout:
+            self._apply_timeout(conn, timeout)
+            self._timeouts[id(conn)] = timeout
+
+    def _adapt(self, sql: str) -> str:
+        if self.paramstyle != 'named':
+            return sql
+        # One pass so an escaped '%%(' is not mistaken for a placeholder
+        return _PYFORMAT.sub(lambda m: '%' if m.group(0) == '%%' else f':{m.group(1)}', sql)
+
+    def query(self, sql: str, params: Optional[Dict] = None, timeout: Optional[float] = None) -> pd.DataFrame:
+        """
+        Run a parameterized SELECT and return its rows as a DataFrame
+
+        Args:
+            sql: Statement with %(name)s placeholders
+            params: Placeholder values (never interpolated into the SQL text)
+            timeout: Statement timeout in seconds (default: the pool's; 0 = none)
+        """
+        sql = self._adapt(sql)
+        timeout = self.statement_timeout if timeout is None else timeout
+
+        start = time.perf_counter()
+        try:
+            with self.connection() as conn:
+                self._prepare(conn, timeout)
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(sql, params or {})
+                    columns = [column[0] for column in cursor.description]
+                    rows = cursor.fetchall()
+                finally:
+                    cursor.close()
+        except Exception:
+            with self._cond:
+                self.query_errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.query_seconds.observe(elapsed)
+            with self._cond:
+                self.queries += 1
+                self.query_seconds_total += elapsed
+
+        # coerce_float: DECIMAL columns arrive as Decimal objects
+        return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+    def stream(
+        self,
+        sql: str,
+        params: Optional[Dict] = None,
+        chunk_size: int = 50_000,
+        timeout: Optional[float] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Run a parameterized SELECT and yield its rows chunk_size at a time
+
+        Rows are pulled with fetchmany from an unbuffered cursor, so the
+        result set is never materialized client-side. The connection stays
+        checked out until the generator is exhausted or closed (a generator
+        abandoned mid-result discards it, since unread rows remain).
+        """
+        sql = self._adapt(sql)
+        timeout = self.statement_timeout if timeout is None else timeout
+
+        start = time.perf_counter()
+        try:
+            with self.connection() as conn:
+                self._prepare(conn, timeout)
+                cursor = self._stream_cursor(conn)
+                try:
+                    cursor.execute(sql, params or {})
+                    columns = [column[0] for column in cursor.description]
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+                finally:
+                    cursor.close()
+        except Exception:
+            with self._cond:
+                self.query_errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.query_seconds.observe(elapsed)
+            with self._cond:
+                self.queries += 1
+                self.query_seconds_total += elapsed
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'open': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'connections_opened': self.connections_opened,
+                'connections_discarded': self.connections_discarded,
+                'health_check_failures': self.health_check_failures,
+                'acquire_timeouts': self.acquire_timeouts,
+                'queries': self.queries,
+                'query_errors': self.query_errors,
+                'query_seconds_total': round(self.query_seconds_total, 6),
+            }
+
+    def close(self):
+        """Close idle connections; checked-out ones are closed on release"""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close(conn)
+
+
+def mysql_pool(
+    database: str,
+    host: str,
+    port: int,
+    user: str,
+    password: str,
+    connect_timeout: float = 5.0,
+    **pool_kwargs
+) -> ConnectionPool:
+    """Pool of autocommit mysql-connector connections to one database"""
+    import mysql.connector
+
+    def connect():
+        return mysql.connector.connect(
+            host=host,
+            port=port,
+            user=user,
+            password=password,
+            database=database,
+            connection_timeout=int(max(1, connect_timeout)),
+            autocommit=True  # no long-lived read snapshot on pooled connections
+        )
+
+    def ping(conn):
+        conn.ping(reconnect=False)
+
+    def apply_timeout(conn, seconds: float):
+        # Applies to SELECT statements; 0 disables the limit
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SET SESSION max_execution_time = %(ms)s", {'ms': int(seconds * 1000)})
+        finally:
+            cursor.close()
+
+    return ConnectionPool(
+        connect,
+        name=database,
+        paramstyle='pyformat',
+        ping=ping,
+        apply_timeout=apply_timeout,
+        stream_cursor=lambda conn: conn.cursor(buffered=False),
+        **pool_kwargs
+    )
+
+
+class _TimedSQLiteConnection(sqlite3.Connection):
+    """SQLite connection that interrupts statements running past statement_timeout"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statement_timeout = 0.0
+        self._deadline = None
+        self.set_progress_handler(self._check_deadline, 10_000)
+
+    def _check_deadline(self) -> int:
+        # A non-zero return aborts the statement with OperationalError('interrupted')
+        return int(self._deadline is not None and time.monotonic() > self._deadline)
+
+    def cursor(self, *args, **kwargs):
+        # The pool opens one cursor per statement, so this is the statement start
+        self._deadline = time.monotonic() + self.statement_timeout if self.statement_timeout else None
+        return super().cursor(*args, **kwargs)
+
+
+def sqlite_pool(path: str, name: Optional[str] = None, **pool_kwargs) -> ConnectionPool:
+    """SQLite stand-in with the same interface as mysql_pool (tests, local runs)"""
+
+    def connect():
+        return sqlite3.connect(
+            path, factory=_TimedSQLiteConnection, isolation_level=None, check_same_thread=False, timeout=5.0
+        )
+
+    def apply_timeout(conn, seconds: float):
+        conn.statement_timeout = seconds
+
+    return ConnectionPool(
+        connect, name=name or str(path), paramstyle='named', apply_timeout=apply_timeout, **pool_kwargs
+    )
@@ -0,0 +1,273 @@
+"""
+Resumable, concurrent, checksummed file downloader
+
+Files are fetched with parallel HTTP Range requests into `<name>.part`;
+completed ranges are recorded in `<name>.part.json` so an interrupted
+download resumes where it stopped. Once every range is in, the SHA-256 is
+checked, the file is renamed into place and its size/hash are recorded in
+the directory's download manifest. A file is only reused when it matches
+its manifest entry, so a partial file is never mistaken for a finished one.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+from loguru import logger
+
+MANIFEST_FILE = "download_manifest.json"
+
+
+class DownloadError(Exception):
+    """Raised when a download fails or does not match its expected size/hash"""
+
+
+class RangesNotSupported(DownloadError):
+    """The server answered a Range request with the full body"""
+
+
+def sha256_file(path: Path, buffer_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(buffer_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(path: Path, data: Dict):
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class ResumableDownloader:
+    """
+    Download files with parallel Range requests, resume and verification
+
+    Args:
+        n_connections: Ranges fetched concurrently
+        part_size: Bytes per Range request (the resume granularity)
+        timeout: Per-request timeout in seconds
+        retries: Attempts per range before giving up
+        session: requests.Session to use (injectable for tests / proxies)
+    """
+
+    def __init__(
+        self,
+        n_connections: int = 4,
+        part_size: int = 8 * 1024 * 1024,
+        timeout: float = 60.0,
+        retries: int = 3,
+        session: Optional[requests.Session] = None
+    ):
+        self.n_connections = n_connections
+        self.part_size = part_size
+        self.timeout = timeout
+        self.retries = retries
+        self.session = session or requests.Session()
+        self._manifest_lock = threading.Lock()
+
+    # Manifest
+
+    def _load_manifest(self, directory: Path) -> Dict:
+        path = directory / MANIFEST_FILE
+        if not path.exists():
+            return {}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _record(self, dest: Path, url: str, size: int, sha256: str, etag: Optional[str]):
+        with self._manifest_lock:
+            manifest = self._load_manifest(dest.parent)
+            manifest[dest.name] = {
+                'url': url,
+                'size': size,
+                'sha256': sha256,
+                'etag': etag,
+                'downloaded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+            _write_json_atomic(dest.parent / MANIFEST_FILE, manifest)
+
+    def is_complete(self, dest: Path, verify_hash: bool = False) -> bool:
+        """True when dest exists and matches its manifest entry"""
+        dest = Path(dest)
+        entry = self._load_manifest(dest.parent).get(dest.name)
+        if entry is None or not dest.exists() or dest.stat().st_size != entry['size']:
+            return False
+        return not verify_hash or sha256_file(dest) == entry['sha256']
+
+    # Download
+
+    def _probe(self, url: str) -> Dict:
+        """Remote size, Range support and ETag"""
+        try:
+            response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+            response.raise_for_status()
+        except requests.HTTPError as e:
+            # Some servers reject HEAD; fall back to a plain streamed GET
+            logger.warning(f"HEAD {url} failed ({e}), downloading without ranges")
+            return {'size': None, 'ranges': False, 'etag': None}
+        size = response.headers.get('Content-Length')
+        return {
+            'size': int(size) if size is not None else None,
+            'ranges': response.headers.get('Accept-Ranges', '').lower() == 'bytes',
+            'etag': response.headers.get('ETag'),
+        }
+
+    def _fetch_range(self, url: str, part_path: Path, start: int, stop: int):
+        """Write bytes [start, stop) of url at the same offset of part_path"""
+        # Byte offsets refer to the stored file: no transparent decompression
+        headers = {'Range': f'bytes={start}-{stop - 1}', 'Accept-Encoding': 'identity'}
+        for attempt in range(1, self.retries + 1):
+            try:
+                with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    if response.status_code == 200:
+                        raise RangesNotSupported(f"{url} ignored the Range header")
+                    if response.status_code != 206:
+                        raise DownloadError(f"Expected 206 for range {start}-{stop - 1}, got {response.status_code}")
+                    offset = start
+                    with open(part_path, 'r+b') as f:
+                        f.seek(offset)
+                        for block in response.raw.stream(1 << 20, decode_content=False):
+                            f.write(block)
+                            offset += len(block)
+                    if offset != stop:
+                        raise DownloadError(f"Range {start}-{stop - 1} returned {offset - start} bytes")
+                return
+            except RangesNotSupported:
+                raise
+            except (requests.RequestException, DownloadError) as e:
+                if attempt == self.retries:
+                    raise DownloadError(f"Range {start}-{stop - 1} of {url} failed: {e}") from e
+                logger.warning(f"Range {start}-{stop - 1} failed (attempt {attempt}/{self.retries}): {e}")
+                time.sleep(min(2 ** attempt, 10))
+
+    def _download_ranges(self, url: str, dest: Path, size: int, etag: Optional[str]) -> Path:
+        part_path = dest.with_name(dest.name + '.part')
+        state_path = dest.with_name(dest.name + '.part.json')
+
+        state = None
+        if part_path.exists() and state_path.exists():
+            with open(state_path, 'r') as f:
+                state = json.load(f)
+            if state.get('url') != url or state.get('size') != size or state.get('etag') != etag \
+                    or state.get('part_size') != self.part_size:
+                logger.info(f"Remote file changed since the partial download of {dest.name}, restarting")
+                state = None
+
+        if state is None:
+            state = {'url': url, 'size': size, 'etag': etag, 'part_size': self.part_size, 'done': []}
+            with open(part_path, 'wb') as f:
+                f.truncate(size)
+            _write_json_atomic(state_path, state)
+
+        n_parts = max(1, -(-size // self.part_size))
+        done = set(state['done'])
+        todo: List[int] = [i for i in range(n_parts) if i not in done]
+        if done:
+            logger.info(f"Resuming {dest.name}: {len(done)}/{n_parts} ranges already downloaded")
+
+        state_lock = threading.Lock()
+
+        def fetch(part: int):
+            start = part * self.part_size
+            self._fetch_range(url, part_path, start, min(start + self.part_size, size))
+            with state_lock:
+                state['done'].append(part)
+                _write_json_atomic(state_path, state)
+
+        with ThreadPoolExecutor(max_workers=self.n_connections) as pool:
+            # list() re-raises worker exceptions
+            list(pool.map(fetch, todo))
+
+        return part_path
+
+    def _download_stream(self, url: str, dest: Path) -> Path:
+        """Single GET for servers without Range support (no resume)"""
+        part_path = dest.with_name(dest.name + '.part')
+        headers = {'Accept-Encoding': 'identity'}
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            with open(part_path, 'wb') as f:
+                for block in response.raw.stream(1 << 20, decode_content=False):
+                    f.write(block)
+        return part_path
+
+    def download(
+        self,
+        url: str,
+        dest: str,
+        expected_sha256: Optional[str] = None,
+        expected_size: Optional[int] = None,
+        verify_hash: bool = False
+    ) -> Path:
+        """
+        Download url to dest unless a verified copy is already there
+
+        Args:
+            url: Source URL
+            dest: Destination file path
+            expected_sha256: Known checksum to enforce (otherwise recorded on first download)
+            expected_size: Known size to enforce
+            verify_hash: Re-hash an existing file against the manifest before reusing it
+
+        Returns:
+            Path of the downloaded file
+        """
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+
+        if self.is_complete(dest, verify_hash=verify_hash or expected_sha256 is not None):
+            entry = self._load_manifest(dest.parent)[dest.name]
+            if expected_sha256 is None or entry['sha256'] == expected_sha256:
+                logger.info(f"File already downloaded and verified: {dest}")
+                return dest
+
+        remote = self._probe(url)
+        size = remote['size']
+        if expected_size is not None and size is not None and size != expected_size:
+            raise DownloadError(f"{url} is {size} bytes, expected {expected_size}")
+
+        # Files fetched before the manifest existed: adopt them if complete
+        if dest.exists() and size is not None and dest.stat().st_size == size and expected_sha256 is None:
+            logger.info(f"Existing {dest} matches the remote size, recording it in the manifest")
+            self._record(dest, url, size, sha256_file(dest), remote['etag'])
+            return dest
+
+        logger.info(f"Downloading {url} ({size if size is not None else 'unknown'} bytes)...")
+        start = time.perf_counter()
+
+        part_path = None
+        if remote['ranges'] and size:
+            try:
+                part_path = self._download_ranges(url, dest, size, remote['etag'])
+            except RangesNotSupported as e:
+                logger.warning(f"{e}, downloading without ranges")
+                dest.with_name(dest.name + '.part.json').unlink(missing_ok=True)
+        if part_path is None:
+            part_path = self._download_stream(url, dest)
+
+        actual_size = part_path.stat().st_size
+        if (size is not None and actual_size != size) or (expected_size is not None and actual_size != expected_size):
+            raise DownloadError(f"Downloaded {actual_size} bytes for {url}, expected {expected_size or size}")
+
+        digest = sha256_file(part_path)
+        if expected_sha256 is not None and digest != expected_sha256:
+            # Corrupt data must not be resumed from
+            part_path.unlink()
+            dest.with_name(dest.name + '.part.json').unlink(missing_ok=True)
+            raise DownloadError(f"SHA-256 mismatch for {url}: got {digest}, expected {expected_sha256}")
+
+        os.replace(part_path, dest)
+        dest.with_name(dest.name + '.part.json').unlink(missing_ok=True)
+        self._record(dest, url, actual_size, digest, remote['etag'])
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"Downloaded {dest} ({actual_size / (1024 * 1024):.1f} MB in {elapsed:.1f}s)")
+        return dest
@@ -0,0 +1,193 @@
+"""
+Incremental extraction of interactions into a local Parquet store
+
+Each source table (orders, user_interactions) keeps a (created_at, id)
+watermark: a run only selects rows strictly after it, ordered by the same
+keyset, and streams them from an unbuffered cursor in fixed-size chunks.
+Every chunk becomes one Parquet part and the watermark advances with it, so
+an interrupted run resumes after the last stored chunk and never writes a
+row twice. Training then reads the store instead of re-scanning the tables.
+
+Sources are treated as append-only: rows updated after extraction (e.g. an
+order cancelled later) are not revisited; rebuild the store to pick those up.
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from loguru import logger
+
+from config import settings
+from app.data.database import (
+    INTERACTION_COLUMNS,
+    INTERACTION_SOURCES,
+    DatabaseLoader,
+    build_delta_query,
+    combine_interactions,
+    weight_source_ratings,
+)
+
+STATE_FILE = "state.json"
+INITIAL_WATERMARK = {'created_at': '1970-01-01 00:00:00', 'id': 0}
+
+
+def format_watermark_timestamp(value) -> str:
+    # Same textual form for MySQL DATETIME and SQLite TEXT comparisons
+    if hasattr(value, 'isoformat'):
+        return value.isoformat(sep=' ')
+    return str(value)
+
+
+class InteractionStore:
+    """
+    Append-only store of extracted interactions, one hive partition per source
+
+    Only parts recorded in state.json are visible, so a part written by a
+    run that died before committing its watermark is ignored (and overwritten).
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _load_state(self) -> Dict:
+        path = self.root / STATE_FILE
+        if not path.exists():
+            return {'sources': {}}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _save_state(self, state: Dict):
+        tmp_path = self.root / (STATE_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.root / STATE_FILE)
+
+    def watermark(self, source: str) -> Dict:
+        entry = self._load_state()['sources'].get(source)
+        return dict(entry['watermark']) if entry else dict(INITIAL_WATERMARK)
+
+    def append(self, source: str, df: pd.DataFrame, watermark: Dict):
+        """Write df as the next part of source and advance its watermark"""
+        with self._lock:
+            state = self._load_state()
+            entry = state['sources'].setdefault(source, {'watermark': INITIAL_WATERMARK, 'parts': [], 'rows': 0})
+
+            directory = self.root / f"source={source}"
+            directory.mkdir(exist_ok=True)
+            name = f"part-{len(entry['parts']):06d}.parquet"
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            tmp_path = directory / (name + '.tmp')
+            pq.write_table(table, tmp_path, compression='zstd')
+            os.replace(tmp_path, directory / name)
+
+            entry['parts'].append(f"source={source}/{name}")
+            entry['rows'] += len(df)
+            entry['watermark'] = watermark
+            entry['updated_at'] = pd.Timestamp.now().isoformat()
+            self._save_state(state)
+
+    def parts(self, sources: Optional[List[str]] = None) -> List[str]:
+        state = self._load_state()['sources']
+        return [
+            str(self.root / part)
+            for source, entry in state.items()
+            if sources is None or source in sources
+            for part in entry['parts']
+        ]
+
+    def dataset(self, sources: Optional[List[str]] = None) -> Optional[ds.Dataset]:
+        """Lazy dataset over the committed parts (with a 'source' column), None when empty"""
+        parts = self.parts(sources)
+        if not parts:
+            return None
+        return ds.dataset(parts, format='parquet', partitioning='hive', partition_base_dir=str(self.root))
+
+    def read(
+        self,
+        sources: Optional[List[str]] = None,
+        columns: Optional[List[str]] = None,
+        since: Optional[pd.Timestamp] = None
+    ) -> pd.DataFrame:
+        """
+        Read stored interactions, optionally only those at or after since (a delta)
+        """
+        dataset = self.dataset(sources)
+        if dataset is None:
+            return pd.DataFrame(columns=columns or ['source', 'row_id'] + INTERACTION_COLUMNS)
+        filter_ = ds.field('timestamp') >= pa.scalar(pd.Timestamp(since)) if since is not None else None
+        return dataset.to_table(columns=columns, filter=filter_).to_pandas()
+
+    def stats(self) -> Dict:
+        return {
+            source: {'rows': entry['rows'], 'parts': len(entry['parts']), 'watermark': entry['watermark']}
+            for source, entry in self._load_state()['sources'].items()
+        }
+
+
+class IncrementalExtractor:
+    """
+    Copy new rows of the interaction sources into an InteractionStore
+
+    Args:
+        loader: DatabaseLoader providing the connection pools
+        store: Destination store
+        chunk_size: Rows fetched (and written as one part) at a time
+    """
+
+    def __init__(self, loader: DatabaseLoader, store: InteractionStore, chunk_size: int = 50_000):
+        self.loader = loader
+        self.store = store
+        self.chunk_size = chunk_size
+
+    def extract(self, source: str) -> int:
+        """Fetch rows of source after its watermark; returns the number stored"""
+        watermark = self.store.watermark(source)
+
+        pool = self.loader.get_pool(INTERACTION_SOURCES[source]['database'])
+        n_rows = 0
+        for chunk in pool.stream(
+            build_delta_query(source), watermark, chunk_size=self.chunk_size, timeout=settings.DB_BULK_STATEMENT_TIMEOUT_SECONDS
+        ):
+            last = chunk.iloc[-1]
+            next_watermark = {'created_at': format_watermark_timestamp(last['timestamp']), 'id': int(last['row_id'])}
+
+            chunk = weight_source_ratings(source, chunk)[['row_id'] + INTERACTION_COLUMNS]
+            chunk['timestamp'] = pd.to_datetime(chunk['timestamp'])
+            chunk['rating'] = chunk['rating'].astype('float32')
+            self.store.append(source, chunk, next_watermark)
+
+            n_rows += len(chunk)
+            logger.info(f"Extracted {n_rows} new rows from {source} (watermark {next_watermark})")
+
+        if n_rows == 0:
+            logger.info(f"No new rows in {source} after {watermark}")
+        return n_rows
+
+    def extract_all(self) -> Dict[str, int]:
+        """Extract every source concurrently; a failing source does not stop the others"""
+        def run(source: str) -> int:
+            try:
+                return self.extract(source)
+            except Exception as e:
+                logger.error(f"Incremental extraction of {source} failed: {e}")
+                return 0
+
+        with ThreadPoolExecutor(max_workers=len(INTERACTION_SOURCES), thread_name_prefix='db-extract') as pool:
+            return dict(zip(INTERACTION_SOURCES, pool.map(run, INTERACTION_SOURCES)))
+
+    def load_interactions(self, since: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """Stored interactions combined like DatabaseLoader.load_all_interactions"""
+        def latest_first(source: str) -> pd.DataFrame:
+            df = self.store.read(sources=[source], columns=INTERACTION_COLUMNS, since=since)
+            return df.sort_values('timestamp', ascending=False, kind='stable')
+
+        return combine_interactions(latest_first('orders'), latest_first('user_interactions'))
@@ -0,0 +1,191 @@
+"""
+Streaming loader for (gzipped) JSON-lines dumps
+
+The Amazon review and metadata files are read as raw line batches by the
+calling process (which also does the gzip decompression) and parsed by a
+process pool. Workers keep only the requested fields, coerce them to a fixed
+Arrow type and return a typed columnar table, so raw records are never held
+as a list of dicts and peak memory is bounded by a few batches.
+"""
+import gzip
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from loguru import logger
+
+# (source field or alternative source fields, output column, Arrow type)
+ColumnSpec = Tuple[Union[str, Tuple[str, ...]], str, pa.DataType]
+
+REVIEW_COLUMNS: List[ColumnSpec] = [
+    ('reviewerID', 'user_id', pa.string()),
+    ('asin', 'product_id', pa.string()),
+    ('overall', 'rating', pa.float32()),
+    ('unixReviewTime', 'timestamp', pa.int64()),
+]
+
+METADATA_COLUMNS: List[ColumnSpec] = [
+    ('asin', 'product_id', pa.string()),
+    ('title', 'name', pa.string()),
+    ('description', 'description', pa.string()),
+    ('price', 'price', pa.string()),
+    (('category', 'categories'), 'categories', pa.list_(pa.string())),
+    ('brand', 'brand', pa.string()),
+]
+
+
+def _coerce(value, arrow_type: pa.DataType):
+    """Best-effort conversion of a JSON value to arrow_type (None when impossible)"""
+    if value is None:
+        return None
+    if pa.types.is_string(arrow_type):
+        if isinstance(value, list):
+            # e.g. metadata descriptions split into paragraphs
+            return ' '.join(str(v) for v in value)
+        return str(value)
+    if pa.types.is_floating(arrow_type):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    if pa.types.is_integer(arrow_type):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    if pa.types.is_list(arrow_type):
+        if not isinstance(value, list):
+            value = [value]
+        # Older dumps nest category paths as lists of lists
+        flat = []
+        for item in value:
+            flat.extend(item if isinstance(item, list) else [item])
+        return [_coerce(item, arrow_type.value_type) for item in flat]
+    return value
+
+
+def _get_field(record: dict, source):
+    if isinstance(source, str):
+        return record.get(source)
+    for key in source:
+        if key in record:
+            return record[key]
+    return None
+
+
+def _parse_batch(payload: bytes, columns: Sequence[ColumnSpec]) -> Tuple[pa.Table, int]:
+    """Parse newline-separated JSON records into a typed table (runs in a worker)"""
+    values = [[] for _ in columns]
+    n_bad = 0
+
+    for line in payload.splitlines():
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            n_bad += 1
+            continue
+        for column, (source, _, arrow_type) in zip(values, columns):
+            column.append(_coerce(_get_field(record, source), arrow_type))
+
+    table = pa.Table.from_arrays(
+        [pa.array(column, type=arrow_type) for column, (_, _, arrow_type) in zip(values, columns)],
+        names=[name for _, name, _ in columns]
+    )
+    return table, n_bad
+
+
+def _iter_payloads(path: Path, batch_lines: int, max_lines: Optional[int]) -> Iterator[bytes]:
+    """Yield raw byte batches of at most batch_lines lines"""
+    opener = gzip.open if path.suffix == '.gz' else open
+    remaining = max_lines
+    with opener(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            size = batch_lines if remaining is None else min(batch_lines, remaining)
+            lines = []
+            for line in f:
+                lines.append(line)
+                if len(lines) >= size:
+                    break
+            if not lines:
+                return
+            if remaining is not None:
+                remaining -= len(lines)
+            yield b''.join(lines)
+
+
+def iter_jsonl_tables(
+    path: str,
+    columns: Sequence[ColumnSpec],
+    max_lines: Optional[int] = None,
+    batch_lines: int = 50_000,
+    n_workers: Optional[int] = None
+) -> Iterator[pa.Table]:
+    """
+    Stream a JSON-lines file as typed Arrow tables, in file order
+
+    Args:
+        path: .json or .json.gz file
+        columns: Fields to keep as (source field, output column, Arrow type)
+        max_lines: Stop after this many lines
+        batch_lines: Lines per batch / output table
+        n_workers: Parsing processes (defaults to min(4, CPUs); 1 parses inline)
+    """
+    path = Path(path)
+    columns = list(columns)
+    n_workers = n_workers or min(4, os.cpu_count() or 1)
+    n_rows = n_bad = 0
+
+    if n_workers == 1:
+        for payload in _iter_payloads(path, batch_lines, max_lines):
+            table, bad = _parse_batch(payload, columns)
+            n_rows += table.num_rows
+            n_bad += bad
+            yield table
+    else:
+        # Bounded read-ahead: decompression continues while workers parse
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            pending = deque()
+            for payload in _iter_payloads(path, batch_lines, max_lines):
+                pending.append(pool.submit(_parse_batch, payload, columns))
+                if len(pending) >= 2 * n_workers:
+                    table, bad = pending.popleft().result()
+                    n_rows += table.num_rows
+                    n_bad += bad
+                    yield table
+            while pending:
+                table, bad = pending.popleft().result()
+                n_rows += table.num_rows
+                n_bad += bad
+                yield table
+
+    if n_bad:
+        logger.warning(f"Skipped {n_bad} malformed lines in {path.name}")
+    logger.info(f"Streamed {n_rows} records from {path.name}")
+
+
+def read_jsonl(path: str, columns: Sequence[ColumnSpec], **kwargs) -> pa.Table:
+    """Read a JSON-lines file into a single typed Arrow table"""
+    tables = list(iter_jsonl_tables(path, columns, **kwargs))
+    if not tables:
+        return pa.schema([(name, arrow_type) for _, name, arrow_type in columns]).empty_table()
+    return pa.concat_tables(tables)
+
+
+def jsonl_to_parquet(path: str, output: str, columns: Sequence[ColumnSpec], **kwargs) -> Path:
+    """Convert a JSON-lines file to Parquet, one row group per parsed batch"""
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    schema = pa.schema([(name, arrow_type) for _, name, arrow_type in columns])
+
+    with pq.ParquetWriter(str(output), schema, compression='zstd') as writer:
+        for table in iter_jsonl_tables(path, columns, **kwargs):
+            writer.write_table(table)
+
+    return output
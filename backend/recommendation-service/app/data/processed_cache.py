@@ -0,0 +1,200 @@
+"""
+Fingerprinted cache of processed interaction datasets
+
+Each entry lives in `<root>/<fingerprint>/`, where the fingerprint hashes the
+processing parameters and the content of the source files (SHA-256 from the
+download manifest, size/mtime otherwise). Changing the category, the review
+limit or the source dump therefore produces a new entry instead of silently
+reusing the old one.
+
+An entry holds:
+- interactions/: hive-partitioned Parquet (by user bucket) with int32
+  user_code/product_code columns instead of repeated id strings
+- user_ids.npy / product_ids.npy: code -> id arrays (no JSON mappings)
+- meta.json: parameters, row count and creation time
+
+Loads go through pyarrow.dataset, so only the requested columns are read.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from loguru import logger
+
+from ..models.id_index import IdIndex
+from .downloader import MANIFEST_FILE as DOWNLOAD_MANIFEST
+
+CACHE_FORMAT_VERSION = 1
+META_FILE = "meta.json"
+
+
+def _file_fingerprint(path: Path) -> Dict:
+    """Content hash from the download manifest when known, size/mtime otherwise"""
+    path = Path(path)
+    manifest_path = path.parent / DOWNLOAD_MANIFEST
+    if manifest_path.exists():
+        with open(manifest_path, 'r') as f:
+            entry = json.load(f).get(path.name)
+        if entry is not None and entry.get('size') == path.stat().st_size:
+            return {'name': path.name, 'sha256': entry['sha256']}
+    stat = path.stat()
+    return {'name': path.name, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class ProcessedDataCache:
+    """
+    Directory of processed datasets keyed by input fingerprint
+
+    Args:
+        root: Cache directory
+        max_entries: Entries kept; the least recently used are evicted
+        rows_per_bucket: Target rows per user-bucket partition
+    """
+
+    def __init__(self, root: str, max_entries: int = 3, rows_per_bucket: int = 2_000_000):
+        self.root = Path(root)
+        self.max_entries = max_entries
+        self.rows_per_bucket = rows_per_bucket
+
+    @staticmethod
+    def fingerprint(params: Dict, source_files: Sequence[Path] = ()) -> str:
+        payload = {
+            'format_version': CACHE_FORMAT_VERSION,
+            'params': params,
+            'sources': [_file_fingerprint(p) for p in source_files],
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+    def _entry(self, key: str) -> Path:
+        return self.root / key
+
+    def __contains__(self, key: str) -> bool:
+        return (self._entry(key) / META_FILE).exists()
+
+    def save(self, key: str, interactions_df: pd.DataFrame, params: Optional[Dict] = None) -> Path:
+        """Encode ids, write the entry atomically and evict stale entries"""
+        user_codes, user_index = IdIndex.factorize(interactions_df['user_id'])
+        product_codes, product_index = IdIndex.factorize(interactions_df['product_id'])
+
+        n_buckets = int(min(64, max(1, len(interactions_df) // self.rows_per_bucket)))
+        columns = {
+            'user_code': pa.array(user_codes),
+            'product_code': pa.array(product_codes),
+            'user_bucket': pa.array((user_codes % n_buckets).astype(np.int32)),
+        }
+        for name in interactions_df.columns:
+            if name not in ('user_id', 'product_id'):
+                columns[name] = pa.array(interactions_df[name].to_numpy())
+        table = pa.table(columns)
+
+        entry = self._entry(key)
+        tmp = self.root / f".{key}.tmp-{os.getpid()}"
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        tmp.mkdir(parents=True)
+
+        ds.write_dataset(
+            table,
+            tmp / 'interactions',
+            format='parquet',
+            partitioning=ds.partitioning(pa.schema([('user_bucket', pa.int32())]), flavor='hive'),
+            existing_data_behavior='overwrite_or_ignore'
+        )
+        np.save(tmp / 'user_ids.npy', user_index.ids, allow_pickle=False)
+        np.save(tmp / 'product_ids.npy', product_index.ids, allow_pickle=False)
+        with open(tmp / META_FILE, 'w') as f:
+            json.dump({
+                'fingerprint': key,
+                'params': params or {},
+                'n_rows': len(interactions_df),
+                'n_users': len(user_index),
+                'n_products': len(product_index),
+                'created_at': pd.Timestamp.now().isoformat(),
+            }, f, indent=2, default=str)
+
+        if entry.exists():
+            shutil.rmtree(entry)
+        os.replace(tmp, entry)
+        logger.info(f"Processed data cached to {entry} ({len(interactions_df)} rows, {n_buckets} partitions)")
+
+        self.evict(keep=key)
+        return entry
+
+    def dataset(self, key: str) -> ds.Dataset:
+        """Lazy handle on the coded interactions (nothing is read yet)"""
+        return ds.dataset(self._entry(key) / 'interactions', format='parquet', partitioning='hive')
+
+    def mappings(self, key: str) -> Dict:
+        """code -> id arrays wrapped as IdIndex"""
+        entry = self._entry(key)
+        user_ids = np.load(entry / 'user_ids.npy', mmap_mode='r', allow_pickle=False)
+        product_ids = np.load(entry / 'product_ids.npy', mmap_mode='r', allow_pickle=False)
+        return {
+            'user_id_map': IdIndex(user_ids),
+            'product_id_map': IdIndex(product_ids),
+            'idx_to_user': user_ids,
+            'idx_to_product': product_ids,
+        }
+
+    def load(self, key: str, columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Dict]:
+        """
+        Read an entry, projecting to columns (default: everything but the bucket)
+
+        user_id / product_id come back as pandas Categoricals over the stored
+        id arrays, so ids are never repeated per row.
+
+        Returns:
+            Tuple of (interactions_df, mappings)
+        """
+        dataset = self.dataset(key)
+        available = [name for name in dataset.schema.names if name != 'user_bucket']
+        wanted = columns or ['user_id', 'product_id'] + [
+            name for name in available if name not in ('user_code', 'product_code')
+        ]
+
+        # user_id / product_id are decoded from their code columns
+        read = [{'user_id': 'user_code', 'product_id': 'product_code'}.get(name, name) for name in wanted]
+        table = dataset.to_table(columns=read)
+        mappings = self.mappings(key)
+
+        data = {}
+        for name, source in zip(wanted, read):
+            values = table.column(source).to_numpy()
+            if name == 'user_id':
+                data[name] = pd.Categorical.from_codes(values, categories=pd.Index(mappings['idx_to_user']))
+            elif name == 'product_id':
+                data[name] = pd.Categorical.from_codes(values, categories=pd.Index(mappings['idx_to_product']))
+            else:
+                data[name] = values
+
+        # Recency for LRU eviction
+        os.utime(self._entry(key) / META_FILE)
+        return pd.DataFrame(data), mappings
+
+    def evict(self, keep: Optional[str] = None):
+        """Delete entries beyond max_entries (least recently used first) and leftovers"""
+        if not self.root.exists():
+            return
+        entries = []
+        for path in self.root.iterdir():
+            if path.name.startswith('.'):
+                # Temporary directory of an interrupted save
+                if path.is_dir() and time.time() - path.stat().st_mtime > 3600:
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            if (path / META_FILE).exists():
+                entries.append((path.name == keep, (path / META_FILE).stat().st_mtime, path))
+
+        entries.sort(reverse=True)
+        for _, _, path in entries[self.max_entries:]:
+            logger.info(f"Evicting processed data cache entry {path.name}")
+            shutil.rmtree(path, ignore_errors=True)
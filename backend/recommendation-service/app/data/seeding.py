@@ -0,0 +1,359 @@
+"""
+Synthetic interaction seeding and bulk MySQL ingestion
+
+One generator replaces the per-row loops duplicated in init_data.py,
+scripts/init_database.py and setup_and_train.py. Users get a taste profile
+(tech lover, gamer, ...) that biases which products they touch; rows are
+drawn with NumPy a chunk of users at a time, so staging volumes (millions
+of rows) never sit in a Python list.
+
+bulk_insert() writes those chunks with multi-row executemany batches
+(mysql-connector rewrites INSERT ... VALUES into one statement per batch)
+or with LOAD DATA LOCAL INFILE from a temporary CSV, committing per batch
+(executemany) or per chunk (LOAD DATA) and reporting throughput.
+"""
+import csv
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+INTERACTIONS_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS user_interactions (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        product_id INT NOT NULL,
+        interaction_type VARCHAR(20) NOT NULL,
+        rating FLOAT DEFAULT NULL,
+        quantity INT DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_user_id (user_id),
+        INDEX idx_product_id (product_id),
+        INDEX idx_interaction_type (interaction_type)
+    )
+"""
+
+INTERACTION_COLUMNS = ['user_id', 'product_id', 'interaction_type', 'rating', 'quantity', 'created_at']
+
+# Product IDs that exist in the products table (from data.sql)
+PRODUCT_IDS = list(range(1, 55))  # Products 1-54
+
+# Category preferences for different user types
+USER_PREFERENCES = {
+    'tech_lover': {
+        'categories': [1, 8, 6],  # Electronics, Audio, Gaming
+        'products': [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 12, 13, 14, 43, 44, 45],
+        'weight': 0.8,
+        'share': 1,
+    },
+    'home_decorator': {
+        'categories': [3, 2],  # Smart Home, Accessories
+        'products': [25, 26, 27, 28, 29, 30, 18, 23, 24],
+        'weight': 0.7,
+        'share': 1,
+    },
+    'fashionista': {
+        'categories': [4],  # Fashion
+        'products': [31, 32, 33, 34, 35, 36],
+        'weight': 0.75,
+        'share': 1,
+    },
+    'fitness_enthusiast': {
+        'categories': [5],  # Sports
+        'products': [37, 38, 39, 40, 41, 42],
+        'weight': 0.7,
+        'share': 1,
+    },
+    'photographer': {
+        'categories': [7],  # Photo & Video
+        'products': [49, 50, 51, 52, 53, 54],
+        'weight': 0.75,
+        'share': 1,
+    },
+    'gamer': {
+        'categories': [6, 1],  # Gaming, Electronics
+        'products': [43, 44, 45, 46, 47, 48, 9],
+        'weight': 0.8,
+        'share': 1,
+    },
+    'general': {
+        'categories': list(range(1, 9)),
+        'products': PRODUCT_IDS,
+        'weight': 0.5,
+        'share': 2,  # More 'general' users
+    },
+}
+
+INTERACTION_TYPES = np.array(['view', 'add_to_cart', 'purchase', 'rating'])
+INTERACTION_TYPE_WEIGHTS = np.array([50, 25, 15, 10]) / 100
+
+
+class InteractionSeedGenerator:
+    """
+    Vectorized generator of synthetic user_interactions rows
+
+    Args:
+        product_ids: Products that exist in the catalog
+        preferences: User types (see USER_PREFERENCES); their product lists
+            are restricted to product_ids
+        min_per_user / max_per_user: Interactions per user, drawn uniformly
+        days: Timestamps are spread over the last `days` days
+        seed: Random seed (None = non-deterministic)
+    """
+
+    def __init__(
+        self,
+        product_ids: Sequence[int] = PRODUCT_IDS,
+        preferences: Dict[str, dict] = USER_PREFERENCES,
+        min_per_user: int = 5,
+        max_per_user: int = 25,
+        days: int = 90,
+        seed: Optional[int] = None
+    ):
+        self.product_ids = np.asarray(product_ids, dtype=np.int64)
+        self.min_per_user = min_per_user
+        self.max_per_user = max(min_per_user, max_per_user)
+        self.days = days
+        self.rng = np.random.default_rng(seed)
+
+        # Preferred products per type as a padded (n_types, max_len) table
+        preferred = [np.intersect1d(prefs['products'], self.product_ids) for prefs in preferences.values()]
+        preferred = [products if len(products) else self.product_ids for products in preferred]
+        self.n_preferred = np.array([len(p) for p in preferred])
+        self.preferred = np.zeros((len(preferred), self.n_preferred.max()), dtype=np.int64)
+        for i, products in enumerate(preferred):
+            self.preferred[i, :len(products)] = products
+        self.preference_weight = np.array([prefs['weight'] for prefs in preferences.values()])
+        shares = np.array([prefs.get('share', 1) for prefs in preferences.values()], dtype=np.float64)
+        self.type_probabilities = shares / shares.sum()
+
+    def _generate_users(self, first_user: int, n_users: int) -> pd.DataFrame:
+        rng = self.rng
+        user_types = rng.choice(len(self.type_probabilities), size=n_users, p=self.type_probabilities)
+        counts = rng.integers(self.min_per_user, self.max_per_user + 1, size=n_users)
+
+        user_ids = np.repeat(np.arange(first_user, first_user + n_users), counts)
+        types = np.repeat(user_types, counts)
+        n = len(user_ids)
+
+        # Choose product based on preferences
+        use_preferred = rng.random(n) < self.preference_weight[types]
+        preferred_pick = (rng.random(n) * self.n_preferred[types]).astype(np.int64)
+        products = np.where(
+            use_preferred,
+            self.preferred[types, preferred_pick],
+            self.product_ids[rng.integers(0, len(self.product_ids), size=n)]
+        )
+        in_preferences = use_preferred | (self.preferred[types] == products[:, None]).any(axis=1)
+
+        kinds = rng.choice(len(INTERACTION_TYPES), size=n, p=INTERACTION_TYPE_WEIGHTS)
+
+        # Ratings only for 'rating' rows; users rate products they like higher
+        base_rating = np.where(in_preferences, 3.5, 3.0)
+        rating = np.clip(base_rating + rng.normal(0.5, 0.8, size=n), 1.0, 5.0).round(1)
+        rating = np.where(INTERACTION_TYPES[kinds] == 'rating', rating, np.nan)
+
+        # Quantity (for purchases)
+        quantity = np.where(
+            INTERACTION_TYPES[kinds] == 'purchase',
+            rng.choice([1, 2, 3], size=n, p=[0.7, 0.2, 0.1]),
+            1
+        )
+
+        # Random timestamp in the last `days` days
+        seconds_ago = rng.integers(0, self.days + 1, size=n) * 86400 + rng.integers(0, 24, size=n) * 3600
+        now = np.datetime64(datetime.now().replace(microsecond=0), 's')
+        created_at = now - seconds_ago.astype('timedelta64[s]')
+
+        return pd.DataFrame({
+            'user_id': user_ids,
+            'product_id': products,
+            'interaction_type': INTERACTION_TYPES[kinds],
+            'rating': rating,
+            'quantity': quantity,
+            'created_at': created_at,
+        })
+
+    def iter_chunks(self, num_users: int, chunk_rows: int = 50_000, first_user: int = 1) -> Iterator[pd.DataFrame]:
+        """Yield DataFrames of about chunk_rows rows covering users first_user..first_user+num_users-1"""
+        users_per_chunk = max(1, chunk_rows * 2 // (self.min_per_user + self.max_per_user))
+        for start in range(0, num_users, users_per_chunk):
+            yield self._generate_users(first_user + start, min(users_per_chunk, num_users - start))
+
+    def generate(self, num_users: int) -> pd.DataFrame:
+        return pd.concat(list(self.iter_chunks(num_users)), ignore_index=True)
+
+
+@dataclass
+class LoadReport:
+    table: str
+    method: str
+    rows: int = 0
+    failed_rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        failed = f", {self.failed_rows} failed" if self.failed_rows else ""
+        return (
+            f"{self.rows} rows into {self.table} via {self.method} in {self.seconds:.2f}s "
+            f"({self.rows_per_second:,.0f} rows/s{failed})"
+        )
+
+
+def _to_rows(chunk: pd.DataFrame, columns: List[str]) -> List[tuple]:
+    """Python tuples with NaN/NaT as None and NumPy scalars unboxed for the driver"""
+    frame = chunk[columns].astype(object)
+    frame = frame.where(chunk[columns].notna(), None)
+    rows = []
+    for row in frame.itertuples(index=False, name=None):
+        rows.append(tuple(
+            value.to_pydatetime() if isinstance(value, pd.Timestamp) else
+            value.item() if isinstance(value, np.generic) else value
+            for value in row
+        ))
+    return rows
+
+
+def _insert_executemany(conn, table: str, columns: List[str], chunk: pd.DataFrame, batch_rows: int, report: LoadReport):
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    rows = _to_rows(chunk, columns)
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(rows), batch_rows):
+            batch = rows[start:start + batch_rows]
+            try:
+                cursor.executemany(query, batch)
+                # Commit per batch so a later failure cannot roll back rows already counted
+                conn.commit()
+                report.rows += len(batch)
+            except Exception as e:
+                # Only this batch is uncommitted; find the offending rows instead of dropping it
+                logger.warning(f"Batch insert into {table} failed ({e}), retrying row by row")
+                conn.rollback()
+                for row in batch:
+                    try:
+                        cursor.execute(query, row)
+                        conn.commit()
+                        report.rows += 1
+                    except Exception as row_error:
+                        conn.rollback()
+                        report.failed_rows += 1
+                        logger.warning(f"Skipping row {row[:3]}...: {row_error}")
+    finally:
+        cursor.close()
+
+
+def _insert_load_data(conn, table: str, columns: List[str], chunk: pd.DataFrame, report: LoadReport):
+    fd, path = tempfile.mkstemp(suffix='.csv', prefix=f'{table}-')
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            # With no escape character, an unquoted NULL field loads as SQL NULL
+            chunk[columns].to_csv(
+                f, header=False, index=False, na_rep='NULL', quoting=csv.QUOTE_MINIMAL,
+                date_format='%Y-%m-%d %H:%M:%S', lineterminator='\n'
+            )
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} "
+                "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                f"LINES TERMINATED BY '\\n' ({', '.join(columns)})",
+                (path,)
+            )
+            report.rows += cursor.rowcount
+            conn.commit()
+        finally:
+            cursor.close()
+    finally:
+        os.unlink(path)
+
+
+def bulk_insert(
+    conn,
+    table: str,
+    chunks: Iterable[pd.DataFrame],
+    columns: Optional[List[str]] = None,
+    method: str = 'executemany',
+    batch_rows: int = 5000,
+    progress_every: float = 5.0
+) -> LoadReport:
+    """
+    Insert DataFrame chunks into table, committing after each executemany
+    batch (or each chunk for LOAD DATA)
+
+    Args:
+        conn: mysql-connector connection (allow_local_infile=True for 'load_data')
+        table: Destination table (trusted identifier, not user input)
+        chunks: DataFrames whose columns include `columns`
+        columns: Columns to insert (defaults to the first chunk's columns)
+        method: 'executemany' (multi-row INSERT batches) or 'load_data'
+            (LOAD DATA LOCAL INFILE; falls back to executemany when refused)
+        batch_rows: Rows per INSERT statement for executemany
+        progress_every: Seconds between progress log lines
+
+    Returns:
+        LoadReport with row counts and throughput
+    """
+    if method not in ('executemany', 'load_data'):
+        raise ValueError(f"Unknown bulk insert method: {method}")
+
+    report = LoadReport(table=table, method=method)
+    start = last_progress = time.perf_counter()
+
+    for chunk in chunks:
+        columns = columns or list(chunk.columns)
+        if report.method == 'load_data':
+            try:
+                _insert_load_data(conn, table, columns, chunk, report)
+            except Exception as e:
+                # local_infile disabled on the server or the client
+                logger.warning(f"LOAD DATA LOCAL INFILE refused ({e}), using executemany")
+                conn.rollback()
+                report.method = 'executemany'
+        if report.method == 'executemany':
+            _insert_executemany(conn, table, columns, chunk, batch_rows, report)
+
+        now = time.perf_counter()
+        if now - last_progress >= progress_every:
+            logger.info(f"{table}: {report.rows} rows ({report.rows / (now - start):,.0f} rows/s)")
+            last_progress = now
+
+    report.seconds = time.perf_counter() - start
+    logger.info(f"Bulk load finished: {report}")
+    return report
+
+
+def seed_interactions(
+    conn,
+    num_users: int = 150,
+    max_per_user: int = 25,
+    product_ids: Sequence[int] = PRODUCT_IDS,
+    method: str = 'executemany',
+    chunk_rows: int = 50_000,
+    batch_rows: int = 5000,
+    seed: Optional[int] = None
+) -> LoadReport:
+    """Create user_interactions if needed and fill it with generated rows"""
+    cursor = conn.cursor()
+    cursor.execute(INTERACTIONS_TABLE_DDL)
+    cursor.close()
+
+    generator = InteractionSeedGenerator(product_ids=product_ids, max_per_user=max_per_user, seed=seed)
+    return bulk_insert(
+        conn,
+        'user_interactions',
+        generator.iter_chunks(num_users, chunk_rows=chunk_rows),
+        columns=INTERACTION_COLUMNS,
+        method=method,
+        batch_rows=batch_rows
+    )
@@ -0,0 +1,150 @@
+"""
+Bounded executors for CPU-bound scoring and blocking DB calls
+
+Async handlers hand blocking work to a pool instead of running it on the
+event loop. Each pool admits at most max_workers + max_queue jobs; beyond
+that ExecutorSaturated is raised and the API answers 503 with Retry-After.
+"""
+import asyncio
+import contextvars
+import functools
+import time
+from collections import deque
+from contextlib import suppress
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+
+from app.profiling import record
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a pool's queue is full"""
+
+    def __init__(self, pool_name: str, retry_after: int):
+        super().__init__(f"Executor '{pool_name}' is saturated")
+        self.pool_name = pool_name
+        self.retry_after = retry_after
+
+
+def _call_with_start_time(fn: Callable, args: tuple, kwargs: dict) -> Tuple[float, Any]:
+    # Module-level so it can be pickled into process pools; time.time() is
+    # comparable across processes, perf_counter is not.
+    started_at = time.time()
+    return started_at, fn(*args, **kwargs)
+
+
+class BoundedExecutor:
+    """
+    Thread or process pool with a bounded queue and wait-time accounting
+
+    Must be used from the event loop thread (admission bookkeeping is not
+    locked). With kind='process' the callable and its arguments must be
+    picklable.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        max_queue: int,
+        kind: str = "thread",
+        retry_after: int = 1
+    ):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+
+        if kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        elif kind == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-pool")
+        else:
+            raise ValueError(f"Unknown executor kind: {kind}. Choose 'thread' or 'process'")
+
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._recent_waits = deque(maxlen=1024)
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs admitted but not yet picked up by a worker (upper bound)"""
+        return max(0, self.in_flight - self.max_workers)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the pool, raising ExecutorSaturated when full"""
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ExecutorSaturated(self.name, self.retry_after)
+
+        self.in_flight += 1
+        self.submitted += 1
+        enqueued_at = time.time()
+        loop = asyncio.get_running_loop()
+
+        try:
+            if self.kind == "thread":
+                # Run in a copy of the request's context so stage timings reach its Server-Timing
+                future = self._executor.submit(
+                    contextvars.copy_context().run, _call_with_start_time, fn, args, kwargs
+                )
+            else:
+                future = self._executor.submit(_call_with_start_time, fn, args, kwargs)
+        except Exception:
+            self.in_flight -= 1
+            self.failed += 1
+            raise
+        # Release the slot when the pool job ends, not when the awaiting request
+        # does: a cancelled request (client disconnect) leaves the job running
+        future.add_done_callback(functools.partial(self._release, loop))
+
+        try:
+            started_at, result = await asyncio.wrap_future(future, loop=loop)
+        except Exception:
+            self.failed += 1
+            raise
+
+        wait = max(0.0, started_at - enqueued_at)
+        self.completed += 1
+        self.wait_seconds_total += wait
+        self.wait_seconds_max = max(self.wait_seconds_max, wait)
+        self._recent_waits.append(wait)
+        record(f'{self.name}_queue', wait)
+
+        return result
+
+    def _release(self, loop: asyncio.AbstractEventLoop, future):
+        # Called from the pool's thread; admission bookkeeping lives on the loop
+        with suppress(RuntimeError):  # loop already closed at shutdown
+            loop.call_soon_threadsafe(self._decrement_in_flight)
+
+    def _decrement_in_flight(self):
+        self.in_flight -= 1
+
+    def stats(self) -> Dict:
+        recent = np.array(self._recent_waits) if self._recent_waits else np.zeros(1)
+        return {
+            'kind': self.kind,
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'in_flight': self.in_flight,
+            'queue_depth': self.queue_depth,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'wait_seconds_avg': self.wait_seconds_total / self.completed if self.completed else 0.0,
+            'wait_seconds_p95': float(np.percentile(recent, 95)),
+            'wait_seconds_max': self.wait_seconds_max,
+        }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
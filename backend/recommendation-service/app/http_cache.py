@@ -0,0 +1,34 @@
+"""
+HTTP caching helpers (ETag / If-None-Match, Cache-Control)
+
+Responses that are a pure function of the serving model version (or the
+popularity snapshot) and the request parameters get an ETag derived from
+exactly those inputs, so it can be computed and compared before any
+scoring happens: a matching If-None-Match is answered 304 straight away.
+"""
+import hashlib
+from typing import Optional
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the values that determine a response"""
+    digest = hashlib.blake2b(':'.join(str(part) for part in parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/ prefixes are ignored"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return any(
+        candidate == '*' or candidate.removeprefix('W/') == etag
+        for candidate in candidates
+    )
+
+
+def cache_headers(etag: str, max_age: int) -> dict:
+    return {
+        'ETag': etag,
+        'Cache-Control': f'public, max-age={max(0, int(max_age))}',
+    }
@@ -1,11 +1,16 @@
 import os
 import sys
+import asyncio
+import functools
 from pathlib import Path
-from typing import List, Optional
-from contextlib import asynccontextmanager
+from typing import Annotated, List, Optional, Tuple
+from contextlib import asynccontextmanager, suppress
 
-from fastapi import FastAPI, HTTPException, Query
+import numpy as np
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.routing import APIRoute
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel, Field
 from loguru import logger
 
@@ -13,7 +18,16 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from config import settings
 from app.models.recommender import HybridRecommender
+from app.models.precomputed import PrecomputedTopN
 from app.data.database import DatabaseLoader
+from app.cache import RecommendationCache, cache_key
+from app.model_loader import load_and_validate, call_model_method
+from app.executor import BoundedExecutor, ExecutorSaturated
+from app.popularity import WINDOWS, PopularityAggregator, TopList
+from app.product_attributes import ProductAttributeStore, ProductFilter
+from app.http_cache import cache_headers, etag_matches, make_etag
+from app.metrics import CONTENT_TYPE, MetricsMiddleware, MetricsRegistry, RequestMetrics, gauge, set_strategy
+from app.profiling import ServerTimingMiddleware, folded, mark_handler, sample_stacks, stage
 
 
 class ProductRecommendation(BaseModel):
@@ -29,6 +43,24 @@ class UserRecommendationsResponse(BaseModel):
     strategy_used: str
 
 
+class RecommendationFilters(BaseModel):
+    in_stock: bool = Field(default=False, description="Only products with stock > 0")
+    categories: List[str] = Field(default_factory=list, description="Category names or ids (any of)")
+    min_price: Optional[float] = Field(default=None, ge=0)
+    max_price: Optional[float] = Field(default=None, ge=0)
+
+
+class BatchRecommendationsRequest(BaseModel):
+    user_ids: List[str] = Field(..., min_length=1, max_length=settings.BATCH_MAX_USERS)
+    limit: int = Field(default=10, ge=1, le=50, description="Number of recommendations per user")
+    filters: Optional[RecommendationFilters] = None
+
+
+class BatchRecommendationsResponse(BaseModel):
+    results: List[UserRecommendationsResponse]
+    total: int
+
+
 class SimilarProductsResponse(BaseModel):
     product_id: str
     similar_products: List[ProductRecommendation]
@@ -48,42 +80,436 @@ class HealthResponse(BaseModel):
 
 class StatsResponse(BaseModel):
     is_trained: bool
+    model_version: Optional[str] = None
     n_users: int
     n_products: int
     n_factors: int
+    algorithm: str = "svd"
     has_content_features: bool
+    has_neighbor_index: bool = False
+    has_ann_index: bool = False
 
 
 recommender: Optional[HybridRecommender] = None
 db_loader: Optional[DatabaseLoader] = None
+recommendation_cache: Optional[RecommendationCache] = None
+model_load_report: Optional[dict] = None
+scoring_executor: Optional[BoundedExecutor] = None
+db_executor: Optional[BoundedExecutor] = None
+popularity_aggregator: Optional[PopularityAggregator] = None
+popularity_task: Optional[asyncio.Task] = None
+precomputed: Optional[PrecomputedTopN] = None
+product_attributes: Optional[ProductAttributeStore] = None
+product_attributes_task: Optional[asyncio.Task] = None
+cache_purge_task: Optional[asyncio.Task] = None
+
+# Serializes /refresh calls; requests keep using the current model meanwhile
+refresh_lock = asyncio.Lock()
+
+metrics_registry = MetricsRegistry()
+request_metrics = RequestMetrics(metrics_registry, prefix='shopai_http')
+
+# One profiling session at a time per worker
+profile_lock = asyncio.Lock()
+
+
+def parse_id(value: str):
+    """IDs are stored as int when numeric (MySQL) and as str otherwise (Amazon)"""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+async def score(model: HybridRecommender, method: str, *args, **kwargs):
+    """Run a model method on the scoring executor"""
+    if scoring_executor.kind == 'process':
+        return await scoring_executor.run(
+            call_model_method, model.source_path, model.model_version, method, args, kwargs
+        )
+    return await scoring_executor.run(getattr(model, method), *args, **kwargs)
+
+
+async def cached(model: HybridRecommender, kind: str, params: tuple, method: str, *args, **kwargs):
+    """Serve from the recommendation cache, keyed by the model's version, scoring on a miss"""
+    if recommendation_cache is None:
+        return await score(model, method, *args, **kwargs)
+    
+    # Only the in-memory LRU runs on the loop; backend I/O (SQLite) goes to a thread
+    key = cache_key(kind, model.model_version, *params)
+    with stage('cache'):
+        value = recommendation_cache.get_memory(key)
+        if value is None:
+            if recommendation_cache.backend is not None:
+                value = await asyncio.to_thread(recommendation_cache.get_backend, key)
+            else:
+                value = recommendation_cache.get_backend(key)
+    if value is None:
+        value = await score(model, method, *args, **kwargs)
+        with stage('cache'):
+            recommendation_cache.set_memory(key, value)
+            if recommendation_cache.backend is not None:
+                await asyncio.to_thread(recommendation_cache.set_backend, key, value)
+    return value
+
+
+def product_filter_params(
+    in_stock: bool = Query(default=False, description="Only products with stock > 0"),
+    category: Optional[List[str]] = Query(default=None, description="Category names or ids (repeatable, any of)"),
+    min_price: Optional[float] = Query(default=None, ge=0, description="Minimum price"),
+    max_price: Optional[float] = Query(default=None, ge=0, description="Maximum price")
+) -> ProductFilter:
+    """Business-rule filter query parameters shared by the recommendation endpoints"""
+    return build_product_filter(in_stock, category, min_price, max_price)
+
+
+def build_product_filter(in_stock: bool, categories, min_price: Optional[float], max_price: Optional[float]) -> ProductFilter:
+    try:
+        return ProductFilter.create(in_stock, categories, min_price, max_price)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def resolve_item_filter(model: HybridRecommender, product_filter: ProductFilter) -> Tuple[Optional[np.ndarray], tuple]:
+    """
+    Compile a request filter against the attributes aligned to the serving model
+    
+    Returns:
+        Tuple of (eligible-item mask or None, extra cache key parameters)
+    """
+    if product_filter.is_empty:
+        return None, ()
+    
+    if product_attributes is None:
+        # Off by configuration: retrying will not help
+        raise HTTPException(status_code=400, detail="Product filters are disabled (PRODUCT_FILTERS_ENABLED=false)")
+    
+    attributes = product_attributes.get(model)
+    if attributes is None:
+        raise HTTPException(status_code=503, detail="Product attributes are not loaded yet; filters are unavailable")
+    
+    with stage('filter'):
+        return attributes.compile(product_filter), (product_filter.key(), attributes.version)
+
+
+def open_precomputed() -> Optional[PrecomputedTopN]:
+    """Memory-map the materialized top-N results, if enabled and present"""
+    if not settings.TOPN_ENABLED:
+        return None
+    try:
+        store = PrecomputedTopN.open(settings.TOPN_PATH)
+    except Exception as e:
+        logger.error(f"❌ Failed to open precomputed recommendations: {e}")
+        return None
+    if store is not None and recommender is not None and store.model_version != recommender.model_version:
+        logger.warning(
+            f"⚠️ Precomputed recommendations come from model {store.model_version}, "
+            f"serving {recommender.model_version}; run scripts/materialize_topn.py to refresh them"
+        )
+    return store
+
+
+def fetch_user_history(loader: DatabaseLoader, user_id: int, limit: int) -> dict:
+    history = loader.get_user_history(user_id)
+    return {
+        "user_id": user_id,
+        "purchases": history.head(limit).to_dict(orient='records'),
+        "total": len(history)
+    }
+
+
+def build_user_response(user_id: str, recommendations: List[dict]) -> UserRecommendationsResponse:
+    if recommendations:
+        strategy = recommendations[0].get('strategy', 'unknown')
+    else:
+        strategy = 'no_recommendations'
+    
+    return UserRecommendationsResponse(
+        user_id=user_id,
+        recommendations=[
+            ProductRecommendation(
+                product_id=str(r['product_id']),
+                score=r['score'],
+                strategy=r['strategy']
+            )
+            for r in recommendations
+        ],
+        total=len(recommendations),
+        strategy_used=strategy
+    )
+
+
+def resolve_popularity(category: Optional[str], window: Optional[str]):
+    """
+    Source of a popularity list and the version identifying its content
+    
+    Returns:
+        (model, model version) for the model's global ranking, (TopList,
+        snapshot time) for database lists, or (None, None) when neither exists
+    """
+    model = recommender
+    if category is None and window is None and model is not None and len(model.popular_items) > 0:
+        return model, model.model_version
+    
+    snapshot = popularity_aggregator.snapshot if popularity_aggregator else None
+    top = snapshot.get(category, window) if snapshot is not None else None
+    if top is not None:
+        return top, snapshot.refreshed_at.isoformat()
+    return None, None
+
+
+def fetch_popular_products(loader: DatabaseLoader, limit: int) -> List[dict]:
+    """Order-count ranking straight from the database (no model and no snapshot yet)"""
+    popular = loader.get_popular_products(limit=limit)
+    if popular.empty:
+        return []
+    return [
+        {'product_id': product_id, 'score': float(order_count)}
+        for product_id, order_count in zip(popular['product_id'].tolist(), popular['order_count'].tolist())
+    ]
+
+
+def build_popular_response(source, limit: int) -> PopularProductsResponse:
+    # Model and snapshot sources only slice precomputed arrays; a list comes from the DB fallback
+    if isinstance(source, HybridRecommender):
+        popular, strategy = source._get_popular_recommendations(limit), 'popularity'
+    elif isinstance(source, TopList):
+        popular, strategy = source.head(limit), 'popularity_database'
+    elif isinstance(source, list):
+        popular, strategy = source[:limit], 'popularity_database'
+    else:
+        popular, strategy = [], 'no_recommendations'
+    
+    set_strategy(strategy)
+    return PopularProductsResponse(
+        products=[
+            ProductRecommendation(
+                product_id=str(p['product_id']),
+                score=p['score'],
+                strategy=strategy
+            )
+            for p in popular
+        ],
+        total=len(popular)
+    )
+
+
+async def popular_products(limit: int) -> PopularProductsResponse:
+    """Global popularity list, the fallback when no model is loaded"""
+    source, _ = resolve_popularity(None, None)
+    if source is None and db_loader is not None:
+        # Aggregator disabled, not refreshed yet or failing: query the database off the loop
+        source = await db_executor.run(fetch_popular_products, db_loader, limit)
+    return build_popular_response(source, limit)
+
+
+@metrics_registry.register
+def collect_service_metrics():
+    """Read the counters kept by the model, cache, executors, pools and popularity aggregator"""
+    model = recommender
+    yield gauge('shopai_model_loaded', 'Whether a recommendation model is serving', int(model is not None))
+    if model is not None:
+        yield gauge('shopai_model_info', 'Serving model version', 1, {'model_version': str(model.model_version)})
+        yield gauge('shopai_model_users', 'Users known to the model', len(model.user_id_map))
+        yield gauge('shopai_model_products', 'Products known to the model', len(model.product_id_map))
+    report = model_load_report
+    if report is not None:
+        yield gauge('shopai_model_load_seconds', 'Time to load the serving model', report['load_seconds'])
+        yield gauge('shopai_model_validate_seconds', 'Time to validate the serving model', report['validate_seconds'])
+        yield gauge('shopai_model_artifact_bytes', 'Size of the serving model artifact on disk', report['artifact_bytes'])
+        yield gauge('shopai_model_load_rss_delta_bytes', 'Process RSS growth while loading the serving model', report['rss_delta_mb'] * 1024 * 1024)
+        yield gauge('shopai_model_mapped_bytes', 'Bytes of the serving model memory-mapped from disk', report['mapped_bytes'])
+    
+    if recommendation_cache is not None:
+        stats = recommendation_cache.stats()
+        yield 'shopai_cache_lookups_total', 'counter', 'Recommendation cache lookups by result', [
+            ('', {'result': 'hit'}, stats['hits']),
+            ('', {'result': 'backend_hit'}, stats['backend_hits']),
+            ('', {'result': 'miss'}, stats['misses']),
+        ]
+        yield gauge('shopai_cache_hit_ratio', 'Share of lookups served from either cache tier', stats['hit_ratio'])
+        yield gauge('shopai_cache_entries', 'Entries in the in-memory cache', stats['entries'])
+        yield 'shopai_cache_evictions_total', 'counter', 'LRU evictions', [('', {}, stats['evictions'])]
+    
+    executors = [executor for executor in (scoring_executor, db_executor) if executor is not None]
+    executor_stats = {executor.name: executor.stats() for executor in executors}
+    for name, kind, help, key in (
+        ('shopai_executor_in_flight', 'gauge', 'Jobs admitted and not finished', 'in_flight'),
+        ('shopai_executor_queue_depth', 'gauge', 'Jobs waiting for a worker', 'queue_depth'),
+        ('shopai_executor_completed_total', 'counter', 'Jobs completed', 'completed'),
+        ('shopai_executor_rejected_total', 'counter', 'Jobs rejected with 503', 'rejected'),
+        ('shopai_executor_wait_seconds_p95', 'gauge', 'Recent queue wait, 95th percentile', 'wait_seconds_p95'),
+    ):
+        yield name, kind, help, [('', {'executor': pool}, stats[key]) for pool, stats in executor_stats.items()]
+    
+    pools = db_loader.pools() if db_loader is not None else {}
+    yield 'shopai_db_query_duration_seconds', 'histogram', 'Database query duration by database', [
+        sample for database, pool in pools.items() for sample in pool.query_seconds.samples({'database': database})
+    ]
+    pool_stats = {database: pool.stats() for database, pool in pools.items()}
+    for name, kind, help, key in (
+        ('shopai_db_connections_open', 'gauge', 'Open pooled connections', 'open'),
+        ('shopai_db_connections_in_use', 'gauge', 'Connections checked out', 'in_use'),
+        ('shopai_db_query_errors_total', 'counter', 'Queries that raised', 'query_errors'),
+        ('shopai_db_acquire_timeouts_total', 'counter', 'Connection acquisitions that timed out', 'acquire_timeouts'),
+    ):
+        yield name, kind, help, [('', {'database': database}, stats[key]) for database, stats in pool_stats.items()]
+    
+    if product_attributes is not None:
+        stats = product_attributes.stats()
+        yield gauge('shopai_product_attributes_matched_items', 'Model items with stock/price/category loaded', stats['matched_items'])
+        yield 'shopai_product_attributes_refreshes_total', 'counter', 'Product attribute reloads by result', [
+            ('', {'result': 'success'}, stats['refreshes']),
+            ('', {'result': 'failure'}, stats['refresh_failures']),
+        ]
+    
+    store = precomputed
+    if store is not None:
+        stats = store.stats()
+        yield 'shopai_precomputed_lookups_total', 'counter', 'Precomputed top-N lookups by result', [
+            ('', {'result': 'hit'}, stats['hits']),
+            ('', {'result': 'miss'}, stats['misses']),
+        ]
+        yield gauge('shopai_precomputed_users', 'Users with precomputed recommendations', stats['n_users'])
+    
+    if popularity_aggregator is not None:
+        stats = popularity_aggregator.stats()
+        yield 'shopai_popularity_refreshes_total', 'counter', 'Popularity refreshes by result', [
+            ('', {'result': 'success'}, stats['refreshes']),
+            ('', {'result': 'failure'}, stats['refresh_failures']),
+        ]
+        yield gauge('shopai_popularity_last_refresh_seconds', 'Duration of the last popularity refresh', stats['last_refresh_ms'] / 1000)
+        yield gauge('shopai_popularity_order_lines', 'Order lines in the popularity aggregate', stats['order_lines'])
+
+
+async def refresh_product_attributes_periodically():
+    """Reload stock, price and category so filters follow the catalog without a retrain"""
+    while True:
+        try:
+            await db_executor.run(product_attributes.refresh, recommender)
+        except Exception as e:
+            logger.warning(f"Product attribute refresh failed: {e}")
+        await asyncio.sleep(settings.PRODUCT_ATTRIBUTES_REFRESH_SECONDS)
+
+
+async def refresh_popularity_periodically():
+    """Fold new orders into the popularity aggregate and publish a fresh snapshot"""
+    while True:
+        try:
+            await db_executor.run(popularity_aggregator.refresh)
+        except Exception as e:
+            logger.warning(f"Popularity refresh failed: {e}")
+        await asyncio.sleep(settings.POPULARITY_REFRESH_SECONDS)
+
+
+async def purge_cache_backend_periodically():
+    """Drop expired and over-capacity second-tier entries (old model versions are never read again)"""
+    while True:
+        await asyncio.sleep(settings.CACHE_PURGE_SECONDS)
+        try:
+            removed = await asyncio.to_thread(recommendation_cache.purge_backend)
+            if removed:
+                logger.info(f"Purged {removed} recommendation cache backend entries")
+        except Exception as e:
+            logger.warning(f"Recommendation cache purge failed: {e}")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global recommender, db_loader
+    global recommender, db_loader, recommendation_cache, model_load_report
+    global scoring_executor, db_executor, popularity_aggregator, popularity_task, precomputed
+    global product_attributes, product_attributes_task, cache_purge_task
     
     logger.info("🚀 Starting ShopAI Recommendation Service...")
     
     db_loader = DatabaseLoader()
     
-    model_path = Path(settings.MODEL_PATH)
+    scoring_executor = BoundedExecutor(
+        'scoring',
+        max_workers=settings.SCORING_WORKERS,
+        max_queue=settings.SCORING_QUEUE_SIZE,
+        kind=settings.SCORING_POOL_KIND,
+        retry_after=settings.EXECUTOR_RETRY_AFTER_SECONDS
+    )
+    db_executor = BoundedExecutor(
+        'db',
+        max_workers=settings.DB_WORKERS,
+        max_queue=settings.DB_QUEUE_SIZE,
+        retry_after=settings.EXECUTOR_RETRY_AFTER_SECONDS
+    )
     
-    if model_path.exists():
+    if settings.POPULARITY_ENABLED:
+        popularity_aggregator = PopularityAggregator(
+            db_loader,
+            top_n=settings.POPULARITY_TOP_N,
+            chunk_size=settings.DB_EXTRACT_CHUNK_ROWS,
+            rebuild_seconds=settings.POPULARITY_REBUILD_SECONDS
+        )
+        popularity_task = asyncio.create_task(refresh_popularity_periodically())
+    
+    if settings.CACHE_ENABLED:
+        recommendation_cache = RecommendationCache(
+            max_entries=settings.CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.CACHE_TTL_SECONDS,
+            backend=db_loader.cache_backend,
+            backend_ttl_seconds=settings.CACHE_BACKEND_TTL_SECONDS
+        )
+        if recommendation_cache.backend is not None:
+            cache_purge_task = asyncio.create_task(purge_cache_backend_periodically())
+    
+    model_path = HybridRecommender.resolve_path(settings.MODEL_PATH)
+    
+    if model_path is not None:
         try:
-            recommender = HybridRecommender.load(str(model_path))
+            recommender, model_load_report = load_and_validate(str(model_path))
             logger.info(f"✅ Model loaded successfully from {model_path}")
             logger.info(f"   Stats: {recommender.get_stats()}")
         except Exception as e:
             logger.error(f"❌ Failed to load model: {e}")
             recommender = None
     else:
-        logger.warning(f"⚠️ Model file not found at {model_path}")
+        logger.warning(f"⚠️ Model file not found at {settings.MODEL_PATH}")
         logger.warning("   Run 'python train.py' to train a model first")
         recommender = None
     
+    precomputed = open_precomputed()
+    
+    if settings.PRODUCT_FILTERS_ENABLED:
+        product_attributes = ProductAttributeStore(db_loader)
+        product_attributes_task = asyncio.create_task(refresh_product_attributes_periodically())
+    
     yield
     
     logger.info("Shutting down recommendation service...")
+    for task in (popularity_task, product_attributes_task, cache_purge_task):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    scoring_executor.shutdown(wait=False)
+    db_executor.shutdown(wait=False)
+    db_loader.close()
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute marking when the endpoint starts and returns
+    
+    Server-Timing reports the time before as 'parse' (parameter and body
+    validation) and the time after as 'serialize' (response model validation
+    and JSON rendering).
+    """
+    
+    def __init__(self, path: str, endpoint, **kwargs):
+        @functools.wraps(endpoint)
+        async def timed_endpoint(*args, **kw):
+            mark_handler(started=True)
+            try:
+                return await endpoint(*args, **kw)
+            finally:
+                mark_handler(started=False)
+        
+        super().__init__(path, timed_endpoint, **kwargs)
 
 
 app = FastAPI(
@@ -92,6 +518,13 @@ app = FastAPI(
     version="1.0.0",
     lifespan=lifespan
 )
+app.router.route_class = TimedRoute
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, metrics=request_metrics)
+
+if settings.SERVER_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
 
 # CORS Configuration
 app.add_middleware(
@@ -103,6 +536,16 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    logger.warning(f"Rejecting {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
 async def health_check():
     return HealthResponse(
@@ -114,13 +557,89 @@ async def health_check():
 
 @app.get("/stats", response_model=StatsResponse, tags=["Health"])
 async def get_stats():
-    if recommender is None:
+    model = recommender
+    if model is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
-    stats = recommender.get_stats()
+    stats = model.get_stats()
     return StatsResponse(**stats)
 
 
+@app.get("/stats/cache", tags=["Health"])
+async def get_cache_stats():
+    if recommendation_cache is None:
+        return {"enabled": False}
+    
+    return {"enabled": True, **recommendation_cache.stats()}
+
+
+@app.get("/stats/popularity", tags=["Health"])
+async def get_popularity_stats():
+    if popularity_aggregator is None:
+        return {"enabled": False}
+    
+    return {"enabled": True, **popularity_aggregator.stats()}
+
+
+@app.get("/stats/precomputed", tags=["Health"])
+async def get_precomputed_stats():
+    if precomputed is None:
+        return {"enabled": False}
+    
+    return {"enabled": True, **precomputed.stats()}
+
+
+@app.get("/stats/product-attributes", tags=["Health"])
+async def get_product_attribute_stats():
+    if product_attributes is None:
+        return {"enabled": False}
+    
+    return {"enabled": True, **product_attributes.stats()}
+
+
+@app.get("/stats/model-load", tags=["Health"])
+async def get_model_load_stats():
+    if model_load_report is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    
+    return {**model_load_report, "refresh_in_progress": refresh_lock.locked()}
+
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def get_metrics():
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    
+    return PlainTextResponse(metrics_registry.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/debug/profile", tags=["Admin"], response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(default=10.0, gt=0, description="Sampling duration"),
+    interval_ms: float = Query(default=5.0, ge=1, le=1000, description="Sampling interval")
+):
+    """Sample every thread of this worker and return folded stacks (flamegraph.pl / speedscope)"""
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled (PROFILER_ENABLED)")
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already being captured")
+    
+    async with profile_lock:
+        seconds = min(seconds, settings.PROFILER_MAX_SECONDS)
+        counts = await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000)
+    
+    return PlainTextResponse(folded(counts))
+
+
+@app.get("/stats/executors", tags=["Health"])
+async def get_executor_stats():
+    return {
+        executor.name: executor.stats()
+        for executor in (scoring_executor, db_executor)
+        if executor is not None
+    }
+
+
 @app.get(
     "/api/recommendations/user/{user_id}",
     response_model=UserRecommendationsResponse,
@@ -128,10 +647,15 @@ async def get_stats():
 )
 async def get_user_recommendations(
     user_id: str,
-    limit: int = Query(default=10, ge=1, le=50, description="Number of recommendations")
+    limit: int = Query(default=10, ge=1, le=50, description="Number of recommendations"),
+    ann: bool = Query(default=False, description="Use the approximate nearest-neighbor index"),
+    nprobe: Optional[int] = Query(default=None, ge=1, le=1024, description="IVF lists scanned when ann=true"),
+    product_filter: ProductFilter = Depends(product_filter_params)
 ):
-    if recommender is None:
-        popular = await get_popular_products(limit=limit)
+    model = recommender
+    if model is None:
+        popular = await popular_products(limit)
+        set_strategy("popularity_fallback")
         return UserRecommendationsResponse(
             user_id=user_id,
             recommendations=popular.products,
@@ -139,39 +663,111 @@ async def get_user_recommendations(
             strategy_used="popularity_fallback"
         )
     
+    item_filter, filter_params = resolve_item_filter(model, product_filter)
+    
     try:
-        try:
-            user_id_parsed = int(user_id)
-        except ValueError:
-            user_id_parsed = user_id
+        user_id_parsed = parse_id(user_id)
         
-        recommendations = recommender.recommend_for_user(
+        # Materialized results first; users trained after the batch ran are scored online.
+        # Filter masks are aligned to the serving model, so filtered reads need a matching file.
+        # The file holds exact scores, so ann=true (and its nprobe) always scores online.
+        store = precomputed
+        if store is not None and not ann and (item_filter is None or store.model_version == model.model_version):
+            with stage('precomputed'):
+                recommendations = store.recommend(user_id_parsed, limit, item_filter)
+            if recommendations is not None:
+                set_strategy('precomputed')
+                return build_user_response(user_id, recommendations)
+        
+        recommendations = await cached(
+            model,
+            'user',
+            (user_id_parsed, limit, ann, nprobe, *filter_params),
+            'recommend_for_user',
             user_id_parsed,
             n_recommendations=limit,
-            filter_already_bought=True
+            filter_already_bought=True,
+            use_ann=ann,
+            nprobe=nprobe,
+            item_filter=item_filter
         )
         
-        if recommendations:
-            strategy = recommendations[0].get('strategy', 'unknown')
-        else:
-            strategy = 'no_recommendations'
+        response = build_user_response(user_id, recommendations)
+        set_strategy(response.strategy_used)
+        return response
         
-        return UserRecommendationsResponse(
-            user_id=user_id,
-            recommendations=[
-                ProductRecommendation(
-                    product_id=str(r['product_id']),
-                    score=r['score'],
-                    strategy=r['strategy']
+    except ExecutorSaturated:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting recommendations for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post(
+    "/api/recommendations/users/batch",
+    response_model=BatchRecommendationsResponse,
+    tags=["Recommendations"]
+)
+async def get_batch_user_recommendations(request: BatchRecommendationsRequest):
+    model = recommender
+    if model is None:
+        popular = await popular_products(request.limit)
+        set_strategy("popularity_fallback")
+        return BatchRecommendationsResponse(
+            results=[
+                UserRecommendationsResponse(
+                    user_id=user_id,
+                    recommendations=popular.products,
+                    total=popular.total,
+                    strategy_used="popularity_fallback"
                 )
-                for r in recommendations
+                for user_id in request.user_ids
             ],
-            total=len(recommendations),
-            strategy_used=strategy
+            total=len(request.user_ids)
         )
+    
+    filters = request.filters or RecommendationFilters()
+    product_filter = build_product_filter(filters.in_stock, filters.categories, filters.min_price, filters.max_price)
+    item_filter, _ = resolve_item_filter(model, product_filter)
+    
+    try:
+        user_ids = [parse_id(user_id) for user_id in request.user_ids]
+        store = precomputed
+        if store is not None and (item_filter is None or store.model_version == model.model_version):
+            with stage('precomputed'):
+                batch = store.recommend_many(user_ids, request.limit, item_filter)
+        else:
+            batch = [None] * len(user_ids)
+        
+        missing = [pos for pos, recommendations in enumerate(batch) if recommendations is None]
+        if missing:
+            scored = await score(
+                model,
+                'recommend_for_users',
+                [user_ids[pos] for pos in missing],
+                n_recommendations=request.limit,
+                filter_already_bought=True,
+                item_filter=item_filter
+            )
+            for pos, recommendations in zip(missing, scored):
+                batch[pos] = recommendations
+        
+        results = [
+            build_user_response(user_id, recommendations)
+            for user_id, recommendations in zip(request.user_ids, batch)
+        ]
+        strategies = {result.strategy_used for result in results}
+        if not missing:
+            set_strategy("precomputed")
+        else:
+            set_strategy(strategies.pop() if len(strategies) == 1 and len(missing) == len(batch) else "mixed")
+        
+        return BatchRecommendationsResponse(results=results, total=len(results))
         
+    except ExecutorSaturated:
+        raise
     except Exception as e:
-        logger.error(f"Error getting recommendations for user {user_id}: {e}")
+        logger.error(f"Error getting batch recommendations for {len(request.user_ids)} users: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -181,23 +777,44 @@ async def get_user_recommendations(
     tags=["Recommendations"]
 )
 async def get_similar_products(
+    request: Request,
+    response: Response,
     product_id: str,
-    limit: int = Query(default=5, ge=1, le=20, description="Number of similar products")
+    limit: int = Query(default=5, ge=1, le=20, description="Number of similar products"),
+    ann: bool = Query(default=False, description="Use the approximate nearest-neighbor index"),
+    nprobe: Optional[int] = Query(default=None, ge=1, le=1024, description="IVF lists scanned when ann=true"),
+    product_filter: ProductFilter = Depends(product_filter_params)
 ):
-    if recommender is None:
+    model = recommender
+    if model is None:
         raise HTTPException(status_code=503, detail="Recommendation model not loaded")
     
+    item_filter, filter_params = resolve_item_filter(model, product_filter)
+    
+    # The result only depends on the model version, the attribute snapshot and the parameters:
+    # answer 304 before scoring
+    etag = make_etag('similar', model.model_version, product_id, limit, ann, nprobe, *filter_params)
+    headers = cache_headers(etag, settings.HTTP_CACHE_MAX_AGE_SECONDS)
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        set_strategy('not_modified')
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    
     try:
-        try:
-            product_id_parsed = int(product_id)
-        except ValueError:
-            product_id_parsed = product_id
-        
-        similar = recommender.recommend_similar_products(
+        product_id_parsed = parse_id(product_id)
+        similar = await cached(
+            model,
+            'similar',
+            (product_id_parsed, limit, ann, nprobe, *filter_params),
+            'recommend_similar_products',
             product_id_parsed,
-            n_recommendations=limit
+            n_recommendations=limit,
+            use_ann=ann,
+            nprobe=nprobe,
+            item_filter=item_filter
         )
         
+        set_strategy(similar[0].get('strategy', 'item_similarity') if similar else 'no_recommendations')
         return SimilarProductsResponse(
             product_id=product_id,
             similar_products=[
@@ -211,6 +828,8 @@ async def get_similar_products(
             total=len(similar)
         )
         
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         logger.error(f"Error getting similar products for {product_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -222,39 +841,34 @@ async def get_similar_products(
     tags=["Recommendations"]
 )
 async def get_popular_products(
-    limit: int = Query(default=20, ge=1, le=50, description="Number of popular products")
+    request: Request,
+    response: Response,
+    limit: int = Query(default=20, ge=1, le=50, description="Number of popular products"),
+    category: Annotated[Optional[str], Query(description="Category name (order-based ranking)")] = None,
+    window: Annotated[Optional[str], Query(description=f"Time window: {', '.join(WINDOWS)}")] = None
 ):
-    if recommender is not None and recommender.popularity_scores is not None:
-        popular = recommender._get_popular_recommendations(limit)
-        return PopularProductsResponse(
-            products=[
-                ProductRecommendation(
-                    product_id=str(p['product_id']),
-                    score=p['score'],
-                    strategy='popularity'
-                )
-                for p in popular
-            ],
-            total=len(popular)
-        )
+    if window is not None and window not in WINDOWS:
+        raise HTTPException(status_code=400, detail=f"Unknown window '{window}', choose from {list(WINDOWS)}")
     
-    if db_loader:
-        popular_df = db_loader.get_popular_products(limit=limit)
-        
-        if not popular_df.empty:
-            return PopularProductsResponse(
-                products=[
-                    ProductRecommendation(
-                        product_id=str(row['product_id']),
-                        score=float(row['order_count']),
-                        strategy='popularity_database'
-                    )
-                    for _, row in popular_df.iterrows()
-                ],
-                total=len(popular_df)
-            )
+    source, version = resolve_popularity(category, window)
+    if source is None:
+        # No snapshot to version: answer from the database without validators
+        if category is None and window is None:
+            return await popular_products(limit)
+        return build_popular_response(None, limit)
+    
+    etag = make_etag('popular', version, limit, category.lower() if category else None, window)
+    # Database-backed lists change with every refresh, model-backed ones only on model swaps
+    max_age = settings.HTTP_CACHE_MAX_AGE_SECONDS
+    if not isinstance(source, HybridRecommender):
+        max_age = min(max_age, settings.POPULARITY_REFRESH_SECONDS)
     
-    return PopularProductsResponse(products=[], total=0)
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        set_strategy('not_modified')
+        return Response(status_code=304, headers=cache_headers(etag, max_age))
+    
+    response.headers.update(cache_headers(etag, max_age))
+    return build_popular_response(source, limit)
 
 
 @app.get(
@@ -268,34 +882,54 @@ async def get_user_purchase_history(
     if db_loader is None:
         raise HTTPException(status_code=503, detail="Database not available")
     
-    history = db_loader.get_user_history(user_id)
-    
-    if history.empty:
-        return {"user_id": user_id, "purchases": [], "total": 0}
-    
-    return {
-        "user_id": user_id,
-        "purchases": history.head(limit).to_dict(orient='records'),
-        "total": len(history)
-    }
+    return await db_executor.run(fetch_user_history, db_loader, user_id, limit)
 
 
 @app.post("/api/recommendations/refresh", tags=["Admin"])
 async def refresh_model():
-    global recommender
+    global recommender, model_load_report, precomputed
     
-    model_path = Path(settings.MODEL_PATH)
+    model_path = HybridRecommender.resolve_path(settings.MODEL_PATH)
     
-    if not model_path.exists():
+    if model_path is None:
         raise HTTPException(status_code=404, detail="Model file not found")
     
-    try:
-        recommender = HybridRecommender.load(str(model_path))
-        logger.info(f"Model refreshed from {model_path}")
-        return {"status": "success", "message": "Model reloaded", "stats": recommender.get_stats()}
-    except Exception as e:
-        logger.error(f"Failed to refresh model: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    if refresh_lock.locked():
+        raise HTTPException(status_code=409, detail="Model refresh already in progress")
+    
+    async with refresh_lock:
+        try:
+            # Load and validate on a worker thread; the current model keeps serving
+            new_model, report = await asyncio.to_thread(load_and_validate, str(model_path))
+            if product_attributes is not None:
+                # Filters keep working on the new model without waiting for the next reload
+                await asyncio.to_thread(product_attributes.align, new_model)
+        except Exception as e:
+            logger.error(f"Failed to refresh model: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+        
+        previous_version = recommender.model_version if recommender is not None else None
+        
+        # Atomic reference swap: in-flight requests finish on the model they started with
+        recommender = new_model
+        model_load_report = report
+        # Pick up results materialized for the new model
+        precomputed = open_precomputed()
+        
+        if recommendation_cache is not None:
+            # Keys embed the model version; drop the now unreachable entries
+            recommendation_cache.clear()
+            await asyncio.to_thread(recommendation_cache.purge_backend)
+        
+        logger.info(f"Model refreshed from {model_path}: {previous_version} -> {new_model.model_version}")
+        return {
+            "status": "success",
+            "message": "Model reloaded",
+            "previous_version": previous_version,
+            "stats": new_model.get_stats(),
+            "load": report,
+            "precomputed": precomputed.stats() if precomputed is not None else None
+        }
 
 
 if __name__ == "__main__":
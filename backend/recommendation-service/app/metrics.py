@@ -0,0 +1,212 @@
+"""
+In-process metrics with Prometheus text exposition
+
+Request latency is recorded by an ASGI middleware into fixed-bucket
+histograms labelled by route template, method, status and strategy (the
+recommendation strategy a handler reports through set_strategy). An
+observation is one bisect and a few integer increments under a lock, so
+the instrumentation stays on in production. Everything else (cache,
+executors, pools, model, popularity) already keeps counters; collectors
+read them only when /metrics is scraped.
+"""
+import bisect
+import contextvars
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# A sample is (metric name suffix, labels, value); a family groups samples under one HELP/TYPE
+Sample = Tuple[str, Dict[str, str], float]
+
+# Per-request mutable holder, so a strategy set anywhere in the handler reaches the middleware
+_request_strategy: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar(
+    'request_strategy', default=None
+)
+
+
+def set_strategy(strategy: str):
+    """Label the current request's latency observation with a recommendation strategy"""
+    holder = _request_strategy.get()
+    if holder is not None:
+        holder[0] = strategy
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram (one label combination)"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+    def samples(self, labels: Dict[str, str]) -> Iterator[Sample]:
+        counts, total = self.snapshot()
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            yield '_bucket', {**labels, 'le': _format_value(bound)}, cumulative
+        yield '_sum', labels, total
+        yield '_count', labels, cumulative
+
+
+class HistogramFamily:
+    """Histograms keyed by label values"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children: Dict[tuple, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> Histogram:
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, Histogram(self.buckets))
+        return child
+
+    def collect(self) -> Tuple[str, str, str, Iterable[Sample]]:
+        def samples():
+            for values, child in list(self._children.items()):
+                yield from child.samples(dict(zip(self.labelnames, values)))
+        return self.name, 'histogram', self.help, samples()
+
+
+class MetricsRegistry:
+    """
+    Histogram families plus collectors evaluated at scrape time
+
+    A collector returns (name, type, help, samples) tuples; one that raises
+    is skipped so a broken source never fails the whole scrape.
+    """
+
+    def __init__(self):
+        self._families: List[HistogramFamily] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Iterable[Sample]]]]] = []
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS):
+        family = HistogramFamily(name, help, labelnames, buckets)
+        self._families.append(family)
+        return family
+
+    def register(self, collector: Callable[[], Iterable[Tuple[str, str, str, Iterable[Sample]]]]):
+        self._collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        lines = []
+
+        def emit(name: str, kind: str, help: str, samples: Iterable[Sample]):
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            for suffix, labels, value in samples:
+                lines.append(f'{name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+
+        for family in self._families:
+            emit(*family.collect())
+        for collector in self._collectors:
+            try:
+                families = [(name, kind, help, list(samples)) for name, kind, help, samples in collector()]
+            except Exception:
+                continue
+            for family in families:
+                emit(*family)
+        return '\n'.join(lines) + '\n'
+
+
+def gauge(name: str, help: str, value: float, labels: Optional[Dict[str, str]] = None):
+    """Single-sample gauge family for collectors"""
+    return name, 'gauge', help, [('', labels or {}, value)]
+
+
+class RequestMetrics:
+    """Latency histograms and in-flight count fed by MetricsMiddleware"""
+
+    def __init__(self, registry: MetricsRegistry, prefix: str = 'http'):
+        self.latency = registry.histogram(
+            f'{prefix}_request_duration_seconds',
+            'Request latency by route template, method, status and recommendation strategy',
+            ['route', 'method', 'status', 'strategy']
+        )
+        self.in_flight = 0
+        registry.register(self.collect)
+        self._prefix = prefix
+
+    def collect(self):
+        yield gauge(f'{self._prefix}_requests_in_flight', 'Requests being processed', self.in_flight)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording in-flight requests and latency per route
+
+    Paths are labelled by their route template (/api/recommendations/user/{user_id}),
+    never by the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        holder = ['none']
+        token = _request_strategy.set(holder)
+        self.metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.metrics.in_flight -= 1
+            _request_strategy.reset(token)
+
+            route = scope.get('route')
+            path = getattr(route, 'path', None) or 'unmatched'
+            self.metrics.latency.labels(path, scope['method'], str(status[0]), holder[0]).observe(elapsed)
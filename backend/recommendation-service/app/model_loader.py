@@ -0,0 +1,136 @@
+"""
+Model loading and validation for (hot) model swaps
+
+Loading runs off the event loop; a model is only swapped in after it has
+passed structural checks and a smoke query.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.models.recommender import HybridRecommender
+from app.models.topk import top_k
+
+
+def validate_model(model: HybridRecommender):
+    """Raise ValueError if the model is not safe to serve"""
+    stats = model.get_stats()
+
+    if not stats['is_trained']:
+        raise ValueError("Model is not trained")
+    if stats['n_users'] == 0 or stats['n_products'] == 0:
+        raise ValueError(f"Model is empty: {stats['n_users']} users, {stats['n_products']} products")
+
+    if model.user_factors.shape[0] != stats['n_users']:
+        raise ValueError(f"user_factors has {model.user_factors.shape[0]} rows for {stats['n_users']} users")
+    if model.item_factors.shape[0] != stats['n_products']:
+        raise ValueError(f"item_factors has {model.item_factors.shape[0]} rows for {stats['n_products']} products")
+    if model.interaction_matrix.shape != (stats['n_users'], stats['n_products']):
+        raise ValueError(f"interaction_matrix shape {model.interaction_matrix.shape} does not match the mappings")
+
+    if model.user_factors.shape[1] != model.item_factors.shape[1]:
+        raise ValueError(
+            f"user_factors has {model.user_factors.shape[1]} factors, item_factors has {model.item_factors.shape[1]}"
+        )
+
+    # Score the first user directly: recommend_for_user falls back to popularity
+    # on any scoring error, so its output cannot tell a broken model apart
+    _, top_scores = top_k(model.item_factors @ model.user_factors[0], 5)
+    if len(top_scores) == 0:
+        raise ValueError("Smoke query returned no user recommendations")
+
+    # Smoke query on the first product
+    similar = model.recommend_similar_products(model.idx_to_product[0], n_recommendations=3)
+    scores = list(top_scores) + [s.get('similarity', s.get('score', 0.0)) for s in similar]
+    if not np.all(np.isfinite(scores)):
+        raise ValueError("Smoke query returned non-finite scores")
+
+
+def artifact_size(path: str) -> int:
+    """Bytes on disk of a model artifact (directory or single file)"""
+    path = Path(path)
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+    return path.stat().st_size
+
+
+def _rss_bytes() -> int:
+    """Current resident set size, or the peak RSS where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def load_and_validate(path: str) -> Tuple[HybridRecommender, Dict]:
+    """
+    Load and validate a model, measuring load time and process RSS
+
+    Blocking: call through asyncio.to_thread from request handlers.
+    RSS is process-wide, so concurrent requests add noise to the delta;
+    memory-mapped arrays only count once their pages are touched and are
+    reported separately as mapped_bytes.
+
+    Returns:
+        Tuple of (model, load report)
+    """
+    rss_before = _rss_bytes()
+
+    start = time.perf_counter()
+    model = HybridRecommender.load(path)
+    load_seconds = time.perf_counter() - start
+
+    validate_model(model)
+    total_seconds = time.perf_counter() - start
+
+    rss_after = _rss_bytes()
+    source = Path(model.source_path)
+    mapped_bytes = artifact_size(str(source)) if source.is_dir() else 0
+
+    report = {
+        'path': str(Path(path)),
+        'model_version': model.model_version,
+        'load_seconds': round(load_seconds, 4),
+        'validate_seconds': round(total_seconds - load_seconds, 4),
+        'rss_before_mb': round(rss_before / (1024 * 1024), 2),
+        'rss_after_mb': round(rss_after / (1024 * 1024), 2),
+        'rss_delta_mb': round((rss_after - rss_before) / (1024 * 1024), 2),
+        'mapped_bytes': mapped_bytes,
+        'artifact_bytes': artifact_size(path),
+    }
+    logger.info(f"Model loaded and validated: {report}")
+
+    return model, report
+
+
+# Model opened by a scoring worker process, keyed by (artifact path, server version)
+_worker_models: Dict[Tuple[str, str], HybridRecommender] = {}
+
+
+def call_model_method(path: str, model_version: str, method: str, args: tuple, kwargs: dict):
+    """
+    Run a HybridRecommender method inside a process-pool worker
+
+    Each worker opens the artifact once (memory-mapped, so pages are shared
+    with the server) and reopens it when the server has swapped versions.
+    """
+    key = (path, model_version)
+    model = _worker_models.get(key)
+    if model is None:
+        model = HybridRecommender.load(path)
+        if model.model_version != model_version:
+            logger.warning(
+                f"Worker loaded model {model.model_version} from {path}, server expects {model_version}"
+            )
+        _worker_models.clear()
+        _worker_models[key] = model
+    return getattr(model, method)(*args, **kwargs)
@@ -0,0 +1,172 @@
+"""
+Approximate nearest-neighbor index over item factors (pure NumPy)
+
+IVF (inverted file) index: items are clustered with spherical k-means and
+a query only scores the items of its `nprobe` closest clusters.
+"""
+import numpy as np
+from typing import Dict, Optional, Tuple
+from loguru import logger
+
+from .topk import top_k
+
+
+class IVFIndex:
+    """
+    Inverted-file index for maximum inner product search
+
+    The inverted lists are stored CSR-style: the items of list `l` are
+    list_items[list_offsets[l]:list_offsets[l + 1]] and their vectors are
+    stored contiguously in the same order in list_vectors.
+    """
+
+    def __init__(
+        self,
+        n_lists: Optional[int] = None,
+        nprobe: int = 8,
+        n_iter: int = 10,
+        sample_size: int = 100_000,
+        seed: int = 42
+    ):
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.sample_size = sample_size
+        self.seed = seed
+
+        self.centroids = None
+        self.list_offsets = None
+        self.list_items = None
+        self.list_vectors = None
+
+    def build(self, vectors: np.ndarray) -> 'IVFIndex':
+        """Cluster the vectors and fill the inverted lists"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n_items = vectors.shape[0]
+
+        if self.n_lists is None:
+            # Rule of thumb: ~4 * sqrt(n) lists
+            self.n_lists = int(4 * np.sqrt(n_items))
+        self.n_lists = int(max(1, min(self.n_lists, n_items)))
+
+        rng = np.random.default_rng(self.seed)
+        self.centroids = self._train_centroids(vectors, rng)
+
+        assignments = self._assign(vectors, self.centroids)
+        counts = np.bincount(assignments, minlength=self.n_lists)
+
+        self.list_offsets = np.zeros(self.n_lists + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.list_offsets[1:])
+        self.list_items = np.argsort(assignments, kind='stable').astype(np.int32)
+        self.list_vectors = vectors[self.list_items]
+
+        logger.info(
+            f"IVF index built: {n_items} items in {self.n_lists} lists "
+            f"(largest list: {counts.max()}, empty lists: {(counts == 0).sum()})"
+        )
+        return self
+
+    def _train_centroids(self, vectors: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Spherical k-means on a sample of the vectors"""
+        n_items = vectors.shape[0]
+        if n_items > self.sample_size:
+            sample = vectors[rng.choice(n_items, self.sample_size, replace=False)]
+        else:
+            sample = vectors
+
+        centroids = sample[rng.choice(len(sample), self.n_lists, replace=False)].copy()
+
+        for _ in range(self.n_iter):
+            assignments = self._assign(sample, centroids)
+            counts = np.bincount(assignments, minlength=self.n_lists)
+
+            sums = np.zeros_like(centroids)
+            for dim in range(sample.shape[1]):
+                sums[:, dim] = np.bincount(assignments, weights=sample[:, dim], minlength=self.n_lists)
+
+            # Re-seed empty clusters with random sample points
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.maximum(norms, 1e-12)
+
+        return centroids.astype(np.float32)
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """Index of the highest inner-product centroid for every vector"""
+        assignments = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], chunk_size):
+            chunk = vectors[start:start + chunk_size]
+            assignments[start:start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+        return assignments
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        nprobe: Optional[int] = None,
+        exclude: Optional[np.ndarray] = None,
+        item_filter: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k items by inner product with the query
+
+        Args:
+            query: (n_factors,) query vector
+            k: Number of items to return
+            nprobe: Number of inverted lists to scan (defaults to self.nprobe)
+            exclude: Item indices to drop from the results
+            item_filter: Boolean mask over all items, False for items to drop
+
+        Returns:
+            Tuple of (item_indices, scores) sorted by descending score
+        """
+        if self.centroids is None:
+            raise ValueError("IVF index is not built yet. Call build() first.")
+
+        nprobe = int(max(1, min(nprobe or self.nprobe, self.n_lists)))
+
+        centroid_scores = self.centroids @ query
+        if nprobe < self.n_lists:
+            probe = np.argpartition(centroid_scores, self.n_lists - nprobe)[self.n_lists - nprobe:]
+        else:
+            probe = np.arange(self.n_lists)
+
+        positions = np.concatenate([
+            np.arange(self.list_offsets[lst], self.list_offsets[lst + 1]) for lst in probe
+        ])
+        candidates = self.list_items[positions]
+        scores = self.list_vectors[positions] @ query
+
+        mask = None
+        if exclude is not None and len(exclude) > 0:
+            mask = np.isin(candidates, exclude)
+        if item_filter is not None:
+            blocked = ~item_filter[candidates]
+            mask = blocked if mask is None else mask | blocked
+
+        top_idx, top_scores = top_k(scores, k, exclude=mask)
+        return candidates[top_idx], top_scores
+
+    def to_dict(self) -> Dict:
+        """Arrays and parameters needed to restore the index"""
+        return {
+            'n_lists': self.n_lists,
+            'nprobe': self.nprobe,
+            'centroids': self.centroids,
+            'list_offsets': self.list_offsets,
+            'list_items': self.list_items,
+            'list_vectors': self.list_vectors,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'IVFIndex':
+        index = cls(n_lists=data['n_lists'], nprobe=data['nprobe'])
+        index.centroids = data['centroids']
+        index.list_offsets = data['list_offsets']
+        index.list_items = data['list_items']
+        index.list_vectors = data['list_vectors']
+        return index
@@ -0,0 +1,165 @@
+"""
+Directory-based model artifact format
+
+An artifact is a directory holding one .npy file per array plus a JSON
+manifest. Arrays are opened with np.load(mmap_mode='r') so every worker
+process shares the same page cache instead of deserializing a private copy.
+
+Each save writes a new versioned sibling directory (`.<name>.v<ns>`) and
+atomically repoints the `<name>` symlink at it, so the artifact path always
+exists and always names a complete artifact. The previous version is kept
+for readers that resolved the link just before the swap; older ones are
+removed. Where symlinks are unavailable (e.g. Windows without developer
+mode) the directory is swapped with two renames instead.
+"""
+import json
+import os
+import shutil
+import time
+import numpy as np
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def is_artifact(path: Path) -> bool:
+    return Path(path).is_dir() and (Path(path) / MANIFEST_FILE).exists()
+
+
+def save_artifact(
+    path: Path,
+    arrays: Dict[str, np.ndarray],
+    manifest: Dict,
+    write_extra: Optional[Callable[[Path], None]] = None
+):
+    """
+    Write arrays and manifest to a directory, replacing it atomically
+
+    The artifact is written to a temporary sibling directory and swapped into
+    place, so readers never observe a half-written model. write_extra(dir)
+    adds sidecar files before the swap.
+    """
+    path = Path(path)
+    tmp_path = staging_dir(path)
+
+    array_specs = {}
+    for name, array in arrays.items():
+        if array is None:
+            continue
+        array = np.ascontiguousarray(array)
+        np.save(tmp_path / f"{name}.npy", array, allow_pickle=False)
+        array_specs[name] = {'dtype': array.dtype.str, 'shape': list(array.shape)}
+
+    manifest = {**manifest, 'format_version': FORMAT_VERSION, 'arrays': array_specs}
+    with open(tmp_path / MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    if write_extra is not None:
+        write_extra(tmp_path)
+
+    replace_dir(tmp_path, path)
+
+
+def staging_dir(path: Path) -> Path:
+    """Empty temporary sibling directory to build an artifact in before replace_dir()"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.parent / f".{path.name}.tmp-{os.getpid()}"
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir()
+    return tmp_path
+
+
+def _version_dirs(path: Path):
+    return sorted(path.parent.glob(f".{path.name}.v*"), key=lambda p: p.name)
+
+
+def replace_dir(tmp_path: Path, path: Path):
+    """
+    Move a fully written directory into place, replacing any previous one
+
+    The directory becomes a new version and the `path` symlink is swapped to
+    it with a single rename, so `path` never disappears.
+    """
+    path = Path(path)
+    version_path = path.parent / f".{path.name}.v{time.time_ns():020d}"
+    os.replace(tmp_path, version_path)
+
+    link_tmp = path.parent / f".{path.name}.link-{os.getpid()}"
+    link_tmp.unlink(missing_ok=True)
+    try:
+        # Relative target: the models directory can be moved or mounted elsewhere
+        os.symlink(version_path.name, link_tmp, target_is_directory=True)
+    except (OSError, NotImplementedError):
+        _swap_dirs(version_path, path)
+        return
+
+    if path.is_dir() and not path.is_symlink():
+        # First save after the pre-symlink layout: one-time, non-atomic migration
+        legacy_path = path.parent / f".{path.name}.v{0:020d}"
+        if legacy_path.exists():
+            shutil.rmtree(legacy_path)
+        os.replace(path, legacy_path)
+    os.replace(link_tmp, path)
+
+    # Keep the new and the previous version; readers hold at most one swap back
+    for old_path in _version_dirs(path)[:-2]:
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def _swap_dirs(tmp_path: Path, path: Path):
+    """Fallback without symlinks: two renames, `path` is briefly missing"""
+    # Open memory maps keep the old files alive
+    old_path = None
+    if path.exists():
+        old_path = path.parent / f".{path.name}.old-{os.getpid()}"
+        if old_path.exists():
+            shutil.rmtree(old_path)
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    if old_path is not None:
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def resolve_artifact(path: Path) -> Path:
+    """Versioned directory currently behind an artifact path (the path itself without a symlink)"""
+    return Path(path).parent / os.readlink(path) if Path(path).is_symlink() else Path(path)
+
+
+def load_artifact(path: Path, mmap: bool = True, retries: int = 3) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """
+    Open an artifact directory
+
+    The symlink is resolved once, so every file comes from the same version.
+    A FileNotFoundError (the rename fallback's swap window, or a version
+    removed mid-load) is retried against the current target.
+
+    Returns:
+        Tuple of (arrays, manifest). Arrays are read-only memory maps when mmap is True.
+    """
+    for attempt in range(1, retries + 1):
+        try:
+            return _open_artifact(resolve_artifact(path), mmap)
+        except FileNotFoundError:
+            if attempt == retries:
+                raise
+            time.sleep(0.05 * attempt)
+
+
+def _open_artifact(path: Path, mmap: bool) -> Tuple[Dict[str, np.ndarray], Dict]:
+    with open(path / MANIFEST_FILE, 'r') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version', 0) > FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version {manifest['format_version']} in {path}")
+
+    mmap_mode = 'r' if mmap else None
+    arrays = {
+        name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+        for name in manifest.get('arrays', {})
+    }
+    manifest['resolved_path'] = str(path)
+    return arrays, manifest
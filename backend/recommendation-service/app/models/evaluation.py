@@ -0,0 +1,226 @@
+"""
+Offline evaluation of a trained HybridRecommender
+
+The held-out interactions become a CSR ground-truth matrix (one row per test
+user). Users are scored in blocks with one GEMM per block and the row-wise
+top-k engine, and hits are found by searching the sorted (row, item) keys of
+the ground truth, so evaluating every test user costs O(n_users * n_items)
+flops and no per-user DataFrame filtering. Large test sets are split across
+a process pool. The popularity ranking is evaluated the same way as a
+baseline.
+"""
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from scipy.sparse import csr_matrix
+from typing import Dict, Optional
+from loguru import logger
+
+from .topk import top_k_rows
+
+METRICS = ('precision', 'recall', 'ndcg', 'map')
+
+# Scoring inputs shared with pool workers (set by _init_worker)
+_state: Dict = {}
+
+
+def _init_worker(state: Dict):
+    global _state
+    _state = state
+
+
+def _evaluate_block(start: int, stop: int) -> Dict:
+    """Score users start:stop and return metric sums plus the recommended items"""
+    state = _state
+    k = state['k']
+    n_items = state['n_items']
+
+    # Users unknown to the model get the popularity ranking, as when serving
+    codes = state['user_codes'][start:stop]
+    known = codes >= 0
+    scores = np.empty((stop - start, n_items), dtype=np.float32)
+    scores[:] = state['popularity']
+    if state['user_factors'] is not None and known.any():
+        scores[known] = state['user_factors'][codes[known]] @ state['item_factors'].T
+
+    train_indptr = state['train_indptr']
+    if train_indptr is not None:
+        lo, hi = train_indptr[start], train_indptr[stop]
+        top_idx, top_scores = top_k_rows(
+            scores, k, train_indptr[start:stop + 1] - lo, state['train_indices'][lo:hi]
+        )
+    else:
+        top_idx, top_scores = top_k_rows(scores, k)
+    valid = np.isfinite(top_scores)
+
+    # A recommendation is a hit when its (user row, item) key is in the ground truth
+    truth_keys = state['truth_keys']
+    keys = np.arange(start, stop, dtype=np.int64)[:, None] * n_items + top_idx
+    positions = np.minimum(np.searchsorted(truth_keys, keys), len(truth_keys) - 1)
+    hits = (truth_keys[positions] == keys) & valid
+
+    n_relevant = np.diff(state['truth_indptr'][start:stop + 1])
+    evaluated = n_relevant > 0
+    n_relevant = np.maximum(n_relevant, 1)
+
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    ideal = np.cumsum(discounts)[np.minimum(n_relevant, k) - 1]
+    ranks = np.arange(1, k + 1)
+    n_hits = hits.sum(axis=1)
+
+    per_user = {
+        'precision': n_hits / k,
+        'recall': n_hits / n_relevant,
+        'ndcg': (hits * discounts).sum(axis=1) / ideal,
+        'map': (np.cumsum(hits, axis=1) / ranks * hits).sum(axis=1) / np.minimum(n_relevant, k),
+    }
+
+    recommended = np.zeros(n_items, dtype=bool)
+    recommended[top_idx[valid]] = True
+
+    return {
+        'sums': {name: float(values[evaluated].sum()) for name, values in per_user.items()},
+        'n_evaluated': int(evaluated.sum()),
+        'recommended': recommended,
+    }
+
+
+def _run(state: Dict, n_rows: int, block_size: int, n_jobs: int) -> Dict:
+    """Evaluate all rows inline or on a process pool, then aggregate"""
+    bounds = [(start, min(start + block_size, n_rows)) for start in range(0, n_rows, block_size)]
+
+    if n_jobs > 1 and len(bounds) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(state,)) as pool:
+            parts = list(pool.map(_evaluate_block, *zip(*bounds)))
+    else:
+        _init_worker(state)
+        parts = [_evaluate_block(start, stop) for start, stop in bounds]
+
+    n_evaluated = sum(part['n_evaluated'] for part in parts)
+    recommended = np.zeros(state['n_items'], dtype=bool)
+    for part in parts:
+        recommended |= part['recommended']
+
+    k = state['k']
+    metrics = {
+        f'{name}@k': sum(part['sums'][name] for part in parts) / n_evaluated if n_evaluated else 0.0
+        for name in METRICS
+    }
+    metrics['coverage@k'] = float(recommended.mean()) if state['n_items'] else 0.0
+    metrics['k'] = k
+    metrics['n_users_evaluated'] = n_evaluated
+    return metrics
+
+
+def _popularity_vector(model) -> np.ndarray:
+    """combined_score per item index (-inf for items without a score)"""
+    n_items = len(model.product_id_map)
+    vector = np.full(n_items, -np.inf, dtype=np.float32)
+    popularity = model.popularity_scores
+    if popularity is not None and len(popularity) > 0:
+        codes = model.product_id_map.get_indexer(popularity.index.values)
+        found = codes >= 0
+        vector[codes[found]] = popularity['combined_score'].to_numpy()[found]
+    return vector
+
+
+def evaluate_model(
+    model,
+    test_df: pd.DataFrame,
+    k: int = 10,
+    filter_train_items: bool = True,
+    n_jobs: Optional[int] = None,
+    process_threshold: int = 50_000
+) -> Dict:
+    """
+    Compute precision/recall/NDCG/MAP/coverage@k for every test user
+
+    Args:
+        model: Trained HybridRecommender
+        test_df: Held-out interactions with columns [user_id, product_id]
+        k: Cut-off rank
+        filter_train_items: Exclude each user's training items from the ranking
+            (and from the ground truth), as the API does
+        n_jobs: Worker processes for large test sets (defaults to the number of CPUs)
+        process_threshold: Test users above which a process pool is used
+
+    Returns:
+        Dict of model metrics, with the popularity baseline under 'baseline'
+    """
+    logger.info(f"Evaluating model with k={k}...")
+
+    n_items = len(model.product_id_map)
+    test_users, test_user_ids = pd.factorize(test_df['user_id'])
+    test_items = model.product_id_map.get_indexer(test_df['product_id'].values)
+    user_codes = model.user_id_map.get_indexer(test_user_ids.values).astype(np.int64)
+    n_rows = len(test_user_ids)
+
+    # Items the model has never seen cannot be recommended; leave them out
+    known_items = test_items >= 0
+    n_unknown = int((~known_items).sum())
+    if n_unknown:
+        logger.info(f"Ignoring {n_unknown} test interactions on products unseen in training")
+
+    truth = csr_matrix(
+        (np.ones(int(known_items.sum()), dtype=np.float32), (test_users[known_items], test_items[known_items])),
+        shape=(n_rows, n_items)
+    )
+    truth.sum_duplicates()
+
+    train_indptr = train_indices = None
+    if filter_train_items:
+        # Training rows of the test users, empty for users unknown to the model
+        train = model.interaction_matrix
+        known = user_codes >= 0
+        lengths = np.zeros(n_rows, dtype=np.int64)
+        lengths[known] = train.indptr[user_codes[known] + 1] - train.indptr[user_codes[known]]
+        train_indptr = np.concatenate([[0], np.cumsum(lengths)])
+        train_indices = train[user_codes[known]].indices
+
+        # Drop repurchases of training items: they can never be recommended
+        truth_keys = np.repeat(np.arange(n_rows, dtype=np.int64), np.diff(truth.indptr)) * n_items + truth.indices
+        train_keys = np.repeat(np.arange(n_rows, dtype=np.int64), lengths) * n_items + train_indices
+        truth.data[np.isin(truth_keys, train_keys)] = 0
+        truth.eliminate_zeros()
+
+    truth.sort_indices()
+    truth_keys = np.repeat(np.arange(n_rows, dtype=np.int64), np.diff(truth.indptr)) * n_items + truth.indices
+    if len(truth_keys) == 0:
+        logger.warning("No test interactions left to evaluate")
+        truth_keys = np.array([-1], dtype=np.int64)
+
+    block_size = max(1, model.BATCH_SCORE_ELEMENTS // max(n_items, 1))
+    n_jobs = (n_jobs or os.cpu_count() or 1) if n_rows > process_threshold else 1
+
+    state = {
+        'k': k,
+        'n_items': n_items,
+        'user_codes': user_codes,
+        'user_factors': np.asarray(model.user_factors, dtype=np.float32),
+        'item_factors': np.asarray(model.item_factors, dtype=np.float32),
+        'popularity': _popularity_vector(model),
+        'train_indptr': train_indptr,
+        'train_indices': train_indices,
+        'truth_indptr': truth.indptr,
+        'truth_keys': truth_keys,
+    }
+
+    metrics = _run(state, n_rows, block_size, n_jobs)
+    metrics['n_test_users'] = n_rows
+    metrics['n_cold_users'] = int((user_codes < 0).sum())
+
+    # Baseline: the same popularity ranking for everyone
+    baseline_state = {**state, 'user_factors': None}
+    metrics['baseline'] = _run(baseline_state, n_rows, block_size, n_jobs)
+
+    logger.info(
+        f"Evaluation results over {metrics['n_users_evaluated']} users: " +
+        ", ".join(f"{name}@{k}={metrics[f'{name}@k']:.4f}" for name in METRICS + ('coverage',))
+    )
+    logger.info(
+        "Popularity baseline: " +
+        ", ".join(f"{name}@{k}={metrics['baseline'][f'{name}@k']:.4f}" for name in METRICS + ('coverage',))
+    )
+
+    return metrics
@@ -0,0 +1,116 @@
+"""
+Compact ID <-> matrix index mapping
+
+Replaces the four Python dicts (user_id_map, idx_to_user, ...) with one
+NumPy id array per axis plus an argsort permutation, looked up with
+np.searchsorted. Works with int and string IDs and supports vectorized
+batch lookups.
+"""
+import numpy as np
+import pandas as pd
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+
+def encode_ids(values) -> np.ndarray:
+    """
+    Store IDs as a flat array that can be memory-mapped (no pickled objects)
+
+    Integer IDs become int64, anything else becomes fixed-width unicode.
+    """
+    arr = np.asarray(values)
+    if arr.dtype.kind in 'iu':
+        return arr.astype(np.int64)
+    if arr.dtype.kind == 'O' and all(isinstance(v, (int, np.integer)) for v in arr.tolist()):
+        return arr.astype(np.int64)
+    return arr.astype(str)
+
+
+class IdIndex:
+    """
+    Bidirectional mapping between external IDs and contiguous matrix indices
+
+    ids[idx] is the ID of matrix index idx; sorter is the permutation that
+    sorts ids, so lookups are a binary search without a sorted copy.
+    Behaves like a read-only dict for single lookups (in, [], get, keys).
+    """
+
+    def __init__(self, ids: np.ndarray, sorter: Optional[np.ndarray] = None):
+        self.ids = ids
+        if sorter is None:
+            sorter = np.argsort(ids, kind='stable').astype(np.int64)
+        self.sorter = sorter
+        self._is_int = ids.dtype.kind in 'iu'
+
+    @classmethod
+    def factorize(cls, values) -> Tuple[np.ndarray, 'IdIndex']:
+        """
+        Encode values as contiguous codes in order of first appearance
+
+        Returns:
+            Tuple of (codes int32, IdIndex over the unique values)
+        """
+        codes, uniques = pd.factorize(values)
+        return codes.astype(np.int32), cls(encode_ids(np.asarray(uniques)))
+
+    @classmethod
+    def from_mapping(cls, idx_to_id: dict) -> 'IdIndex':
+        """Build from a legacy idx -> id dict"""
+        return cls(encode_ids([idx_to_id[i] for i in range(len(idx_to_id))]))
+
+    def _coerce(self, keys) -> Tuple[np.ndarray, np.ndarray]:
+        """Cast keys to the id dtype; returns (keys, castable mask)"""
+        arr = np.asarray(keys)
+        if arr.dtype.kind == 'U' and not isinstance(keys, np.ndarray):
+            # np.asarray turns a mixed int/str list into strings; keep the original objects
+            arr = np.array(list(keys), dtype=object)
+        if not self._is_int:
+            return arr.astype(str), np.ones(arr.shape, dtype=bool)
+
+        if arr.dtype.kind in 'iu':
+            return arr.astype(np.int64), np.ones(arr.shape, dtype=bool)
+
+        # Mixed or non-integer keys: only integers can match integer ids
+        valid = np.array([isinstance(k, (int, np.integer)) and not isinstance(k, bool) for k in arr.ravel().tolist()],
+                         dtype=bool).reshape(arr.shape)
+        coerced = np.zeros(arr.shape, dtype=np.int64)
+        if valid.any():
+            coerced[valid] = arr[valid].astype(np.int64)
+        return coerced, valid
+
+    def get_indexer(self, keys: Iterable[Any]) -> np.ndarray:
+        """Vectorized lookup: matrix index for every key, -1 when unknown"""
+        keys, valid = self._coerce(keys)
+        if len(self.ids) == 0 or keys.size == 0:
+            return np.full(keys.shape, -1, dtype=np.int64)
+
+        pos = np.searchsorted(self.ids, keys, sorter=self.sorter)
+        pos = np.minimum(pos, len(self.ids) - 1)
+        idx = self.sorter[pos]
+        found = valid & (self.ids[idx] == keys)
+        return np.where(found, idx, -1)
+
+    def lookup(self, indices) -> List[Any]:
+        """IDs (as Python objects) for an array of matrix indices"""
+        return self.ids[indices].tolist()
+
+    def get(self, key: Any, default: Optional[int] = None) -> Optional[int]:
+        idx = int(self.get_indexer([key])[0])
+        return default if idx < 0 else idx
+
+    def __getitem__(self, key: Any) -> int:
+        idx = self.get(key)
+        if idx is None:
+            raise KeyError(key)
+        return idx
+
+    def __contains__(self, key: Any) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.ids.tolist())
+
+    def keys(self) -> List[Any]:
+        return self.ids.tolist()
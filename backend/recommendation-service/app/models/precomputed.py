@@ -0,0 +1,280 @@
+"""
+Offline top-N materialization for every known user
+
+materialize_top_n() scores all users of a saved model in blocks with one
+GEMM per block (user_factors[block] @ item_factors.T) and the row-wise
+top-k engine, spread across a process pool. Workers reopen the memory-mapped
+model and write their rows straight into .npy memory maps, so nothing but
+block bounds crosses process boundaries. The result is an artifact directory:
+
+    items.npy        (n_users, top_n) int32 item codes, -1 for empty slots
+    scores.npy       (n_users, top_n) float16 scores, -inf for empty slots
+    user_ids.npy     user id per row (+ user_ids_sorter.npy)
+    product_ids.npy  product id per item code
+    manifest.json    model_version, top_n, created_at, ...
+
+Ids are stored with the results, so the file stays readable after the
+serving model is retrained: PrecomputedTopN answers for the users it holds
+and returns None for the others (users trained after the batch ran), which
+the API then scores online.
+"""
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+from loguru import logger
+from threadpoolctl import threadpool_limits
+
+from .artifact import FORMAT_VERSION, MANIFEST_FILE, is_artifact, load_artifact, replace_dir, staging_dir
+from .id_index import IdIndex
+from .topk import top_k_rows
+
+# Largest finite float16; scores beyond it are clipped rather than stored as inf
+_FLOAT16_MAX = float(np.finfo(np.float16).max)
+
+# Model and output maps of a pool worker (set by _init_worker)
+_state: Dict = {}
+
+
+def _init_worker(model_path: str, output_dir: str, top_n: int, filter_already_bought: bool, blas_threads: Optional[int]):
+    # Imported here: the recommender module imports this package
+    from .recommender import HybridRecommender
+
+    global _state
+    if blas_threads is not None:
+        # One BLAS thread per process: the pool provides the parallelism
+        threadpool_limits(blas_threads)
+    model = HybridRecommender.load(model_path, mmap=True)
+    output_dir = Path(output_dir)
+    _state = {
+        'user_factors': model.user_factors,
+        'item_factors_t': np.ascontiguousarray(model.item_factors, dtype=np.float32).T,
+        'interactions': model.interaction_matrix if filter_already_bought else None,
+        'top_n': top_n,
+        'items': np.load(output_dir / 'items.npy', mmap_mode='r+'),
+        'scores': np.load(output_dir / 'scores.npy', mmap_mode='r+'),
+    }
+
+
+def _score_block(start: int, stop: int) -> int:
+    """Score users start:stop and write their top-N rows to the output maps"""
+    state = _state
+    scores = np.asarray(state['user_factors'][start:stop], dtype=np.float32) @ state['item_factors_t']
+
+    interactions = state['interactions']
+    if interactions is not None:
+        indptr = interactions.indptr
+        lo, hi = indptr[start], indptr[stop]
+        top_idx, top_scores = top_k_rows(
+            scores, state['top_n'], indptr[start:stop + 1] - lo, interactions.indices[lo:hi]
+        )
+    else:
+        top_idx, top_scores = top_k_rows(scores, state['top_n'])
+
+    valid = np.isfinite(top_scores)
+    state['items'][start:stop] = np.where(valid, top_idx, -1)
+    state['scores'][start:stop] = np.where(valid, np.clip(top_scores, -_FLOAT16_MAX, _FLOAT16_MAX), -np.inf)
+    return stop - start
+
+
+def materialize_top_n(
+    model_path: str,
+    output_path: str,
+    top_n: int = 50,
+    n_jobs: Optional[int] = None,
+    block_size: Optional[int] = None,
+    filter_already_bought: bool = True
+) -> Dict:
+    """
+    Precompute the top-N recommendations of every user known to a saved model
+
+    Args:
+        model_path: Saved model (artifact directory or legacy joblib file)
+        output_path: Result directory, replaced atomically when complete
+        top_n: Recommendations kept per user (the largest servable limit)
+        n_jobs: Worker processes (defaults to the number of CPUs)
+        block_size: Users per GEMM block (defaults to ~BATCH_SCORE_ELEMENTS scores)
+        filter_already_bought: Exclude each user's training items, as the API does
+
+    Returns:
+        The result manifest (with timing)
+    """
+    from .recommender import HybridRecommender
+
+    started = time.perf_counter()
+    model = HybridRecommender.load(model_path, mmap=True)
+    n_users, n_items = model.user_factors.shape[0], model.item_factors.shape[0]
+    if n_users == 0 or n_items == 0:
+        raise ValueError(f"Model at {model_path} has no users or items to score")
+
+    top_n = max(1, min(int(top_n), n_items))
+    block_size = block_size or max(1, model.BATCH_SCORE_ELEMENTS // n_items)
+    bounds = [(start, min(start + block_size, n_users)) for start in range(0, n_users, block_size)]
+    n_jobs = max(1, min(n_jobs or os.cpu_count() or 1, len(bounds)))
+
+    output_path = Path(output_path)
+    tmp_path = staging_dir(output_path)
+    for name, dtype in (('items', np.int32), ('scores', np.float16)):
+        # Created here, filled by the workers through their own memory maps
+        np.lib.format.open_memmap(tmp_path / f'{name}.npy', mode='w+', dtype=dtype, shape=(n_users, top_n)).flush()
+
+    logger.info(
+        f"Materializing top-{top_n} for {n_users} users x {n_items} items "
+        f"({len(bounds)} blocks of {block_size} users, {n_jobs} process(es))"
+    )
+
+    initargs = (str(model.source_path), str(tmp_path), top_n, filter_already_bought, 1 if n_jobs > 1 else None)
+    done = 0
+    progress_every = max(1, len(bounds) // 10)
+    if n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=initargs) as pool:
+            for i, rows in enumerate(pool.map(_score_block, *zip(*bounds)), start=1):
+                done += rows
+                if i % progress_every == 0:
+                    logger.info(f"   {done}/{n_users} users scored")
+    else:
+        _init_worker(*initargs)
+        for i, (start, stop) in enumerate(bounds, start=1):
+            done += _score_block(start, stop)
+            if i % progress_every == 0:
+                logger.info(f"   {done}/{n_users} users scored")
+        _state.clear()
+
+    arrays = {
+        'user_ids': model.user_id_map.ids,
+        'user_ids_sorter': model.user_id_map.sorter,
+        'product_ids': model.product_id_map.ids,
+    }
+    for name, array in arrays.items():
+        np.save(tmp_path / f'{name}.npy', np.ascontiguousarray(array), allow_pickle=False)
+
+    seconds = time.perf_counter() - started
+    specs = {name: {'dtype': array.dtype.str, 'shape': list(array.shape)} for name, array in arrays.items()}
+    specs['items'] = {'dtype': np.dtype(np.int32).str, 'shape': [n_users, top_n]}
+    specs['scores'] = {'dtype': np.dtype(np.float16).str, 'shape': [n_users, top_n]}
+    manifest = {
+        'created_at': pd.Timestamp.now().isoformat(),
+        'model_version': model.model_version,
+        'model_path': str(model.source_path),
+        'top_n': top_n,
+        'filter_already_bought': filter_already_bought,
+        'n_users': n_users,
+        'n_products': n_items,
+        'seconds': round(seconds, 3),
+        'users_per_second': round(n_users / seconds, 1) if seconds > 0 else None,
+        'format_version': FORMAT_VERSION,
+        'arrays': specs,
+    }
+    with open(tmp_path / MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    replace_dir(tmp_path, output_path)
+    logger.info(
+        f"Top-{top_n} for {n_users} users written to {output_path} in {seconds:.1f}s "
+        f"({manifest['users_per_second']} users/s)"
+    )
+    return manifest
+
+
+class PrecomputedTopN:
+    """
+    Read-only view over a materialize_top_n() result
+
+    Lookups are a binary search in the user ids plus one row read from the
+    memory-mapped items/scores, so they are cheap enough for the event loop.
+    """
+
+    def __init__(self, path: Path, arrays: Dict[str, np.ndarray], manifest: Dict):
+        self.path = Path(path)
+        self.manifest = manifest
+        self.model_version = manifest.get('model_version')
+        self.top_n = int(manifest['top_n'])
+        self.user_id_map = IdIndex(arrays['user_ids'], arrays.get('user_ids_sorter'))
+        self.product_ids = arrays['product_ids']
+        self.items = arrays['items']
+        self.scores = arrays['scores']
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def open(cls, path: str) -> Optional['PrecomputedTopN']:
+        """Memory-map a result directory; None when there is none"""
+        path = Path(path)
+        if not is_artifact(path):
+            return None
+        arrays, manifest = load_artifact(path, mmap=True)
+        store = cls(path, arrays, manifest)
+        logger.info(
+            f"Precomputed top-{store.top_n} loaded from {path}: "
+            f"{len(store.user_id_map)} users, model {store.model_version}"
+        )
+        return store
+
+    def _format(self, row: int, n: int, item_filter: Optional[np.ndarray] = None) -> Optional[List[Dict]]:
+        codes = self.items[row] if item_filter is not None else self.items[row, :n]
+        valid = codes >= 0
+        if item_filter is not None:
+            # The stored row is the prefix of the user's ranking: its first n eligible
+            # items are the filtered top-n, unless the prefix runs out first
+            exhausted = not valid.all()
+            valid &= item_filter[np.maximum(codes, 0)]
+            if valid.sum() < n and not exhausted:
+                return None
+        positions = np.flatnonzero(valid)[:n]
+        if len(positions) == 0:
+            return None
+        return [
+            {
+                'product_id': pid,
+                'score': score,
+                'strategy': 'collaborative_filtering'
+            }
+            for pid, score in zip(
+                self.product_ids[codes[positions]].tolist(),
+                self.scores[row, positions].astype(np.float32).tolist()
+            )
+        ]
+
+    def recommend(self, user_id: Any, n: int, item_filter: Optional[np.ndarray] = None) -> Optional[List[Dict]]:
+        """
+        Stored recommendations of a user, or None when they must be scored online
+
+        item_filter is a mask of eligible items over this file's product codes
+        (i.e. built for the model the file was materialized from).
+        """
+        return self.recommend_many([user_id], n, item_filter)[0]
+
+    def recommend_many(
+        self,
+        user_ids: Sequence[Any],
+        n: int,
+        item_filter: Optional[np.ndarray] = None
+    ) -> List[Optional[List[Dict]]]:
+        """recommend() for a batch of users, in input order"""
+        if n > self.top_n:
+            self.misses += len(user_ids)
+            return [None] * len(user_ids)
+
+        rows = self.user_id_map.get_indexer(user_ids)
+        results = [self._format(int(row), n, item_filter) if row >= 0 else None for row in rows]
+        found = sum(result is not None for result in results)
+        self.hits += found
+        self.misses += len(results) - found
+        return results
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'path': str(self.path),
+            'model_version': self.model_version,
+            'created_at': self.manifest.get('created_at'),
+            'top_n': self.top_n,
+            'n_users': len(self.user_id_map),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -1,6 +1,6 @@
 """
 Hybrid Recommendation Model for ShopAI
-Uses Matrix Factorization with SVD (no compilation required - Windows compatible)
+Uses Matrix Factorization with SVD or implicit ALS (no compilation required - Windows compatible)
 
 This is a production-ready recommendation engine trained on Amazon data
 """
@@ -10,6 +10,8 @@ from scipy.sparse import csr_matrix
 from typing import List, Dict, Tuple, Optional, Any
 from loguru import logger
 import joblib
+import uuid
+from contextlib import nullcontext
 from pathlib import Path
 
 # ML Libraries (scikit-learn only - no compilation needed)
@@ -18,26 +20,48 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.preprocessing import MinMaxScaler, normalize
 
+from .topk import top_k, top_k_rows
+from .neighbors import build_item_neighbors
+from .als import train_als
+from .ann import IVFIndex
+from .artifact import is_artifact, load_artifact, save_artifact
+from .id_index import IdIndex
+from ..profiling import stage
+
 
 class HybridRecommender:
     """
     Hybrid Recommendation System combining:
-    1. Collaborative Filtering (SVD) - "Users who bought X also bought Y"
+    1. Collaborative Filtering (SVD or implicit ALS) - "Users who bought X also bought Y"
     2. Content-Based (TF-IDF) - "Similar products based on description"
     3. Popularity-Based - Fallback for cold-start users
     
     This version uses only scikit-learn (no compilation required on Windows)
     """
     
+    # Upper bound on the number of scores materialized per batch scoring block
+    BATCH_SCORE_ELEMENTS = 1 << 24
+    
+    ALGORITHMS = ('svd', 'als')
+    
     def __init__(
         self,
         n_factors: int = 64,
         n_iterations: int = 30,
         regularization: float = 0.1,
+        n_neighbors: int = 50,
+        algorithm: str = "svd",
+        alpha: float = 40.0,
     ):
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(f"Unknown algorithm: {algorithm}. Choose from {', '.join(self.ALGORITHMS)}")
+        
         self.n_factors = n_factors
         self.n_iterations = n_iterations
         self.regularization = regularization
+        self.n_neighbors = n_neighbors
+        self.algorithm = algorithm
+        self.alpha = alpha  # ALS confidence scaling: c = 1 + alpha * rating
         
         # Models
         self.svd_model = None
@@ -48,24 +72,37 @@ class HybridRecommender:
         self.user_factors = None
         self.item_factors = None
         
+        # Precomputed item-to-item neighbors (n_items x n_neighbors)
+        self.neighbor_indices = None
+        self.neighbor_scores = None
+        
+        # Approximate nearest-neighbor index over item factors
+        self.ann_index = None
+        
         # Mappings
-        self.user_id_map = {}  # user_id -> matrix_index
-        self.product_id_map = {}  # product_id -> matrix_index
-        self.idx_to_user = {}  # matrix_index -> user_id
-        self.idx_to_product = {}  # matrix_index -> product_id
+        self.user_id_map = IdIndex(np.empty(0, dtype=np.int64))  # user_id <-> matrix_index
+        self.product_id_map = IdIndex(np.empty(0, dtype=np.int64))  # product_id <-> matrix_index
         
         # Data
         self.interaction_matrix = None
         self.product_features = None
         self.popularity_scores = None
+        # Popularity ranking as arrays (item index, combined_score) for the request path
+        self.popular_items = np.empty(0, dtype=np.int32)
+        self.popular_scores = np.empty(0, dtype=np.float32)
         
         # State
         self.is_trained = False
+        self.model_version = None  # Changes on every fit; used to key caches
+        self.source_path = None  # Set by load(); lets worker processes reopen the same artifact
     
     def fit(
         self,
         interactions_df: pd.DataFrame,
-        products_df: Optional[pd.DataFrame] = None
+        products_df: Optional[pd.DataFrame] = None,
+        build_neighbors: bool = False,
+        build_ann: bool = False,
+        profiler=None
     ) -> 'HybridRecommender':
         """
         Train the hybrid recommendation model
@@ -73,48 +110,84 @@ class HybridRecommender:
         Args:
             interactions_df: DataFrame with columns [user_id, product_id, rating, timestamp]
             products_df: Optional DataFrame with product features [product_id, name, description, category]
+            build_neighbors: Precompute the top-N item neighbor index for similar-product lookups
+            build_ann: Build the IVF approximate nearest-neighbor index over item factors
+            profiler: Optional TrainingProfiler timing each step (see training_report.py)
         """
         logger.info("Starting model training...")
+        step = profiler.stage if profiler is not None else (lambda name: nullcontext())
         
         # 1. Build mappings
-        self._build_mappings(interactions_df)
+        with step('build_mappings'):
+            user_codes, product_codes = self._build_mappings(interactions_df)
         
         # 2. Create interaction matrix
-        self.interaction_matrix = self._create_interaction_matrix(interactions_df)
+        with step('create_interaction_matrix'):
+            self.interaction_matrix = self._create_interaction_matrix(interactions_df, user_codes, product_codes)
         logger.info(f"Interaction matrix shape: {self.interaction_matrix.shape}")
         
-        # 3. Train SVD model (Collaborative Filtering)
-        self._train_svd()
+        # 3. Train collaborative filtering factors
+        with step(f'train_{self.algorithm}'):
+            if self.algorithm == 'als':
+                self._train_als()
+            else:
+                self._train_svd()
         
         # 4. Build content-based features (if products provided)
         if products_df is not None and len(products_df) > 0:
-            self._build_content_features(products_df)
+            with step('build_content_features'):
+                self._build_content_features(products_df)
         
         # 5. Calculate popularity scores
-        self._calculate_popularity(interactions_df)
+        with step('calculate_popularity'):
+            self._calculate_popularity(interactions_df)
+        
+        # 6. Precompute item neighbors (optional)
+        if build_neighbors:
+            with step('build_neighbor_index'):
+                self.build_neighbor_index()
+        
+        # 7. Build approximate nearest-neighbor index (optional)
+        if build_ann:
+            with step('build_ann_index'):
+                self.build_ann_index()
         
         self.is_trained = True
-        logger.info("Model training completed!")
+        self.model_version = f"{pd.Timestamp.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+        logger.info(f"Model training completed! (version {self.model_version})")
         
         return self
     
-    def _build_mappings(self, df: pd.DataFrame):
-        """Create bidirectional mappings between IDs and matrix indices"""
-        unique_users = df['user_id'].unique()
-        unique_products = df['product_id'].unique()
+    @property
+    def idx_to_user(self) -> np.ndarray:
+        """matrix_index -> user_id"""
+        return self.user_id_map.ids
+    
+    @property
+    def idx_to_product(self) -> np.ndarray:
+        """matrix_index -> product_id"""
+        return self.product_id_map.ids
+    
+    def _build_mappings(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Create compact array-backed mappings between IDs and matrix indices
         
-        self.user_id_map = {uid: idx for idx, uid in enumerate(unique_users)}
-        self.product_id_map = {pid: idx for idx, pid in enumerate(unique_products)}
-        self.idx_to_user = {idx: uid for uid, idx in self.user_id_map.items()}
-        self.idx_to_product = {idx: pid for pid, idx in self.product_id_map.items()}
+        Returns:
+            Tuple of (user_codes, product_codes): the matrix index of every row of df
+        """
+        user_codes, self.user_id_map = IdIndex.factorize(df['user_id'])
+        product_codes, self.product_id_map = IdIndex.factorize(df['product_id'])
         
         logger.info(f"Mappings created: {len(self.user_id_map)} users, {len(self.product_id_map)} products")
+        return user_codes, product_codes
     
-    def _create_interaction_matrix(self, df: pd.DataFrame) -> csr_matrix:
-        """Create sparse user-item interaction matrix"""
-        rows = df['user_id'].map(self.user_id_map).values
-        cols = df['product_id'].map(self.product_id_map).values
-        
+    def _create_interaction_matrix(
+        self,
+        df: pd.DataFrame,
+        user_codes: np.ndarray,
+        product_codes: np.ndarray
+    ) -> csr_matrix:
+        """Create sparse user-item interaction matrix from the factorized codes"""
         # Use ratings as values
         if 'rating' in df.columns:
             values = df['rating'].values.astype(np.float32)
@@ -122,7 +195,7 @@ class HybridRecommender:
             values = np.ones(len(df), dtype=np.float32)
         
         matrix = csr_matrix(
-            (values, (rows, cols)),
+            (values, (user_codes, product_codes)),
             shape=(len(self.user_id_map), len(self.product_id_map)),
             dtype=np.float32
         )
@@ -154,13 +227,51 @@ class HybridRecommender:
         
         logger.info(f"SVD model trained. User factors: {self.user_factors.shape}, Item factors: {self.item_factors.shape}")
     
+    def _train_als(self):
+        """Train implicit-feedback ALS factors (conjugate gradient, multi-threaded)"""
+        logger.info(
+            f"Training ALS model (factors={self.n_factors}, iterations={self.n_iterations}, "
+            f"regularization={self.regularization}, alpha={self.alpha})..."
+        )
+        
+        self.user_factors, self.item_factors = train_als(
+            self.interaction_matrix,
+            n_factors=self.n_factors,
+            n_iterations=self.n_iterations,
+            regularization=self.regularization,
+            alpha=self.alpha
+        )
+        
+        # Same normalization as the SVD path, so scores stay cosine similarities
+        self.user_factors = normalize(self.user_factors)
+        self.item_factors = normalize(self.item_factors)
+        
+        logger.info(f"ALS model trained. User factors: {self.user_factors.shape}, Item factors: {self.item_factors.shape}")
+    
+    def build_neighbor_index(self, n_neighbors: Optional[int] = None, n_jobs: Optional[int] = None):
+        """Precompute the top-N similar items for every item from the item factors"""
+        if n_neighbors is not None:
+            self.n_neighbors = n_neighbors
+        
+        logger.info(f"Building item neighbor index (n_neighbors={self.n_neighbors})...")
+        self.neighbor_indices, self.neighbor_scores = build_item_neighbors(
+            self.item_factors,
+            n_neighbors=self.n_neighbors,
+            n_jobs=n_jobs
+        )
+    
+    def build_ann_index(self, n_lists: Optional[int] = None, nprobe: int = 8, n_iter: int = 10):
+        """Build an IVF approximate nearest-neighbor index over the item factors"""
+        logger.info(f"Building IVF index over item factors (n_lists={n_lists or 'auto'})...")
+        self.ann_index = IVFIndex(n_lists=n_lists, nprobe=nprobe, n_iter=n_iter).build(self.item_factors)
+    
     def _build_content_features(self, products_df: pd.DataFrame):
         """Build TF-IDF features for content-based recommendations"""
         logger.info("Building content-based features...")
         
         # Only use products that are in our interaction matrix
-        valid_products = set(self.product_id_map.keys())
-        products_df = products_df[products_df['product_id'].isin(valid_products)].copy()
+        valid_products = self.product_id_map.get_indexer(products_df['product_id'].values) >= 0
+        products_df = products_df[valid_products].copy()
         
         if len(products_df) == 0:
             logger.warning("No matching products found for content features")
@@ -190,10 +301,13 @@ class HybridRecommender:
     def _calculate_popularity(self, df: pd.DataFrame):
         """Calculate popularity scores for fallback recommendations"""
         # Count interactions per product
-        product_counts = df.groupby('product_id').agg({
+        # observed=True: categorical ids must not yield rows for unseen categories
+        product_counts = df.groupby('product_id', observed=True).agg({
             'user_id': 'count',
             'rating': 'mean'
         }).rename(columns={'user_id': 'interaction_count', 'rating': 'avg_rating'})
+        if isinstance(product_counts.index, pd.CategoricalIndex):
+            product_counts.index = product_counts.index.astype(product_counts.index.categories.dtype)
         
         # Normalize scores
         scaler = MinMaxScaler()
@@ -211,6 +325,7 @@ class HybridRecommender:
             self.popularity_scores = product_counts.sort_values('combined_score', ascending=False)
         else:
             self.popularity_scores = pd.DataFrame()
+        self._materialize_popularity()
         
         logger.info(f"Popularity scores calculated for {len(self.popularity_scores)} products")
     
@@ -218,7 +333,10 @@ class HybridRecommender:
         self,
         user_id: Any,
         n_recommendations: int = 10,
-        filter_already_bought: bool = True
+        filter_already_bought: bool = True,
+        use_ann: bool = False,
+        nprobe: Optional[int] = None,
+        item_filter: Optional[np.ndarray] = None
     ) -> List[Dict]:
         """
         Get personalized recommendations for a user
@@ -227,6 +345,9 @@ class HybridRecommender:
             user_id: The user ID to get recommendations for
             n_recommendations: Number of recommendations to return
             filter_already_bought: Whether to exclude products the user already bought
+            use_ann: Use the approximate IVF index instead of exact scoring (if built)
+            nprobe: Number of IVF lists to scan when use_ann is set
+            item_filter: Boolean mask of eligible items (business rules), applied before top-k
             
         Returns:
             List of dicts with product_id and score
@@ -235,56 +356,135 @@ class HybridRecommender:
             raise ValueError("Model is not trained yet. Call fit() first.")
         
         # Check if user exists in training data
-        if user_id not in self.user_id_map:
+        with stage('lookup'):
+            user_idx = self.user_id_map.get(user_id)
+        if user_idx is None:
             logger.info(f"User {user_id} not in training data, using popularity-based recommendations")
-            return self._get_popular_recommendations(n_recommendations)
-        
-        user_idx = self.user_id_map[user_id]
+            return self._get_popular_recommendations(n_recommendations, item_filter)
         
         try:
-            # Get user vector
             user_vector = self.user_factors[user_idx]
             
-            # Compute scores for all items
-            scores = user_vector @ self.item_factors.T
+            # Items the user has already interacted with (CSR row slice)
+            exclude = self._get_user_items(user_idx) if filter_already_bought else None
             
-            # Get items the user has already interacted with
-            if filter_already_bought:
-                user_items = set(self.interaction_matrix[user_idx].nonzero()[1])
+            if use_ann and self.ann_index is not None:
+                with stage('ann_search'):
+                    top_idx, top_scores = self.ann_index.search(
+                        user_vector, n_recommendations, nprobe=nprobe, exclude=exclude, item_filter=item_filter
+                    )
             else:
-                user_items = set()
-            
-            # Get top scoring items
-            item_scores = []
-            for item_idx in range(len(scores)):
-                if item_idx not in user_items:
-                    item_scores.append((item_idx, scores[item_idx]))
+                # Score all items with one matrix-vector product
+                with stage('score'):
+                    scores = self.item_factors @ user_vector
+                with stage('mask'):
+                    if exclude is not None and len(exclude) > 0:
+                        scores[exclude] = -np.inf
+                    if item_filter is not None:
+                        np.copyto(scores, -np.inf, where=~item_filter)
+                with stage('topk'):
+                    top_idx, top_scores = top_k(scores, n_recommendations)
             
-            # Sort by score descending
-            item_scores.sort(key=lambda x: x[1], reverse=True)
-            
-            recommendations = []
-            for item_idx, score in item_scores[:n_recommendations]:
-                if item_idx in self.idx_to_product:
-                    recommendations.append({
-                        'product_id': self.idx_to_product[item_idx],
-                        'score': float(score),
+            with stage('format'):
+                recommendations = [
+                    {
+                        'product_id': pid,
+                        'score': score,
                         'strategy': 'collaborative_filtering'
-                    })
+                    }
+                    for pid, score in zip(self.product_id_map.lookup(top_idx), top_scores.tolist())
+                ]
             
             if not recommendations:
-                return self._get_popular_recommendations(n_recommendations)
+                return self._get_popular_recommendations(n_recommendations, item_filter)
             
             return recommendations
             
         except Exception as e:
             logger.error(f"SVD recommendation failed: {e}")
-            return self._get_popular_recommendations(n_recommendations)
+            return self._get_popular_recommendations(n_recommendations, item_filter)
+    
+    def recommend_for_users(
+        self,
+        user_ids: List[Any],
+        n_recommendations: int = 10,
+        filter_already_bought: bool = True,
+        item_filter: Optional[np.ndarray] = None
+    ) -> List[List[Dict]]:
+        """
+        Get personalized recommendations for a batch of users
+        
+        Known users are scored in blocks with one GEMM per block
+        (user_factors[idx] @ item_factors.T) followed by row-wise top-k.
+        Unknown users fall back to popularity-based recommendations.
+        
+        Args:
+            user_ids: The user IDs to get recommendations for
+            n_recommendations: Number of recommendations per user
+            filter_already_bought: Whether to exclude products each user already bought
+            item_filter: Boolean mask of eligible items (business rules), applied before top-k
+            
+        Returns:
+            One list of dicts with product_id and score per input user, in input order
+        """
+        if not self.is_trained:
+            raise ValueError("Model is not trained yet. Call fit() first.")
+        
+        results: List[Optional[List[Dict]]] = [None] * len(user_ids)
+        
+        with stage('lookup'):
+            codes = self.user_id_map.get_indexer(user_ids)
+        positions = np.flatnonzero(codes >= 0).tolist()
+        user_indices = codes[codes >= 0]
+        
+        # Bound the (block_size, n_items) score block to ~BATCH_SCORE_ELEMENTS floats
+        n_items = self.item_factors.shape[0]
+        block_size = max(1, self.BATCH_SCORE_ELEMENTS // max(n_items, 1))
+        
+        for start in range(0, len(positions), block_size):
+            block = user_indices[start:start + block_size]
+            with stage('score'):
+                scores = self.user_factors[block] @ self.item_factors.T
+            
+            if item_filter is not None:
+                with stage('mask'):
+                    np.copyto(scores, -np.inf, where=~item_filter)
+            
+            with stage('topk'):
+                if filter_already_bought:
+                    seen = self.interaction_matrix[block]
+                    top_idx, top_scores = top_k_rows(scores, n_recommendations, seen.indptr, seen.indices)
+                else:
+                    top_idx, top_scores = top_k_rows(scores, n_recommendations)
+            
+            with stage('format'):
+                for pos, row_idx, row_scores in zip(positions[start:start + block_size], top_idx, top_scores):
+                    valid = np.isfinite(row_scores)
+                    results[pos] = [
+                        {
+                            'product_id': pid,
+                            'score': score,
+                            'strategy': 'collaborative_filtering'
+                        }
+                        for pid, score in zip(self.product_id_map.lookup(row_idx[valid]), row_scores[valid].tolist())
+                    ]
+        
+        popular = None
+        for pos, recommendations in enumerate(results):
+            if not recommendations:
+                if popular is None:
+                    popular = self._get_popular_recommendations(n_recommendations, item_filter)
+                results[pos] = list(popular)
+        
+        return results
     
     def recommend_similar_products(
         self,
         product_id: Any,
-        n_recommendations: int = 5
+        n_recommendations: int = 5,
+        use_ann: bool = False,
+        nprobe: Optional[int] = None,
+        item_filter: Optional[np.ndarray] = None
     ) -> List[Dict]:
         """
         Get products similar to a given product
@@ -292,137 +492,343 @@ class HybridRecommender:
         Args:
             product_id: The product to find similar products for
             n_recommendations: Number of similar products to return
+            use_ann: Use the approximate IVF index instead of exact scoring (if built)
+            nprobe: Number of IVF lists to scan when use_ann is set
+            item_filter: Boolean mask of eligible items (business rules), applied before top-k
         """
         if not self.is_trained:
             raise ValueError("Model is not trained yet. Call fit() first.")
         
-        if product_id not in self.product_id_map:
+        with stage('lookup'):
+            product_idx = self.product_id_map.get(product_id)
+        if product_idx is None:
             logger.warning(f"Product {product_id} not in training data")
-            return self._get_popular_recommendations(n_recommendations)
-        
-        product_idx = self.product_id_map[product_id]
+            return self._get_popular_recommendations(n_recommendations, item_filter)
+        
+        # Serve from the precomputed neighbor index when it is wide enough
+        if self.neighbor_indices is not None and n_recommendations <= self.neighbor_indices.shape[1]:
+            with stage('neighbors'):
+                neighbors = self.neighbor_indices[product_idx]
+                scores = self.neighbor_scores[product_idx]
+                if item_filter is not None:
+                    eligible = item_filter[neighbors]
+                    neighbors, scores = neighbors[eligible], scores[eligible]
+            # A filter can leave too few precomputed neighbors; score all items then
+            if len(neighbors) >= n_recommendations:
+                with stage('format'):
+                    return [
+                        {
+                            'product_id': pid,
+                            'similarity': score,
+                            'strategy': 'item_similarity'
+                        }
+                        for pid, score in zip(
+                            self.product_id_map.lookup(neighbors[:n_recommendations]),
+                            scores[:n_recommendations].tolist()
+                        )
+                    ]
         
         try:
-            # Get item vector
             item_vector = self.item_factors[product_idx]
+            exclude = np.array([product_idx])
             
-            # Compute similarity with all items
-            similarities = item_vector @ self.item_factors.T
-            
-            # Get top similar items (excluding itself)
-            item_scores = []
-            for idx in range(len(similarities)):
-                if idx != product_idx:
-                    item_scores.append((idx, similarities[idx]))
-            
-            item_scores.sort(key=lambda x: x[1], reverse=True)
+            if use_ann and self.ann_index is not None:
+                with stage('ann_search'):
+                    top_idx, top_scores = self.ann_index.search(
+                        item_vector, n_recommendations, nprobe=nprobe, exclude=exclude, item_filter=item_filter
+                    )
+            else:
+                # Compute similarity with all items, excluding the product itself
+                with stage('score'):
+                    similarities = self.item_factors @ item_vector
+                if item_filter is not None:
+                    with stage('mask'):
+                        np.copyto(similarities, -np.inf, where=~item_filter)
+                with stage('topk'):
+                    top_idx, top_scores = top_k(similarities, n_recommendations, exclude=exclude)
             
-            recommendations = []
-            for item_idx, score in item_scores[:n_recommendations]:
-                if item_idx in self.idx_to_product:
-                    recommendations.append({
-                        'product_id': self.idx_to_product[item_idx],
-                        'similarity': float(score),
+            with stage('format'):
+                return [
+                    {
+                        'product_id': pid,
+                        'similarity': score,
                         'strategy': 'item_similarity'
-                    })
-            
-            return recommendations
+                    }
+                    for pid, score in zip(self.product_id_map.lookup(top_idx), top_scores.tolist())
+                ]
             
         except Exception as e:
             logger.error(f"Item similarity failed: {e}")
-            return self._get_popular_recommendations(n_recommendations)
+            return self._get_popular_recommendations(n_recommendations, item_filter)
     
-    def _get_popular_recommendations(self, n: int) -> List[Dict]:
-        """Fallback to popularity-based recommendations"""
-        if self.popularity_scores is None or len(self.popularity_scores) == 0:
-            return []
-        
-        top_products = self.popularity_scores.head(n)
-        
-        return [
-            {
-                'product_id': pid,
-                'score': float(row['combined_score']),
-                'strategy': 'popularity'
-            }
-            for pid, row in top_products.iterrows()
-        ]
+    def _get_user_items(self, user_idx: int) -> np.ndarray:
+        """Item indices the user interacted with, read from the CSR indptr"""
+        matrix = self.interaction_matrix
+        return matrix.indices[matrix.indptr[user_idx]:matrix.indptr[user_idx + 1]]
+    
+    def _materialize_popularity(self):
+        """Precompute the popularity ranking as arrays from popularity_scores"""
+        popularity = self.popularity_scores
+        if popularity is None or len(popularity) == 0:
+            self.popular_items = np.empty(0, dtype=np.int32)
+            self.popular_scores = np.empty(0, dtype=np.float32)
+            return
+        items = self.product_id_map.get_indexer(popularity.index.values)
+        known = items >= 0
+        self.popular_items = items[known].astype(np.int32)
+        self.popular_scores = popularity['combined_score'].to_numpy(np.float32)[known]
+    
+    def _get_popular_recommendations(self, n: int, item_filter: Optional[np.ndarray] = None) -> List[Dict]:
+        """Fallback to popularity-based recommendations (slices of the precomputed ranking)"""
+        with stage('popularity'):
+            items, scores = self.popular_items, self.popular_scores
+            if item_filter is not None:
+                eligible = item_filter[items]
+                items, scores = items[eligible], scores[eligible]
+            product_ids = self.product_id_map.ids[items[:n]].tolist()
+            scores = scores[:n].tolist()
+            
+            return [
+                {
+                    'product_id': pid,
+                    'score': score,
+                    'strategy': 'popularity'
+                }
+                for pid, score in zip(product_ids, scores)
+            ]
     
     def get_user_embedding(self, user_id: Any) -> Optional[np.ndarray]:
         """Get the learned embedding vector for a user"""
-        if user_id not in self.user_id_map:
+        user_idx = self.user_id_map.get(user_id)
+        if user_idx is None:
             return None
         
-        user_idx = self.user_id_map[user_id]
         return self.user_factors[user_idx]
     
     def get_product_embedding(self, product_id: Any) -> Optional[np.ndarray]:
         """Get the learned embedding vector for a product"""
-        if product_id not in self.product_id_map:
+        product_idx = self.product_id_map.get(product_id)
+        if product_idx is None:
             return None
         
-        product_idx = self.product_id_map[product_id]
         return self.item_factors[product_idx]
     
+    @staticmethod
+    def resolve_path(path: str) -> Optional[Path]:
+        """
+        Find the model on disk for a configured path
+        
+        Prefers a directory artifact and falls back to a legacy joblib file,
+        so "models/recommender_model" and "models/recommender_model.joblib"
+        both resolve to whichever exists.
+        """
+        path = Path(path)
+        base = path.with_suffix('') if path.suffix == '.joblib' else path
+        
+        if is_artifact(base):
+            return base
+        
+        legacy = base.with_suffix('.joblib')
+        if legacy.is_file():
+            return legacy
+        
+        return None
+    
     def save(self, path: str):
-        """Save the trained model to disk"""
+        """
+        Save the trained model to disk as a directory artifact
+        
+        Arrays are written as .npy files (factors, CSR parts, popularity,
+        neighbor/ANN indexes, id arrays) next to a JSON manifest so that
+        load() can memory-map them.
+        """
         path = Path(path)
-        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == '.joblib':
+            path = path.with_suffix('')
         
-        model_data = {
-            'svd_model': self.svd_model,
+        arrays = {
             'user_factors': self.user_factors,
             'item_factors': self.item_factors,
-            'tfidf_vectorizer': self.tfidf_vectorizer,
-            'content_matrix': self.content_matrix,
-            'user_id_map': self.user_id_map,
-            'product_id_map': self.product_id_map,
-            'idx_to_user': self.idx_to_user,
-            'idx_to_product': self.idx_to_product,
-            'interaction_matrix': self.interaction_matrix,
-            'popularity_scores': self.popularity_scores,
+            'user_ids': self.user_id_map.ids,
+            'user_ids_sorter': self.user_id_map.sorter,
+            'product_ids': self.product_id_map.ids,
+            'product_ids_sorter': self.product_id_map.sorter,
+            'interaction_indptr': self.interaction_matrix.indptr,
+            'interaction_indices': self.interaction_matrix.indices,
+            'interaction_data': self.interaction_matrix.data,
+            'neighbor_indices': self.neighbor_indices,
+            'neighbor_scores': self.neighbor_scores,
+        }
+        
+        if self.popularity_scores is not None and len(self.popularity_scores) > 0:
+            popularity = self.popularity_scores
+            arrays['popularity_items'] = self.product_id_map.get_indexer(popularity.index.values).astype(np.int32)
+            for column in ['interaction_count', 'avg_rating', 'popularity_score', 'combined_score']:
+                arrays[f'popularity_{column}'] = popularity[column].to_numpy()
+        
+        if self.content_matrix is not None:
+            content = self.content_matrix.tocsr()
+            arrays['content_indptr'] = content.indptr
+            arrays['content_indices'] = content.indices
+            arrays['content_data'] = content.data
+        
+        if self.ann_index is not None:
+            for name, value in self.ann_index.to_dict().items():
+                if isinstance(value, np.ndarray):
+                    arrays[f'ann_{name}'] = value
+        
+        manifest = {
+            'created_at': pd.Timestamp.now().isoformat(),
+            'model_version': self.model_version,
             'n_factors': self.n_factors,
-            'is_trained': self.is_trained
+            'n_neighbors': self.n_neighbors,
+            'algorithm': self.algorithm,
+            'regularization': self.regularization,
+            'alpha': self.alpha,
+            'is_trained': self.is_trained,
+            'interaction_shape': list(self.interaction_matrix.shape),
+            'content_shape': list(self.content_matrix.shape) if self.content_matrix is not None else None,
+            'ann_index': {
+                'n_lists': self.ann_index.n_lists,
+                'nprobe': self.ann_index.nprobe,
+            } if self.ann_index is not None else None,
         }
         
-        joblib.dump(model_data, path)
+        def write_vectorizer(directory: Path):
+            # The vectorizer is a fitted sklearn object, not an array; keep it as a sidecar
+            if self.tfidf_vectorizer is not None:
+                joblib.dump(self.tfidf_vectorizer, directory / 'tfidf_vectorizer.joblib')
+        
+        save_artifact(path, arrays, manifest, write_extra=write_vectorizer)
+        
         logger.info(f"Model saved to {path}")
     
     @classmethod
-    def load(cls, path: str) -> 'HybridRecommender':
-        """Load a trained model from disk"""
-        path = Path(path)
+    def load(cls, path: str, mmap: bool = True) -> 'HybridRecommender':
+        """
+        Load a trained model from disk
         
-        if not path.exists():
+        Directory artifacts are memory-mapped read-only (mmap=True) so worker
+        processes share pages. Legacy joblib files are still supported.
+        """
+        resolved = cls.resolve_path(path)
+        
+        if resolved is None:
             raise FileNotFoundError(f"Model file not found: {path}")
         
+        if resolved.is_file():
+            recommender = cls._load_joblib(resolved)
+        else:
+            recommender = cls._load_artifact(resolved, mmap=mmap)
+        recommender.source_path = str(resolved)
+        
+        logger.info(f"Model loaded from {resolved}")
+        return recommender
+    
+    @classmethod
+    def _load_artifact(cls, path: Path, mmap: bool = True) -> 'HybridRecommender':
+        arrays, manifest = load_artifact(path, mmap=mmap)
+        # Sidecars come from the same version directory as the arrays
+        path = Path(manifest.get('resolved_path', path))
+        
+        recommender = cls(
+            n_factors=manifest.get('n_factors', 64),
+            n_neighbors=manifest.get('n_neighbors', 50),
+            algorithm=manifest.get('algorithm', 'svd'),
+            regularization=manifest.get('regularization', 0.1),
+            alpha=manifest.get('alpha', 40.0)
+        )
+        recommender.user_factors = arrays['user_factors']
+        recommender.item_factors = arrays['item_factors']
+        recommender.neighbor_indices = arrays.get('neighbor_indices')
+        recommender.neighbor_scores = arrays.get('neighbor_scores')
+        
+        recommender.user_id_map = IdIndex(arrays['user_ids'], arrays.get('user_ids_sorter'))
+        recommender.product_id_map = IdIndex(arrays['product_ids'], arrays.get('product_ids_sorter'))
+        
+        recommender.interaction_matrix = csr_matrix(
+            (arrays['interaction_data'], arrays['interaction_indices'], arrays['interaction_indptr']),
+            shape=tuple(manifest['interaction_shape']),
+            copy=False
+        )
+        
+        if 'popularity_items' in arrays:
+            recommender.popularity_scores = pd.DataFrame(
+                {
+                    column: arrays[f'popularity_{column}']
+                    for column in ['interaction_count', 'avg_rating', 'popularity_score', 'combined_score']
+                },
+                index=pd.Index(arrays['product_ids'][arrays['popularity_items']], name='product_id')
+            )
+            recommender.popular_items = arrays['popularity_items']
+            recommender.popular_scores = arrays['popularity_combined_score'].astype(np.float32)
+        else:
+            recommender.popularity_scores = pd.DataFrame()
+        
+        if 'content_indptr' in arrays:
+            recommender.content_matrix = csr_matrix(
+                (arrays['content_data'], arrays['content_indices'], arrays['content_indptr']),
+                shape=tuple(manifest['content_shape']),
+                copy=False
+            )
+        
+        vectorizer_path = path / 'tfidf_vectorizer.joblib'
+        if vectorizer_path.exists():
+            recommender.tfidf_vectorizer = joblib.load(vectorizer_path)
+        
+        if manifest.get('ann_index') is not None:
+            recommender.ann_index = IVFIndex.from_dict({
+                **manifest['ann_index'],
+                'centroids': arrays['ann_centroids'],
+                'list_offsets': arrays['ann_list_offsets'],
+                'list_items': arrays['ann_list_items'],
+                'list_vectors': arrays['ann_list_vectors'],
+            })
+        
+        recommender.is_trained = manifest.get('is_trained', True)
+        recommender.model_version = manifest.get('model_version') or f"artifact-{path.stat().st_mtime_ns}"
+        return recommender
+    
+    @classmethod
+    def _load_joblib(cls, path: Path) -> 'HybridRecommender':
+        """Load a model pickled by the previous single-file joblib format"""
         model_data = joblib.load(path)
         
-        recommender = cls(n_factors=model_data.get('n_factors', 64))
+        recommender = cls(
+            n_factors=model_data.get('n_factors', 64),
+            n_neighbors=model_data.get('n_neighbors', 50)
+        )
         recommender.svd_model = model_data.get('svd_model')
         recommender.user_factors = model_data.get('user_factors')
         recommender.item_factors = model_data.get('item_factors')
         recommender.tfidf_vectorizer = model_data.get('tfidf_vectorizer')
         recommender.content_matrix = model_data.get('content_matrix')
-        recommender.user_id_map = model_data['user_id_map']
-        recommender.product_id_map = model_data['product_id_map']
-        recommender.idx_to_user = model_data['idx_to_user']
-        recommender.idx_to_product = model_data['idx_to_product']
+        recommender.user_id_map = IdIndex.from_mapping(model_data['idx_to_user'])
+        recommender.product_id_map = IdIndex.from_mapping(model_data['idx_to_product'])
         recommender.interaction_matrix = model_data['interaction_matrix']
         recommender.popularity_scores = model_data.get('popularity_scores')
+        recommender._materialize_popularity()
+        recommender.neighbor_indices = model_data.get('neighbor_indices')
+        recommender.neighbor_scores = model_data.get('neighbor_scores')
+        if model_data.get('ann_index') is not None:
+            recommender.ann_index = IVFIndex.from_dict(model_data['ann_index'])
         recommender.is_trained = model_data.get('is_trained', True)
+        recommender.model_version = f"legacy-{path.stat().st_mtime_ns}"
         
-        logger.info(f"Model loaded from {path}")
         return recommender
     
     def get_stats(self) -> Dict:
         """Get model statistics"""
         return {
             'is_trained': self.is_trained,
+            'model_version': self.model_version,
             'n_users': len(self.user_id_map),
             'n_products': len(self.product_id_map),
             'n_factors': self.n_factors,
+            'algorithm': self.algorithm,
             'has_content_features': self.content_matrix is not None,
+            'has_neighbor_index': self.neighbor_indices is not None,
+            'has_ann_index': self.ann_index is not None,
             'has_popularity_scores': self.popularity_scores is not None and len(self.popularity_scores) > 0
         }
 
@@ -442,7 +848,7 @@ if __name__ == "__main__":
     model.fit(interactions_df)
     
     # Test recommendations
-    test_user = list(model.user_id_map.keys())[0]
+    test_user = model.idx_to_user[0]
     recs = model.recommend_for_user(test_user, n_recommendations=5)
     
     print(f"\nRecommendations for user {test_user}:")
@@ -450,7 +856,7 @@ if __name__ == "__main__":
         print(f"  {rec}")
     
     # Test similar products
-    test_product = list(model.product_id_map.keys())[0]
+    test_product = model.idx_to_product[0]
     similar = model.recommend_similar_products(test_product, n_recommendations=3)
     
     print(f"\nProducts similar to {test_product}:")
@@ -458,8 +864,8 @@ if __name__ == "__main__":
         print(f"  {sim}")
     
     # Save model
-    model.save("models/test_model.joblib")
+    model.save("models/test_model")
     
     # Load and verify
-    loaded_model = HybridRecommender.load("models/test_model.joblib")
+    loaded_model = HybridRecommender.load("models/test_model")
     print(f"\nModel stats: {loaded_model.get_stats()}")
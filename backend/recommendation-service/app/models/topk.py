@@ -0,0 +1,97 @@
+"""
+Top-k selection engine shared by the recommenders
+
+Scores are masked in place (excluded items get -inf), candidates are selected
+with np.argpartition in O(n_items) and only the k survivors are sorted.
+"""
+import numpy as np
+from typing import Optional, Tuple
+
+
+def _empty() -> Tuple[np.ndarray, np.ndarray]:
+    return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+
+def top_k(
+    scores: np.ndarray,
+    k: int,
+    exclude: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the k highest scores of a 1-D score vector
+
+    Args:
+        scores: Scores for every item. Modified in place when exclude is given.
+        k: Number of items to keep
+        exclude: Items to drop, either a boolean mask (True = drop) or an array
+            of item indices (e.g. a CSR row slice of the interaction matrix)
+
+    Returns:
+        Tuple of (item_indices, scores) sorted by descending score
+    """
+    n_items = scores.shape[0]
+    k = min(int(k), n_items)
+    if k <= 0:
+        return _empty()
+
+    if exclude is not None and len(exclude) > 0:
+        scores[exclude] = -np.inf
+
+    if k < n_items:
+        candidates = np.argpartition(scores, n_items - k)[n_items - k:]
+    else:
+        candidates = np.arange(n_items)
+
+    candidate_scores = scores[candidates]
+    order = np.argsort(-candidate_scores, kind='stable')
+    top_idx = candidates[order]
+    top_scores = candidate_scores[order]
+
+    # Fewer than k items may survive the mask
+    valid = np.isfinite(top_scores)
+    if not valid.all():
+        top_idx, top_scores = top_idx[valid], top_scores[valid]
+
+    return top_idx, top_scores
+
+
+def top_k_rows(
+    scores: np.ndarray,
+    k: int,
+    indptr: Optional[np.ndarray] = None,
+    indices: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row-wise top-k selection over a (n_rows, n_items) score block
+
+    Args:
+        scores: Score block, one row per query. Modified in place when masked.
+        k: Number of items to keep per row
+        indptr, indices: Optional CSR structure (one row per score row) of items
+            to exclude, e.g. interaction_matrix[user_indices]
+
+    Returns:
+        Tuple of (item_indices, scores), both (n_rows, k) and sorted by
+        descending score. Slots left empty by the mask hold -inf scores.
+    """
+    n_rows, n_items = scores.shape
+    k = min(int(k), n_items)
+    if k <= 0 or n_rows == 0:
+        return np.empty((n_rows, 0), dtype=np.int64), np.empty((n_rows, 0), dtype=scores.dtype)
+
+    if indptr is not None and indices is not None and len(indices) > 0:
+        rows = np.repeat(np.arange(n_rows), np.diff(indptr))
+        scores[rows, indices] = -np.inf
+
+    if k < n_items:
+        candidates = np.argpartition(scores, n_items - k, axis=1)[:, n_items - k:]
+    else:
+        candidates = np.broadcast_to(np.arange(n_items), (n_rows, n_items))
+
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind='stable')
+
+    return (
+        np.take_along_axis(candidates, order, axis=1),
+        np.take_along_axis(candidate_scores, order, axis=1)
+    )
@@ -0,0 +1,299 @@
+"""
+Training cost report
+
+TrainingProfiler times named stages of a training run: wall time, CPU time
+(process-wide, so it includes BLAS threads), resident memory at the start,
+end and peak of the stage, the tracemalloc peak, and the source lines that
+allocated the most memory still held when the stage ended. Resident memory
+is read from /proc/self/statm by a sampling thread while a stage runs; on
+platforms without it the RSS fields are null.
+
+The report is written as training_report.json inside the model artifact,
+and a one-line summary is appended to a JSONL history so consecutive runs
+can be compared (stage names are stable across runs).
+"""
+import json
+import os
+import platform
+import sys
+import sysconfig
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+REPORT_FILE = 'training_report.json'
+
+SERVICE_ROOT = Path(__file__).resolve().parents[2]
+
+# Frames excluded from the top allocators (the profiler's own bookkeeping included)
+_IGNORED_TRACES = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, threading.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, '<frozen abc>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes (None where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _mb(n_bytes: Optional[float]) -> Optional[float]:
+    return round(n_bytes / (1024 * 1024), 2) if n_bytes is not None else None
+
+
+def _short_path(filename: str) -> str:
+    """Machine-independent source location (relative to the repo, site-packages or the stdlib)"""
+    marker = 'site-packages' + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    stdlib = sysconfig.get_paths()['stdlib'] + os.sep
+    if filename.startswith(stdlib):
+        return filename[len(stdlib):]
+    try:
+        relative = os.path.relpath(filename, SERVICE_ROOT)
+    except ValueError:
+        return filename
+    return filename if relative.startswith('..') else relative
+
+
+class _RssSampler(threading.Thread):
+    """Track the highest RSS seen while a stage runs"""
+
+    def __init__(self, interval: float):
+        super().__init__(name='rss-sampler', daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            rss = current_rss()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def stop(self) -> Optional[int]:
+        self._stop_event.set()
+        self.join()
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+        return self.peak
+
+
+class TrainingProfiler:
+    """
+    Collect per-stage cost measurements for one training run
+
+    Args:
+        trace_allocations: Run tracemalloc and record top allocators per stage
+            (slows allocation-heavy Python code; recorded in the report)
+        top_allocations: Allocation sites kept per stage
+        rss_interval: Seconds between RSS samples
+    """
+
+    def __init__(self, trace_allocations: bool = True, top_allocations: int = 10, rss_interval: float = 0.01):
+        self.trace_allocations = trace_allocations
+        self.top_allocations = top_allocations
+        self.rss_interval = rss_interval
+
+        self.stages: List[Dict] = []
+        self.sections: Dict[str, Dict] = {}
+        self.started_at = pd.Timestamp.now()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self._active: Optional[str] = None
+
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _top_allocations(self, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> List[Dict]:
+        stats = after.filter_traces(_IGNORED_TRACES).compare_to(before.filter_traces(_IGNORED_TRACES), 'lineno')
+        top = [stat for stat in stats if stat.size_diff > 0][:self.top_allocations]
+        return [
+            {
+                'location': f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                'size_diff_mb': _mb(stat.size_diff),
+                'count_diff': stat.count_diff,
+            }
+            for stat in top
+        ]
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Measure a block as one stage
+
+        Stages do not nest: a stage opened inside another only runs its
+        block, so the tracemalloc peak of the outer stage stays correct.
+        """
+        if self._active is not None:
+            yield
+            return
+
+        self._active = name
+        tracing = self.trace_allocations and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+        sampler = _RssSampler(self.rss_interval)
+        rss_start = sampler.peak
+        sampler.start()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            rss_peak = sampler.stop()
+            entry = {
+                'name': name,
+                'wall_seconds': round(wall, 4),
+                'cpu_seconds': round(cpu, 4),
+                'rss_start_mb': _mb(rss_start),
+                'rss_end_mb': _mb(current_rss()),
+                'rss_peak_mb': _mb(rss_peak),
+            }
+            if tracing:
+                _, traced_peak = tracemalloc.get_traced_memory()
+                entry['traced_peak_mb'] = _mb(traced_peak)
+                entry['top_allocations'] = self._top_allocations(before, tracemalloc.take_snapshot())
+            self.stages.append(entry)
+            self._active = None
+            logger.info(
+                f"Stage {name}: {wall:.2f}s wall, {cpu:.2f}s CPU, "
+                f"peak RSS {entry['rss_peak_mb']} MB"
+            )
+
+    def record_dataset(self, df: pd.DataFrame, name: str = 'dataset'):
+        """Size of an interactions DataFrame"""
+        self.sections[name] = {
+            'rows': int(len(df)),
+            'users': int(df['user_id'].nunique()),
+            'products': int(df['product_id'].nunique()),
+            'memory_mb': _mb(int(df.memory_usage(deep=True).sum())),
+        }
+
+    def record_model(self, model):
+        """Shapes and in-memory sizes of the trained model's main arrays"""
+        matrix = model.interaction_matrix
+        n_users, n_items = matrix.shape
+        self.sections['model'] = {
+            'model_version': model.model_version,
+            'algorithm': model.algorithm,
+            'n_factors': int(model.item_factors.shape[1]),
+            'n_users': int(n_users),
+            'n_products': int(n_items),
+            'interactions_nnz': int(matrix.nnz),
+            'density': round(matrix.nnz / max(1, n_users * n_items), 8),
+            'interaction_matrix_mb': _mb(matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes),
+            'factors_mb': _mb(model.user_factors.nbytes + model.item_factors.nbytes),
+        }
+
+    def record_artifact(self, path: str):
+        """Bytes on disk of the saved artifact, per file"""
+        path = Path(path)
+        files = sorted(p for p in path.rglob('*') if p.is_file()) if path.is_dir() else [path]
+        sizes = {str(p.relative_to(path)) if path.is_dir() else p.name: p.stat().st_size for p in files}
+        self.sections['artifact'] = {
+            'path': str(path),
+            'bytes': int(sum(sizes.values())),
+            'files': sizes,
+        }
+
+    def report(self, **extra) -> Dict:
+        try:
+            import resource
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Kilobytes on Linux, bytes on macOS
+            max_rss = max_rss if sys.platform == 'darwin' else max_rss * 1024
+        except ImportError:
+            max_rss = None
+
+        return {
+            'started_at': self.started_at.isoformat(),
+            'finished_at': pd.Timestamp.now().isoformat(),
+            'wall_seconds': round(time.perf_counter() - self._start_wall, 4),
+            'cpu_seconds': round(time.process_time() - self._start_cpu, 4),
+            'max_rss_mb': _mb(max_rss),
+            'tracemalloc': self.trace_allocations,
+            'environment': {
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+            },
+            **extra,
+            **self.sections,
+            'stages': self.stages,
+        }
+
+    def write(self, model_path: str, history_path: Optional[str] = None, **extra) -> Dict:
+        """
+        Write the report next to the model and append a summary to history_path
+
+        Returns:
+            The report
+        """
+        report = self.report(**extra)
+        path = Path(model_path)
+        report_path = path / REPORT_FILE if path.is_dir() else path.with_name(f"{path.name}.{REPORT_FILE}")
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Training report written to {report_path}")
+
+        if history_path is not None:
+            self._append_history(Path(history_path), report)
+        return report
+
+    def _append_history(self, history_path: Path, report: Dict):
+        summary = {
+            'finished_at': report['finished_at'],
+            'model_version': report.get('model', {}).get('model_version'),
+            'algorithm': report.get('model', {}).get('algorithm'),
+            'rows': report.get('dataset', {}).get('rows'),
+            'tracemalloc': report['tracemalloc'],
+            'wall_seconds': report['wall_seconds'],
+            'cpu_seconds': report['cpu_seconds'],
+            'max_rss_mb': report['max_rss_mb'],
+            'artifact_bytes': report.get('artifact', {}).get('bytes'),
+            'stages': {stage['name']: stage['wall_seconds'] for stage in report['stages']},
+        }
+
+        # Compare with the last run of the same configuration and dataset size
+        previous = None
+        comparable = ('algorithm', 'rows', 'tracemalloc')
+        if history_path.exists():
+            with open(history_path) as f:
+                runs = [json.loads(line) for line in f if line.strip()]
+            previous = next(
+                (run for run in reversed(runs) if all(run.get(key) == summary[key] for key in comparable)), None
+            )
+        if previous is not None and previous.get('wall_seconds'):
+            change = summary['wall_seconds'] / previous['wall_seconds'] - 1
+            logger.info(
+                f"Training took {summary['wall_seconds']:.2f}s ({change:+.0%} vs previous comparable run), "
+                f"max RSS {summary['max_rss_mb']} MB "
+                f"(previous {previous.get('max_rss_mb')} MB)"
+            )
+
+        history_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(history_path, 'a') as f:
+            f.write(json.dumps(summary) + '\n')
@@ -0,0 +1,247 @@
+"""
+Materialized popularity lists for the /popular endpoint
+
+PopularityAggregator keeps an incremental aggregate of non-cancelled order
+lines: all-time totals per product plus hourly buckets for the time windows.
+Each refresh only reads the order lines after its (created_at, id)
+watermark, folds them in, and publishes a new immutable PopularitySnapshot
+of array-backed top-N lists (global, per category, per window and per
+category x window). Requests only read the current snapshot reference, so
+they never touch the database or sort anything.
+
+Order lines are aggregated when first seen; a periodic full rebuild drops
+lines of orders cancelled afterwards.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from app.data.database import INTERACTION_SOURCES, DatabaseLoader, build_delta_query
+from app.data.incremental import INITIAL_WATERMARK, format_watermark_timestamp
+
+# Window name -> length
+WINDOWS = {
+    '24h': pd.Timedelta(hours=24),
+    '7d': pd.Timedelta(days=7),
+    '30d': pd.Timedelta(days=30),
+}
+
+_COUNTS = ['order_count', 'total_quantity']
+
+
+@dataclass(frozen=True)
+class TopList:
+    """Product ids ordered by decreasing score"""
+    product_ids: np.ndarray
+    scores: np.ndarray
+
+    def head(self, n: int) -> List[Dict]:
+        return [
+            {'product_id': pid, 'score': score}
+            for pid, score in zip(self.product_ids[:n].tolist(), self.scores[:n].tolist())
+        ]
+
+
+@dataclass(frozen=True)
+class PopularitySnapshot:
+    """Top-N lists keyed by (category or None, window or None)"""
+    lists: Dict[Tuple[Optional[str], Optional[str]], TopList] = field(default_factory=dict)
+    refreshed_at: Optional[pd.Timestamp] = None
+    n_order_lines: int = 0
+
+    def get(self, category: Optional[str] = None, window: Optional[str] = None) -> Optional[TopList]:
+        return self.lists.get((category.lower() if category else None, window))
+
+    @property
+    def categories(self) -> List[str]:
+        return sorted({category for category, _ in self.lists if category is not None})
+
+
+def _top_lists(counts: pd.DataFrame, top_n: int) -> Dict[Optional[str], TopList]:
+    """
+    Global and per-category top-N of a product_id-indexed count frame with a category column
+
+    Ties on order_count are broken by total_quantity, as the SQL ranking did.
+    """
+    if counts.empty:
+        return {}
+    ranked = counts.sort_values(_COUNTS, ascending=False, kind='stable')
+    lists = {
+        None: TopList(ranked.index.to_numpy()[:top_n], ranked['order_count'].to_numpy(np.float64)[:top_n])
+    }
+
+    per_category = ranked[ranked['category'].notna()]
+    per_category = per_category.groupby('category', sort=False).head(top_n)
+    categories = per_category['category'].to_numpy()
+    order = np.argsort(categories, kind='stable')
+    categories = categories[order]
+    ids = per_category.index.to_numpy()[order]
+    scores = per_category['order_count'].to_numpy(np.float64)[order]
+    names, starts = np.unique(categories, return_index=True)
+    bounds = np.append(starts, len(categories))
+    for i, name in enumerate(names):
+        lists[name] = TopList(ids[bounds[i]:bounds[i + 1]], scores[bounds[i]:bounds[i + 1]])
+    return lists
+
+
+class PopularityAggregator:
+    """
+    Incrementally maintained popularity aggregate with snapshot publication
+
+    Args:
+        loader: DatabaseLoader providing the orders and products pools
+        top_n: Length of every materialized list
+        chunk_size: Order lines fetched per round trip during a refresh
+        rebuild_seconds: Interval between full rebuilds (0 = never)
+        category_refresh_seconds: Interval between reloads of the product -> category map
+    """
+
+    def __init__(
+        self,
+        loader: DatabaseLoader,
+        top_n: int = 50,
+        chunk_size: int = 50_000,
+        rebuild_seconds: float = 86400.0,
+        category_refresh_seconds: float = 3600.0
+    ):
+        self.loader = loader
+        self.top_n = top_n
+        self.chunk_size = chunk_size
+        self.rebuild_seconds = rebuild_seconds
+        self.category_refresh_seconds = category_refresh_seconds
+
+        # Refreshes are serialized; readers only take self.snapshot
+        self._refresh_lock = threading.Lock()
+        self.snapshot = PopularitySnapshot()
+
+        self._reset()
+        self._categories = pd.Series(dtype=object)
+        self._categories_loaded_at = None
+        self._missing_categories = pd.Index([])
+
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.last_refresh_seconds = 0.0
+
+    def _reset(self):
+        self._watermark = dict(INITIAL_WATERMARK)
+        self._totals = pd.DataFrame(columns=_COUNTS, dtype=np.int64)
+        self._hourly = pd.DataFrame(columns=_COUNTS, dtype=np.int64)
+        self._n_lines = 0
+        self._built_at = time.monotonic()
+
+    def _fold(self, delta: pd.DataFrame):
+        """Add a batch of order lines to the totals and hourly buckets"""
+        delta = delta.assign(
+            hour=pd.to_datetime(delta['timestamp']).dt.floor('h'),
+            quantity=delta['quantity'].fillna(1).astype(np.int64)
+        )
+        per_hour = delta.groupby(['product_id', 'hour']).agg(
+            order_count=('row_id', 'size'),
+            total_quantity=('quantity', 'sum')
+        )
+        per_product = per_hour.groupby(level='product_id').sum()
+
+        self._totals = per_product if self._totals.empty else \
+            self._totals.add(per_product, fill_value=0).astype(np.int64)
+        self._hourly = per_hour if self._hourly.empty else \
+            self._hourly.add(per_hour, fill_value=0).astype(np.int64)
+        self._n_lines += len(delta)
+
+    def _prune(self, now: pd.Timestamp):
+        """Drop hourly buckets older than the longest window"""
+        if self._hourly.empty:
+            return
+        horizon = now - max(WINDOWS.values())
+        hours = self._hourly.index.get_level_values('hour')
+        self._hourly = self._hourly[hours >= horizon]
+
+    def _refresh_categories(self):
+        stale = self._categories_loaded_at is None or \
+            time.monotonic() - self._categories_loaded_at > self.category_refresh_seconds
+        # Products still missing after a reload (deleted, synthetic ids) only count once:
+        # reload early when new unknown products appear, not on every refresh
+        uncategorized = self._totals.index[~self._totals.index.isin(self._categories.index)]
+        unknown = not uncategorized.isin(self._missing_categories).all()
+        if not (stale or unknown):
+            return
+        categories = self.loader.load_product_categories()
+        if not categories.empty:
+            self._categories = categories.set_index('product_id')['category'].str.lower()
+        self._categories_loaded_at = time.monotonic()
+        self._missing_categories = self._totals.index[~self._totals.index.isin(self._categories.index)]
+
+    def _build_snapshot(self, now: pd.Timestamp) -> PopularitySnapshot:
+        lists = {}
+
+        def add(counts: pd.DataFrame, window: Optional[str]):
+            counts = counts.assign(category=self._categories.reindex(counts.index).to_numpy())
+            for category, top in _top_lists(counts, self.top_n).items():
+                lists[(category, window)] = top
+
+        add(self._totals, None)
+        if not self._hourly.empty:
+            hours = self._hourly.index.get_level_values('hour')
+            for name, length in WINDOWS.items():
+                recent = self._hourly[hours >= now - length]
+                add(recent.groupby(level='product_id').sum(), name)
+
+        return PopularitySnapshot(lists=lists, refreshed_at=now, n_order_lines=self._n_lines)
+
+    def refresh(self) -> PopularitySnapshot:
+        """Fold new order lines into the aggregate and publish a new snapshot"""
+        with self._refresh_lock:
+            start = time.perf_counter()
+            try:
+                if self.rebuild_seconds and time.monotonic() - self._built_at > self.rebuild_seconds:
+                    logger.info("Rebuilding popularity aggregate from scratch")
+                    self._reset()
+
+                pool = self.loader.get_pool(INTERACTION_SOURCES['orders']['database'])
+                n_new = 0
+                for chunk in pool.stream(build_delta_query('orders'), self._watermark, chunk_size=self.chunk_size):
+                    last = chunk.iloc[-1]
+                    self._fold(chunk)
+                    self._watermark = {
+                        'created_at': format_watermark_timestamp(last['timestamp']),
+                        'id': int(last['row_id'])
+                    }
+                    n_new += len(chunk)
+
+                now = pd.Timestamp.now()
+                self._prune(now)
+                self._refresh_categories()
+                self.snapshot = self._build_snapshot(now)
+            except Exception:
+                self.refresh_failures += 1
+                raise
+            finally:
+                self.last_refresh_seconds = time.perf_counter() - start
+
+            self.refreshes += 1
+            if n_new:
+                logger.info(
+                    f"Popularity refreshed with {n_new} new order lines "
+                    f"({len(self.snapshot.lists)} lists, {self.last_refresh_seconds * 1000:.0f} ms)"
+                )
+            return self.snapshot
+
+    def stats(self) -> Dict:
+        snapshot = self.snapshot
+        return {
+            'refreshed_at': snapshot.refreshed_at.isoformat() if snapshot.refreshed_at is not None else None,
+            'order_lines': snapshot.n_order_lines,
+            'products': len(self._totals),
+            'lists': len(snapshot.lists),
+            'categories': len(snapshot.categories),
+            'windows': list(WINDOWS),
+            'watermark': dict(self._watermark),
+            'refreshes': self.refreshes,
+            'refresh_failures': self.refresh_failures,
+            'last_refresh_ms': round(self.last_refresh_seconds * 1000, 3),
+        }
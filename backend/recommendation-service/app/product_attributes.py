@@ -0,0 +1,219 @@
+"""
+Columnar product attributes for request-time business-rule filters
+
+ProductAttributeStore reads the stock, price and category of every product
+from the products database and publishes an immutable ProductAttributes
+snapshot whose arrays are indexed by the serving model's item codes. A
+request's ProductFilter (in stock, category in [...], price range) is
+compiled against the snapshot into one boolean mask of eligible items; the
+recommender drops ineligible items from the score vector before top-k
+selection, so a filtered list is only shorter than requested when fewer
+items qualify. Snapshots are refreshed on a timer and realigned when a new
+model is loaded, without retraining.
+
+Products the database does not know (e.g. catalog items only seen in the
+Amazon dataset) have no stock, price or category, so any filter on that
+attribute excludes them.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from app.data.database import DatabaseLoader
+
+
+@dataclass(frozen=True)
+class ProductFilter:
+    """Business rules a request applies to its recommendations (normalized by create())"""
+    in_stock: bool = False
+    categories: Tuple[str, ...] = ()
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+
+    @classmethod
+    def create(
+        cls,
+        in_stock: bool = False,
+        categories: Optional[Iterable[str]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> 'ProductFilter':
+        """Normalize categories (trimmed, lower-cased, sorted) so equal filters share cache keys"""
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise ValueError(f"min_price ({min_price}) is greater than max_price ({max_price})")
+        names = sorted({str(name).strip().lower() for name in categories or () if str(name).strip()})
+        return cls(bool(in_stock), tuple(names), min_price, max_price)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.in_stock and not self.categories and self.min_price is None and self.max_price is None
+
+    def key(self) -> str:
+        """Stable representation for cache keys and ETags"""
+        return f"stock={int(self.in_stock)};cat={','.join(self.categories)};price={self.min_price}-{self.max_price}"
+
+
+@dataclass(frozen=True)
+class ProductAttributes:
+    """Attribute columns aligned to one model's item indices"""
+    model_version: Optional[str]
+    stock: np.ndarray  # int64, 0 when unknown
+    price: np.ndarray  # float32, NaN when unknown
+    category_ids: np.ndarray  # int64, -1 when unknown
+    category_names: Dict[str, int]  # lower-cased category name -> id
+    refreshed_at: pd.Timestamp
+    n_matched: int  # Items of the model found in the database
+
+    @property
+    def version(self) -> str:
+        """Changes on every refresh; part of the cache key of filtered results"""
+        return self.refreshed_at.isoformat()
+
+    def _category_ids(self, categories: Tuple[str, ...]) -> np.ndarray:
+        """Ids for category names or numeric ids; unknown names match nothing"""
+        ids = []
+        for category in categories:
+            if category in self.category_names:
+                ids.append(self.category_names[category])
+            elif category.isdigit():
+                ids.append(int(category))
+        return np.asarray(ids, dtype=np.int64)
+
+    def compile(self, product_filter: ProductFilter) -> Optional[np.ndarray]:
+        """
+        Boolean mask of the items a filter allows (None when the filter is empty)
+
+        Comparisons with a NaN price are False, so unpriced items never pass a price bound.
+        """
+        if product_filter.is_empty:
+            return None
+
+        mask = np.ones(len(self.stock), dtype=bool)
+        if product_filter.in_stock:
+            mask &= self.stock > 0
+        if product_filter.categories:
+            mask &= np.isin(self.category_ids, self._category_ids(product_filter.categories))
+        if product_filter.min_price is not None:
+            mask &= self.price >= product_filter.min_price
+        if product_filter.max_price is not None:
+            mask &= self.price <= product_filter.max_price
+        return mask
+
+
+def align_attributes(products: pd.DataFrame, model) -> ProductAttributes:
+    """Scatter product rows into arrays indexed by the model's item codes"""
+    n_items = len(model.product_id_map)
+    stock = np.zeros(n_items, dtype=np.int64)
+    price = np.full(n_items, np.nan, dtype=np.float32)
+    category_ids = np.full(n_items, -1, dtype=np.int64)
+    category_names: Dict[str, int] = {}
+
+    n_matched = 0
+    if not products.empty:
+        codes = model.product_id_map.get_indexer(products['product_id'].to_numpy())
+        known = codes >= 0
+        rows = products[known]
+        codes = codes[known]
+        n_matched = len(codes)
+
+        stock[codes] = pd.to_numeric(rows['stock'], errors='coerce').fillna(0).to_numpy(np.int64)
+        price[codes] = pd.to_numeric(rows['price'], errors='coerce').to_numpy(np.float32)
+        category_ids[codes] = pd.to_numeric(rows['category_id'], errors='coerce').fillna(-1).to_numpy(np.int64)
+
+        named = products[['category_id', 'category_name']].dropna().drop_duplicates('category_name')
+        category_names = dict(zip(named['category_name'].str.strip().str.lower(), named['category_id'].astype(np.int64)))
+
+    return ProductAttributes(
+        model_version=model.model_version,
+        stock=stock,
+        price=price,
+        category_ids=category_ids,
+        category_names=category_names,
+        refreshed_at=pd.Timestamp.now(),
+        n_matched=n_matched
+    )
+
+
+class ProductAttributeStore:
+    """
+    Periodically reloaded product attributes with per-model snapshots
+
+    The last product rows are kept (four numeric columns), so a model swap
+    only realigns them. The previous snapshot stays readable until the
+    next one is published, for requests still running on the old model.
+
+    Args:
+        loader: DatabaseLoader providing the products pool
+    """
+
+    def __init__(self, loader: DatabaseLoader):
+        self.loader = loader
+
+        # Refreshes are serialized; readers only take the snapshot references
+        self._refresh_lock = threading.Lock()
+        self._products = pd.DataFrame()
+        self.snapshot: Optional[ProductAttributes] = None
+        self._previous: Optional[ProductAttributes] = None
+
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.last_refresh_seconds = 0.0
+
+    def get(self, model) -> Optional[ProductAttributes]:
+        """Snapshot aligned to this model, None until one has been built"""
+        for snapshot in (self.snapshot, self._previous):
+            if snapshot is not None and snapshot.model_version == model.model_version:
+                return snapshot
+        return None
+
+    def _publish(self, model) -> ProductAttributes:
+        snapshot = align_attributes(self._products, model)
+        self._previous, self.snapshot = self.snapshot, snapshot
+        return snapshot
+
+    def refresh(self, model) -> Optional[ProductAttributes]:
+        """Reload the attributes from the database and realign them to the model"""
+        with self._refresh_lock:
+            start = time.perf_counter()
+            try:
+                products = self.loader.load_product_attributes()
+                if products.empty:
+                    # The loader logs and returns nothing on errors; keep serving the last rows
+                    self.refresh_failures += 1
+                    logger.warning("No product attributes loaded; keeping the previous ones")
+                else:
+                    self._products = products
+                    self.refreshes += 1
+                if model is None or self._products.empty:
+                    return self.snapshot
+                return self._publish(model)
+            finally:
+                self.last_refresh_seconds = time.perf_counter() - start
+
+    def align(self, model) -> Optional[ProductAttributes]:
+        """Realign the last loaded rows to a newly loaded model (no database access)"""
+        with self._refresh_lock:
+            if self._products.empty:
+                return None
+            snapshot = self._publish(model)
+            logger.info(f"Product attributes realigned to model {model.model_version}: {snapshot.n_matched} products")
+            return snapshot
+
+    def stats(self) -> Dict:
+        snapshot = self.snapshot
+        return {
+            'model_version': snapshot.model_version if snapshot is not None else None,
+            'refreshed_at': snapshot.version if snapshot is not None else None,
+            'products': len(self._products),
+            'matched_items': snapshot.n_matched if snapshot is not None else 0,
+            'in_stock_items': int((snapshot.stock > 0).sum()) if snapshot is not None else 0,
+            'categories': len(snapshot.category_names) if snapshot is not None else 0,
+            'refreshes': self.refreshes,
+            'refresh_failures': self.refresh_failures,
+            'last_refresh_ms': round(self.last_refresh_seconds * 1000, 3),
+        }
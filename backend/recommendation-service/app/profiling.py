@@ -0,0 +1,156 @@
+"""
+Per-request stage timing (Server-Timing) and an on-demand sampling profiler
+
+ServerTimingMiddleware gives each request a StageTimer through a context
+variable. Code on the hot path wraps its stages in `with stage('score'):`;
+outside a timed request the context manager only reads the context
+variable, so the model stays cheap to call from training and batch jobs.
+BoundedExecutor runs thread-pool jobs in a copy of the caller's context,
+so stages timed inside the scoring threads land in the same timer
+(process pools do not see it). The response carries one Server-Timing
+entry per stage plus request parsing, response serialization and total.
+
+sample_stacks() is a wall-clock sampler over sys._current_frames(): it
+records every thread's stack at a fixed interval and aggregates them as
+folded stacks ("thread;file:function;... count"), the input format of
+flamegraph.pl and speedscope.
+"""
+import contextvars
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class StageTimer:
+    """Accumulated seconds per stage for one request, in first-seen order"""
+
+    __slots__ = ('started_at', 'handler_started_at', 'handler_finished_at', 'durations')
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.handler_started_at: Optional[float] = None
+        self.handler_finished_at: Optional[float] = None
+        self.durations: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def header(self, now: float) -> str:
+        entries = dict(self.durations)
+        if self.handler_started_at is not None:
+            entries['parse'] = self.handler_started_at - self.started_at
+        if self.handler_finished_at is not None:
+            entries['serialize'] = now - self.handler_finished_at
+        entries['total'] = now - self.started_at
+        return ', '.join(f'{name};dur={seconds * 1000:.3f}' for name, seconds in entries.items())
+
+
+_timer: contextvars.ContextVar[Optional[StageTimer]] = contextvars.ContextVar('stage_timer', default=None)
+
+
+class stage:
+    """Time a block as a named stage of the current request (no-op outside one)"""
+
+    __slots__ = ('name', 'timer', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.timer = _timer.get()
+        if self.timer is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.timer is not None:
+            self.timer.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def mark_handler(started: bool):
+    """Record when the endpoint function starts or returns (see TimedRoute in app.main)"""
+    timer = _timer.get()
+    if timer is not None:
+        if started:
+            timer.handler_started_at = time.perf_counter()
+        else:
+            timer.handler_finished_at = time.perf_counter()
+
+
+def record(name: str, seconds: float):
+    """Add an externally measured duration (e.g. executor queue wait) to the current request"""
+    timer = _timer.get()
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding a Server-Timing header built from the request's StageTimer"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timer = StageTimer()
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', timer.header(time.perf_counter()).encode('latin-1')))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        token = _timer.set(timer)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _timer.reset(token)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).name}:{code.co_qualname}"
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Counter:
+    """
+    Sample the stacks of all other threads for `seconds`
+
+    Blocking: run it on a thread of its own (asyncio.to_thread). Each
+    sample costs one sys._current_frames() call and a walk of every stack
+    while holding the GIL, so keep the interval at a few milliseconds.
+
+    Returns:
+        Counter of folded stacks (root first, prefixed by the thread name)
+    """
+    own = threading.get_ident()
+    counts: Counter = Counter()
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, f'thread-{ident}'))
+            counts[';'.join(reversed(stack))] += 1
+        time.sleep(interval)
+
+    return counts
+
+
+def folded(counts: Counter) -> str:
+    """Render sampled stacks in the folded format (one 'stack count' per line)"""
+    return ''.join(f'{stack} {count}\n' for stack, count in counts.most_common())
@@ -20,12 +20,24 @@ class Settings(BaseSettings):
     DB_NAME_ORDERS: str = "shopai_orders"
     DB_NAME_PRODUCTS: str = "shopai_products"
     DB_NAME_USERS: str = "shopai_users"
+    DB_POOL_SIZE: int = 8  # Connections per database (>= DB_WORKERS avoids waiting on the pool)
+    DB_POOL_TIMEOUT_SECONDS: float = 5.0  # Wait for a free connection before failing
+    DB_POOL_HEALTH_CHECK_SECONDS: float = 30.0  # Ping connections idle for longer before reuse
+    DB_STATEMENT_TIMEOUT_SECONDS: float = 5.0  # Request-path queries (0 = no limit)
+    DB_BULK_STATEMENT_TIMEOUT_SECONDS: float = 0.0  # Training loads of whole tables (0 = no limit)
+    DB_EXTRACT_CHUNK_ROWS: int = 50000  # Rows per fetchmany / Parquet part in incremental extraction
+    INTERACTION_STORE_DIR: str = "data/interactions"  # Local store filled by incremental extraction
     
     # Model Configuration
-    MODEL_PATH: str = "models/recommender_model.joblib"
-    MODEL_FACTORS: int = 64  # Latent factors for ALS
-    MODEL_ITERATIONS: int = 30
-    MODEL_REGULARIZATION: float = 0.1
+    MODEL_PATH: str = "models/recommender_model"  # Artifact directory (legacy .joblib still loads)
+    MODEL_ALGORITHM: str = "svd"  # svd or als (implicit-feedback ALS)
+    MODEL_FACTORS: int = 64  # Latent factors for SVD / ALS
+    MODEL_ITERATIONS: int = 30  # SVD power iterations / ALS sweeps
+    MODEL_REGULARIZATION: float = 0.1  # ALS L2 penalty
+    MODEL_ALPHA: float = 40.0  # ALS confidence scaling: c = 1 + alpha * rating
+    MODEL_NEIGHBORS: int = 50  # Precomputed similar items per product (0 = disabled)
+    MODEL_ANN_LISTS: int = 0  # IVF lists for the ANN index (0 = ~4*sqrt(n_items))
+    MODEL_ANN_NPROBE: int = 8  # Default IVF lists scanned per ANN query
     
     # Dataset Configuration
     DATASET_DIR: str = "data/amazon"
@@ -35,6 +47,51 @@ class Settings(BaseSettings):
     # Recommendation Settings
     DEFAULT_NUM_RECOMMENDATIONS: int = 10
     COLD_START_POPULAR_COUNT: int = 20
+    BATCH_MAX_USERS: int = 5000  # Max user ids per batch recommendation request
+    
+    # Precomputed top-N per user (scripts/materialize_topn.py), served before online scoring
+    TOPN_ENABLED: bool = True
+    TOPN_PATH: str = "models/recommender_topn"
+    TOPN_SIZE: int = 50  # Recommendations stored per user (the /user limit maximum)
+    
+    # Request-time filters (in_stock, category, price range) on a columnar product attribute store
+    PRODUCT_FILTERS_ENABLED: bool = True
+    PRODUCT_ATTRIBUTES_REFRESH_SECONDS: float = 300.0  # Stock/price/category reload period
+    
+    # Recommendation cache (in-process LRU + optional shared second tier)
+    CACHE_ENABLED: bool = True
+    CACHE_MAX_ENTRIES: int = 10000
+    CACHE_TTL_SECONDS: float = 300.0
+    CACHE_BACKEND: str = "none"  # Second tier: none, memory or sqlite
+    CACHE_SQLITE_PATH: str = "data/recommendations_cache.db"
+    CACHE_BACKEND_TTL_SECONDS: float = 3600.0
+    CACHE_BACKEND_MAX_ROWS: int = 200000  # SQLite tier size cap, enforced by the purge task
+    CACHE_PURGE_SECONDS: float = 600.0  # Period of the second-tier expiry/size purge
+    
+    # Executors: scoring and DB calls run off the event loop on bounded pools
+    SCORING_POOL_KIND: str = "thread"  # thread (NumPy releases the GIL) or process
+    SCORING_WORKERS: int = min(8, os.cpu_count() or 1)
+    SCORING_QUEUE_SIZE: int = 64  # Jobs waiting beyond the workers; more get a 503
+    DB_WORKERS: int = 8
+    DB_QUEUE_SIZE: int = 64
+    EXECUTOR_RETRY_AFTER_SECONDS: int = 1
+    
+    # Order-based popularity lists (global / per category / per time window)
+    POPULARITY_ENABLED: bool = True
+    POPULARITY_TOP_N: int = 50  # Materialized list length (the /popular limit maximum)
+    POPULARITY_REFRESH_SECONDS: float = 60.0  # Incremental refresh period
+    POPULARITY_REBUILD_SECONDS: float = 86400.0  # Full rebuild period (drops later-cancelled orders)
+    
+    # Cache-Control max-age of /popular and /similar responses (ETag revalidation after)
+    HTTP_CACHE_MAX_AGE_SECONDS: int = 300
+    
+    # Prometheus text metrics at /metrics
+    METRICS_ENABLED: bool = True
+    
+    # Per-stage Server-Timing header; sampling profiler at /debug/profile (opt-in)
+    SERVER_TIMING_ENABLED: bool = True
+    PROFILER_ENABLED: bool = False
+    PROFILER_MAX_SECONDS: float = 30.0
     
     # CORS
     CORS_ORIGINS: list = [
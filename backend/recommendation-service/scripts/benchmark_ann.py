@@ -0,0 +1,101 @@
+"""
+Recall-vs-latency report for the IVF approximate nearest-neighbor index
+
+Compares IVFIndex.search against exact brute-force top-k for a range of
+nprobe values, either on a trained model or on synthetic clustered factors.
+
+Usage:
+    python scripts/benchmark_ann.py --items 400000
+    python scripts/benchmark_ann.py --model models/recommender_model
+    python scripts/benchmark_ann.py --items 1000000 --nprobe 1 4 16 64 --lists 4000
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models.ann import IVFIndex
+from app.models.topk import top_k
+
+
+def synthetic_factors(n_items: int, n_queries: int, n_factors: int, seed: int = 42):
+    """Normalized factors drawn around random cluster centers, like trained embeddings"""
+    rng = np.random.default_rng(seed)
+    n_clusters = max(1, n_items // 500)
+    centers = rng.standard_normal((n_clusters, n_factors)).astype(np.float32)
+
+    items = centers[rng.integers(0, n_clusters, n_items)] + 0.5 * rng.standard_normal((n_items, n_factors)).astype(np.float32)
+    queries = centers[rng.integers(0, n_clusters, n_queries)] + 0.5 * rng.standard_normal((n_queries, n_factors)).astype(np.float32)
+
+    items /= np.linalg.norm(items, axis=1, keepdims=True)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return items, queries
+
+
+def model_factors(path: str, n_queries: int, seed: int = 42):
+    from app.models.recommender import HybridRecommender
+
+    model = HybridRecommender.load(path)
+    rng = np.random.default_rng(seed)
+    users = rng.choice(model.user_factors.shape[0], min(n_queries, model.user_factors.shape[0]), replace=False)
+    return np.asarray(model.item_factors, dtype=np.float32), np.asarray(model.user_factors[users], dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF index recall vs latency report")
+    parser.add_argument('--model', type=str, default=None, help='Trained model to take factors from')
+    parser.add_argument('--items', type=int, default=200000, help='Synthetic catalog size')
+    parser.add_argument('--factors', type=int, default=64, help='Synthetic factor dimension')
+    parser.add_argument('--queries', type=int, default=200, help='Number of queries')
+    parser.add_argument('--k', type=int, default=10, help='Number of results per query')
+    parser.add_argument('--lists', type=int, default=None, help='IVF lists (default ~4*sqrt(n_items))')
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64],
+                        help='nprobe values to report')
+    args = parser.parse_args()
+
+    if args.model:
+        items, queries = model_factors(args.model, args.queries)
+    else:
+        items, queries = synthetic_factors(args.items, args.queries, args.factors)
+
+    print(f"Catalog: {items.shape[0]} items x {items.shape[1]} factors, {len(queries)} queries, k={args.k}")
+
+    start = time.perf_counter()
+    index = IVFIndex(n_lists=args.lists).build(items)
+    print(f"Index build: {time.perf_counter() - start:.2f}s ({index.n_lists} lists)\n")
+
+    exact_results = []
+    exact_timings = []
+    for query in queries:
+        start = time.perf_counter()
+        idx, _ = top_k(items @ query, args.k)
+        exact_timings.append(time.perf_counter() - start)
+        exact_results.append(set(idx.tolist()))
+    exact_ms = 1000 * float(np.median(exact_timings))
+
+    print(f"{'method':>12} {'recall@k':>10} {'p50_ms':>10} {'p95_ms':>10} {'speedup':>10}")
+    print(f"{'exact':>12} {1.0:>10.4f} {exact_ms:>10.3f} {1000 * np.percentile(exact_timings, 95):>10.3f} {1.0:>9.1f}x")
+
+    for nprobe in args.nprobe:
+        if nprobe > index.n_lists:
+            continue
+        timings = []
+        recalls = []
+        for query, expected in zip(queries, exact_results):
+            start = time.perf_counter()
+            idx, _ = index.search(query, args.k, nprobe=nprobe)
+            timings.append(time.perf_counter() - start)
+            recalls.append(len(expected & set(idx.tolist())) / max(len(expected), 1))
+
+        p50 = 1000 * float(np.median(timings))
+        label = f"nprobe={nprobe}"
+        print(f"{label:>12} {np.mean(recalls):>10.4f} {p50:>10.3f} {1000 * np.percentile(timings, 95):>10.3f} {exact_ms / p50:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
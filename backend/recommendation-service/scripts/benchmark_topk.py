@@ -0,0 +1,80 @@
+"""
+Benchmark top-k selection latency against catalog size
+
+Compares the previous per-item Python loop + full sort with the shared
+argpartition engine used by HybridRecommender.
+
+Usage:
+    python scripts/benchmark_topk.py
+    python scripts/benchmark_topk.py --sizes 1000 10000 400000 --factors 64 --k 10
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models.topk import top_k
+
+
+def legacy_top_k(user_vector, item_factors, user_items, k):
+    """Reference implementation: loop over all items and fully sort"""
+    scores = user_vector @ item_factors.T
+    item_scores = []
+    for item_idx in range(len(scores)):
+        if item_idx not in user_items:
+            item_scores.append((item_idx, scores[item_idx]))
+    item_scores.sort(key=lambda x: x[1], reverse=True)
+    return item_scores[:k]
+
+
+def engine_top_k(user_vector, item_factors, user_items, k):
+    scores = item_factors @ user_vector
+    return top_k(scores, k, exclude=user_items)
+
+
+def time_call(fn, repeats, *args):
+    """Median latency of fn(*args) in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark top-k recommendation selection")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 400000],
+                        help='Catalog sizes to benchmark')
+    parser.add_argument('--factors', type=int, default=64, help='Number of latent factors')
+    parser.add_argument('--k', type=int, default=10, help='Number of recommendations')
+    parser.add_argument('--history', type=int, default=50, help='Items already bought by the user')
+    parser.add_argument('--repeats', type=int, default=5, help='Repetitions per measurement')
+    parser.add_argument('--skip-legacy', action='store_true', help='Only benchmark the new engine')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+
+    print(f"{'n_items':>10} {'legacy_ms':>12} {'engine_ms':>12} {'speedup':>10}")
+    for n_items in args.sizes:
+        item_factors = rng.standard_normal((n_items, args.factors)).astype(np.float32)
+        user_vector = rng.standard_normal(args.factors).astype(np.float32)
+        history = rng.choice(n_items, size=min(args.history, n_items), replace=False)
+
+        engine_ms = time_call(engine_top_k, args.repeats, user_vector, item_factors, history, args.k)
+
+        if args.skip_legacy:
+            print(f"{n_items:>10} {'-':>12} {engine_ms:>12.3f} {'-':>10}")
+            continue
+
+        legacy_ms = time_call(legacy_top_k, args.repeats, user_vector, item_factors, set(history), args.k)
+        print(f"{n_items:>10} {legacy_ms:>12.3f} {engine_ms:>12.3f} {legacy_ms / engine_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,15 +7,20 @@ import sys
 import json
 import gzip
 import random
+import argparse
 import requests
 from pathlib import Path
 from datetime import datetime
 import mysql.connector
+import pandas as pd
 from mysql.connector import Error
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from app.data.downloader import ResumableDownloader
+from app.data.seeding import bulk_insert
+
 # Configuration
 MYSQL_CONFIG = {
     'host': 'localhost',
@@ -166,6 +171,18 @@ def ensure_data_dir():
     print(f"Data directory: {DATA_DIR}")
 
 
+def download_raw_dumps():
+    """Fetch the raw review/metadata dumps into DATA_DIR (resumable, size/hash verified)"""
+    downloader = ResumableDownloader()
+    paths = []
+    for category, urls in AMAZON_DATASETS.items():
+        for kind, url in urls.items():
+            path = downloader.download(url, DATA_DIR / f"{category}_{kind}.json.gz")
+            print(f"     {path.name}: {path.stat().st_size / (1024 * 1024):.1f} MB")
+            paths.append(path)
+    return paths
+
+
 def get_db_connection():
     """Get MySQL connection"""
     try:
@@ -217,16 +234,8 @@ def clear_existing_products(conn):
     print("Cleared existing products")
 
 
-def insert_amazon_products(conn, products):
-    """Insert Amazon products into database"""
-    cursor = conn.cursor()
-    
-    insert_query = """
-        INSERT INTO products 
-        (name, description, price, image, rating, reviews, badge, stock, category_id, seller_id, seller_name, created_at, updated_at)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-    """
-    
+def insert_amazon_products(conn, products, batch_rows=1000):
+    """Insert Amazon products into database in multi-row batches"""
     sellers = [
         (1, "TechStore Pro"),
         (2, "Fashion Elite"),
@@ -238,35 +247,36 @@ def insert_amazon_products(conn, products):
         (8, "AutoParts Plus"),
     ]
     
-    inserted = 0
+    now = datetime.now().replace(microsecond=0)
+    rows = []
     for product in products:
-        try:
-            # Assign seller based on category
-            cat_id = product.get('category_id', 1)
-            seller = sellers[min(cat_id - 1, len(sellers) - 1)]
-            
-            values = (
-                product['name'],
-                product['description'],
-                product['price'],
-                product['image'],
-                product.get('rating', round(random.uniform(4.0, 5.0), 1)),
-                product.get('reviews', random.randint(100, 10000)),
-                product.get('badge'),
-                product.get('stock', random.randint(10, 200)),
-                cat_id,
-                seller[0],
-                seller[1]
-            )
-            
-            cursor.execute(insert_query, values)
-            inserted += 1
-            
-        except Exception as e:
-            print(f"Error inserting product {product.get('name', 'unknown')}: {e}")
+        # Assign seller based on category
+        cat_id = product.get('category_id', 1)
+        seller = sellers[min(cat_id - 1, len(sellers) - 1)]
+        
+        rows.append({
+            'name': product['name'],
+            'description': product['description'],
+            'price': product['price'],
+            'image': product['image'],
+            'rating': product.get('rating', round(random.uniform(4.0, 5.0), 1)),
+            'reviews': product.get('reviews', random.randint(100, 10000)),
+            'badge': product.get('badge'),
+            'stock': product.get('stock', random.randint(10, 200)),
+            'category_id': cat_id,
+            'seller_id': seller[0],
+            'seller_name': seller[1],
+            'created_at': now,
+            'updated_at': now,
+        })
+    
+    if not rows:
+        return 0
     
-    conn.commit()
-    return inserted
+    # A failing batch is retried row by row, so one bad product only skips itself
+    report = bulk_insert(conn, 'products', [pd.DataFrame(rows)], batch_rows=batch_rows)
+    print(f"   {report}")
+    return report.rows
 
 
 def generate_user_interactions(conn, num_users=500, num_interactions=5000):
@@ -357,12 +367,21 @@ def generate_user_interactions(conn, num_users=500, num_interactions=5000):
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Amazon Product Dataset Installer for ShopAI")
+    parser.add_argument('--download-raw', action='store_true',
+                        help='Also download the raw Amazon review/metadata dumps into data/amazon')
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("  Amazon Product Dataset Installer for ShopAI")
     print("=" * 60)
     
     ensure_data_dir()
     
+    if args.download_raw:
+        print("\nDownloading raw Amazon dumps (resumable)...")
+        download_raw_dumps()
+    
     # Connect to database
     print("\nConnecting to MySQL...")
     conn = get_db_connection()
@@ -0,0 +1,47 @@
+"""
+Precompute the top-N recommendations of every user of a trained model
+
+Scores all users in blocked GEMMs across a process pool and writes a
+memory-mappable result (int32 item codes + float16 scores per user) that
+the API serves before falling back to online scoring. Run it after each
+training, then call POST /api/recommendations/refresh.
+
+Usage:
+    python scripts/materialize_topn.py
+    python scripts/materialize_topn.py --model models/recommender_model --output models/recommender_topn --top-n 50 --workers 4
+"""
+import sys
+import argparse
+from pathlib import Path
+
+from loguru import logger
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import settings
+from app.models.precomputed import materialize_top_n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialize top-N recommendations for every user")
+    parser.add_argument('--model', default=settings.MODEL_PATH, help='Trained model path')
+    parser.add_argument('--output', default=settings.TOPN_PATH, help='Result directory')
+    parser.add_argument('--top-n', type=int, default=settings.TOPN_SIZE, help='Recommendations stored per user')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: number of CPUs)')
+    parser.add_argument('--block-users', type=int, default=None,
+                        help='Users per GEMM block (default: ~16M scores per block)')
+    args = parser.parse_args()
+
+    manifest = materialize_top_n(
+        args.model,
+        args.output,
+        top_n=args.top_n,
+        n_jobs=args.workers,
+        block_size=args.block_users
+    )
+    logger.info(f"Done: model {manifest['model_version']}, {manifest['n_users']} users in {manifest['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -96,10 +96,13 @@ def main():
     
     # Step 6: Verify model exists
     print_header("Step 6: Verification")
-    model_path = os.path.join(script_dir, "models", "recommender_model.joblib")
-    if os.path.exists(model_path):
+    model_path = os.path.join(script_dir, "models", "recommender_model")
+    if os.path.exists(os.path.join(model_path, "manifest.json")):
+        model_size = sum(
+            os.path.getsize(os.path.join(model_path, name)) for name in os.listdir(model_path)
+        )
         print(f"✅ Model saved at: {model_path}")
-        print(f"   File size: {os.path.getsize(model_path) / 1024:.2f} KB")
+        print(f"   Artifact size: {model_size / 1024:.2f} KB")
     else:
         print("❌ Model file not found!")
     
@@ -120,8 +123,7 @@ Next steps:
 def init_db_auto():
     """Auto-initialize database without prompts"""
     import mysql.connector
-    import random
-    from datetime import datetime, timedelta
+    from app.data.seeding import INTERACTIONS_TABLE_DDL, seed_interactions
     
     MYSQL_CONFIG = {
         'host': os.getenv('MYSQL_HOST', 'localhost'),
@@ -130,57 +132,21 @@ def init_db_auto():
         'password': os.getenv('MYSQL_PASSWORD', ''),
     }
     
-    PRODUCT_IDS = list(range(1, 55))
-    
     try:
         conn = mysql.connector.connect(**MYSQL_CONFIG)
         cursor = conn.cursor()
         
         cursor.execute("CREATE DATABASE IF NOT EXISTS shopai_recommendations")
         cursor.execute("USE shopai_recommendations")
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS user_interactions (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT NOT NULL,
-                product_id INT NOT NULL,
-                interaction_type VARCHAR(20) NOT NULL,
-                rating FLOAT DEFAULT NULL,
-                quantity INT DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX idx_user_id (user_id),
-                INDEX idx_product_id (product_id)
-            )
-        """)
+        cursor.execute(INTERACTIONS_TABLE_DDL)
         
         cursor.execute("SELECT COUNT(*) FROM user_interactions")
         count = cursor.fetchone()[0]
         
         if count == 0:
             print("📊 Generating training data...")
-            interactions = []
-            
-            for user_id in range(1, 151):
-                num_interactions = random.randint(5, 25)
-                for _ in range(num_interactions):
-                    product_id = random.choice(PRODUCT_IDS)
-                    itype = random.choices(['view', 'add_to_cart', 'purchase', 'rating'], 
-                                          weights=[50, 25, 15, 10])[0]
-                    rating = round(random.uniform(3.0, 5.0), 1) if itype == 'rating' else None
-                    quantity = random.randint(1, 3) if itype == 'purchase' else 1
-                    days_ago = random.randint(0, 90)
-                    created_at = datetime.now() - timedelta(days=days_ago)
-                    
-                    interactions.append((user_id, product_id, itype, rating, quantity, created_at))
-            
-            cursor.executemany("""
-                INSERT INTO user_interactions 
-                (user_id, product_id, interaction_type, rating, quantity, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, interactions)
-            
-            conn.commit()
-            print(f"✅ Created {len(interactions)} user interactions")
+            report = seed_interactions(conn, num_users=150, max_per_user=25)
+            print(f"✅ Created {report.rows} user interactions ({report.rows_per_second:,.0f} rows/s)")
         else:
             print(f"✅ Database already has {count} interactions")
         
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Run from anywhere: the service root holds the `app` package and config.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
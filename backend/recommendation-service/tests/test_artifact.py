@@ -0,0 +1,59 @@
+"""Versioned artifact directories swapped behind a symlink"""
+import threading
+
+import numpy as np
+
+from app.models.artifact import load_artifact, save_artifact
+
+
+def save(path, value: int):
+    save_artifact(path, {'values': np.full(1000, value, dtype=np.int64)}, {'model_version': str(value)})
+
+
+def test_save_swaps_symlink_and_keeps_one_previous_version(tmp_path):
+    path = tmp_path / 'model'
+    for value in range(4):
+        save(path, value)
+
+    assert path.is_symlink()
+    arrays, manifest = load_artifact(path)
+    assert manifest['model_version'] == '3'
+    assert int(arrays['values'][0]) == 3
+    assert len(list(tmp_path.glob('.model.v*'))) == 2
+
+
+def test_legacy_directory_is_migrated(tmp_path):
+    path = tmp_path / 'model'
+    path.mkdir()
+    (path / 'manifest.json').write_text('{"arrays": {}}')
+
+    save(path, 1)
+    assert path.is_symlink()
+    assert load_artifact(path)[1]['model_version'] == '1'
+
+
+def test_concurrent_loads_never_miss_the_artifact(tmp_path):
+    path = tmp_path / 'model'
+    save(path, 0)
+    errors = []
+    stop = threading.Event()
+
+    def read():
+        while not stop.is_set():
+            try:
+                assert path.exists()
+                arrays, manifest = load_artifact(path)
+                assert int(arrays['values'][-1]) == int(manifest['model_version'])
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for value in range(1, 30):
+        save(path, value)
+    stop.set()
+    for reader in readers:
+        reader.join()
+
+    assert errors == []
@@ -0,0 +1,80 @@
+"""ConnectionPool against the SQLite stand-in"""
+import threading
+import time
+
+import pytest
+
+from app.data.db_pool import PoolTimeout, sqlite_pool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = sqlite_pool(str(tmp_path / 'shop.db'), max_size=2, acquire_timeout=0.2)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, price REAL)")
+        conn.executemany(
+            "INSERT INTO products (id, name, price) VALUES (?, ?, ?)",
+            [(1, 'Laptop', 999.0), (2, 'Mouse', 19.5), (3, '100% cotton shirt', 25.0)]
+        )
+    yield pool
+    pool.close()
+
+
+def test_parameterized_query(pool):
+    df = pool.query("SELECT id, name FROM products WHERE price < %(max_price)s ORDER BY id", {'max_price': 100})
+    assert df['id'].tolist() == [2, 3]
+
+    # Values are bound, never spliced into the SQL text
+    df = pool.query("SELECT id FROM products WHERE name = %(name)s", {'name': "Mouse' OR '1'='1"})
+    assert df.empty
+
+
+def test_literal_percent_is_unescaped_for_sqlite(pool):
+    df = pool.query("SELECT id FROM products WHERE name = '100%% cotton shirt' AND id = %(id)s", {'id': 3})
+    assert df['id'].tolist() == [3]
+
+
+def test_stream_yields_chunks(pool):
+    chunks = list(pool.stream("SELECT id FROM products ORDER BY id", chunk_size=2))
+    assert [chunk['id'].tolist() for chunk in chunks] == [[1, 2], [3]]
+
+
+def test_acquire_times_out_when_the_pool_is_exhausted(pool):
+    with pool.connection(), pool.connection():
+        start = time.monotonic()
+        with pytest.raises(PoolTimeout):
+            pool.query("SELECT 1")
+        assert time.monotonic() - start >= pool.acquire_timeout
+
+    stats = pool.stats()
+    assert stats['acquire_timeouts'] == 1
+    assert stats['open'] <= pool.max_size
+    assert stats['in_use'] == 0
+
+
+def test_waiter_gets_a_released_connection(pool):
+    pool.acquire_timeout = 2.0
+    held = threading.Event()
+
+    def hold():
+        with pool.connection(), pool.connection():
+            held.set()
+            time.sleep(0.1)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait()
+    assert pool.query("SELECT 1 AS one")['one'].tolist() == [1]
+    holder.join()
+
+    stats = pool.stats()
+    assert stats['connections_opened'] == 2
+    assert stats['acquire_timeouts'] == 0
+
+
+def test_connection_that_raised_is_discarded(pool):
+    with pytest.raises(ZeroDivisionError):
+        with pool.connection():
+            1 / 0
+    assert pool.stats()['connections_discarded'] == 1
+    assert pool.query("SELECT COUNT(*) AS n FROM products")['n'].tolist() == [3]
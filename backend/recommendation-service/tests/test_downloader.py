@@ -0,0 +1,122 @@
+"""ResumableDownloader against a local HTTP server"""
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.data.downloader import MANIFEST_FILE, DownloadError, ResumableDownloader
+
+PAYLOAD = os.urandom(10_000)
+PART_SIZE = 1_000
+
+
+class FileServer:
+    """Serves PAYLOAD at /data.bin, optionally ignoring Range or failing some ranges"""
+
+    def __init__(self, honor_ranges: bool = True):
+        self.honor_ranges = honor_ranges
+        self.fail_from = None  # Range requests starting at or after this offset get 500
+        self.ranges = []
+        self.full_gets = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _headers(self, status: int, length: int):
+                self.send_response(status)
+                self.send_header('Content-Length', str(length))
+                self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('ETag', '"v1"')
+                self.end_headers()
+
+            def do_HEAD(self):
+                self._headers(200, len(PAYLOAD))
+
+            def do_GET(self):
+                range_header = self.headers.get('Range')
+                if range_header is None or not server.honor_ranges:
+                    server.full_gets += 1
+                    self._headers(200, len(PAYLOAD))
+                    self.wfile.write(PAYLOAD)
+                    return
+                start, stop = (int(v) for v in range_header.split('=')[1].split('-'))
+                if server.fail_from is not None and start >= server.fail_from:
+                    self._headers(500, 0)
+                    return
+                server.ranges.append(start)
+                self._headers(206, stop - start + 1)
+                self.wfile.write(PAYLOAD[start:stop + 1])
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/data.bin'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_downloader() -> ResumableDownloader:
+    return ResumableDownloader(n_connections=2, part_size=PART_SIZE, timeout=5.0, retries=1)
+
+
+def test_resumes_after_interrupted_range_download(tmp_path):
+    dest = tmp_path / 'data.bin'
+    with FileServer() as server:
+        server.fail_from = 4 * PART_SIZE
+        with pytest.raises(DownloadError):
+            make_downloader().download(server.url, str(dest))
+
+        state = json.loads((tmp_path / 'data.bin.part.json').read_text())
+        assert sorted(state['done']) == [0, 1, 2, 3]
+        assert not dest.exists()
+
+        server.fail_from = None
+        server.ranges.clear()
+        make_downloader().download(server.url, str(dest))
+
+        # Only the missing ranges were fetched the second time
+        assert sorted(server.ranges) == [i * PART_SIZE for i in range(4, 10)]
+    assert dest.read_bytes() == PAYLOAD
+    assert not (tmp_path / 'data.bin.part').exists()
+    assert not (tmp_path / 'data.bin.part.json').exists()
+    manifest = json.loads((tmp_path / MANIFEST_FILE).read_text())
+    assert manifest['data.bin']['sha256'] == hashlib.sha256(PAYLOAD).hexdigest()
+
+
+def test_server_ignoring_range_falls_back_to_a_single_get(tmp_path):
+    dest = tmp_path / 'data.bin'
+    with FileServer(honor_ranges=False) as server:
+        make_downloader().download(server.url, str(dest))
+        assert server.full_gets >= 1
+    assert dest.read_bytes() == PAYLOAD
+    assert not (tmp_path / 'data.bin.part.json').exists()
+
+
+def test_sha256_mismatch_deletes_the_partial_file(tmp_path):
+    dest = tmp_path / 'data.bin'
+    with FileServer() as server:
+        with pytest.raises(DownloadError, match='SHA-256 mismatch'):
+            make_downloader().download(server.url, str(dest), expected_sha256='0' * 64)
+    assert not dest.exists()
+    assert not (tmp_path / 'data.bin.part').exists()
+    assert not (tmp_path / 'data.bin.part.json').exists()
+    assert not (tmp_path / MANIFEST_FILE).exists()
+
+
+def test_verified_file_is_not_downloaded_again(tmp_path):
+    dest = tmp_path / 'data.bin'
+    with FileServer() as server:
+        make_downloader().download(server.url, str(dest))
+        server.ranges.clear()
+        make_downloader().download(server.url, str(dest), verify_hash=True)
+        assert server.ranges == []
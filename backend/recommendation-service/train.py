@@ -18,10 +18,10 @@ Usage:
 import os
 import sys
 import argparse
+from contextlib import nullcontext
 from pathlib import Path
 from datetime import datetime
 
-import numpy as np
 import pandas as pd
 from loguru import logger
 
@@ -31,7 +31,10 @@ sys.path.insert(0, str(Path(__file__).parent))
 from config import settings
 from app.data.amazon_dataset import AmazonDatasetLoader
 from app.data.database import DatabaseLoader
+from app.data.incremental import InteractionStore, IncrementalExtractor
 from app.models.recommender import HybridRecommender
+from app.models.evaluation import evaluate_model
+from app.models.training_report import TrainingProfiler
 
 
 def setup_logging():
@@ -53,7 +56,8 @@ def load_amazon_data(category: str = "electronics", max_reviews: int = 50000) ->
     try:
         interactions_df, _ = loader.load_or_generate_data(
             use_amazon=True, 
-            category=category
+            category=category,
+            max_reviews=max_reviews
         )
         return interactions_df
     except Exception as e:
@@ -108,53 +112,15 @@ def merge_datasets(amazon_df: pd.DataFrame, db_df: pd.DataFrame) -> pd.DataFrame
     return merged
 
 
-def evaluate_model(model: HybridRecommender, test_df: pd.DataFrame, k: int = 10) -> dict:
-    """
-    Evaluate model using precision@k and recall@k
-    """
-    logger.info(f"Evaluating model with k={k}...")
-    
-    # Get unique users in test set
-    test_users = test_df['user_id'].unique()
-    
-    precisions = []
-    recalls = []
-    
-    for user_id in test_users[:100]:  # Sample 100 users for speed
-        # Get actual products the user interacted with
-        actual_products = set(test_df[test_df['user_id'] == user_id]['product_id'])
-        
-        # Get recommendations
-        try:
-            recs = model.recommend_for_user(user_id, n_recommendations=k, filter_already_bought=False)
-            recommended_products = set(r['product_id'] for r in recs)
-            
-            # Calculate metrics
-            hits = len(actual_products & recommended_products)
-            precision = hits / k if k > 0 else 0
-            recall = hits / len(actual_products) if len(actual_products) > 0 else 0
-            
-            precisions.append(precision)
-            recalls.append(recall)
-        except:
-            continue
-    
-    metrics = {
-        'precision@k': np.mean(precisions) if precisions else 0,
-        'recall@k': np.mean(recalls) if recalls else 0,
-        'n_users_evaluated': len(precisions)
-    }
-    
-    logger.info(f"Evaluation results: Precision@{k}={metrics['precision@k']:.4f}, Recall@{k}={metrics['recall@k']:.4f}")
-    
-    return metrics
-
-
 def train_model(
     interactions_df: pd.DataFrame,
     products_df: pd.DataFrame = None,
     n_factors: int = 64,
-    n_iterations: int = 30
+    n_iterations: int = 30,
+    n_neighbors: int = 50,
+    build_ann: bool = False,
+    algorithm: str = "svd",
+    profiler: TrainingProfiler = None
 ) -> HybridRecommender:
     """Train the recommendation model"""
     logger.info(f"Training model with {len(interactions_df)} interactions...")
@@ -162,20 +128,42 @@ def train_model(
     model = HybridRecommender(
         n_factors=n_factors,
         n_iterations=n_iterations,
-        regularization=settings.MODEL_REGULARIZATION
+        regularization=settings.MODEL_REGULARIZATION,
+        n_neighbors=n_neighbors,
+        algorithm=algorithm,
+        alpha=settings.MODEL_ALPHA
     )
     
-    model.fit(interactions_df, products_df)
+    model.fit(interactions_df, products_df, build_neighbors=n_neighbors > 0, profiler=profiler)
+    
+    if build_ann:
+        with profiler.stage('build_ann_index') if profiler is not None else nullcontext():
+            model.build_ann_index(
+                n_lists=settings.MODEL_ANN_LISTS or None,
+                nprobe=settings.MODEL_ANN_NPROBE
+            )
     
     return model
 
 
-def load_mysql_data() -> pd.DataFrame:
-    """Load training data directly from MySQL database"""
+def load_mysql_data(incremental: bool = False) -> pd.DataFrame:
+    """
+    Load training data directly from MySQL database
+    
+    With incremental=True only rows newer than the stored watermarks are
+    fetched and appended to the local interaction store, which is then read.
+    """
     loader = DatabaseLoader()
     
-    # First try to load from user_interactions table
-    interactions_df = loader.load_all_interactions()
+    if incremental:
+        store = InteractionStore(settings.INTERACTION_STORE_DIR)
+        extractor = IncrementalExtractor(loader, store, chunk_size=settings.DB_EXTRACT_CHUNK_ROWS)
+        extractor.extract_all()
+        interactions_df = extractor.load_interactions()
+    else:
+        # First try to load from user_interactions table
+        interactions_df = loader.load_all_interactions()
+    loader.close()
     
     if interactions_df.empty:
         logger.warning("No data in MySQL, generating synthetic data...")
@@ -193,12 +181,22 @@ def main():
     parser = argparse.ArgumentParser(description="Train ShopAI Recommendation Model")
     parser.add_argument('--synthetic', action='store_true', help='Use synthetic data only')
     parser.add_argument('--mysql', action='store_true', help='Use MySQL database data')
+    parser.add_argument('--incremental', action='store_true',
+                        help='With --mysql: fetch only new rows into the local interaction store')
     parser.add_argument('--include-db', action='store_true', help='Include real database orders')
     parser.add_argument('--evaluate', action='store_true', help='Run evaluation after training')
     parser.add_argument('--category', type=str, default='electronics', help='Amazon category to use')
     parser.add_argument('--factors', type=int, default=64, help='Number of latent factors')
-    parser.add_argument('--iterations', type=int, default=30, help='Number of ALS iterations')
+    parser.add_argument('--iterations', type=int, default=settings.MODEL_ITERATIONS,
+                        help='SVD power iterations / ALS sweeps')
+    parser.add_argument('--algorithm', choices=HybridRecommender.ALGORITHMS, default=settings.MODEL_ALGORITHM,
+                        help='Collaborative filtering trainer (als = implicit-feedback ALS)')
+    parser.add_argument('--neighbors', type=int, default=settings.MODEL_NEIGHBORS,
+                        help='Precomputed similar items per product (0 to disable)')
+    parser.add_argument('--ann', action='store_true', help='Build the IVF approximate nearest-neighbor index')
     parser.add_argument('--output', type=str, default=None, help='Output model path')
+    parser.add_argument('--no-tracemalloc', action='store_true',
+                        help='Skip per-stage allocation tracing in the training report (faster)')
     
     args = parser.parse_args()
     
@@ -207,21 +205,26 @@ def main():
     logger.info("ShopAI Recommendation Model Training Pipeline")
     logger.info("=" * 60)
     
+    profiler = TrainingProfiler(trace_allocations=not args.no_tracemalloc)
+    
     # 1. Load data
     logger.info("\n📊 Step 1: Loading data...")
     
-    if args.mysql:
-        logger.info("Loading data from MySQL database...")
-        interactions_df = load_mysql_data()
-    elif args.synthetic:
-        interactions_df = load_synthetic_data()
-    else:
-        interactions_df = load_amazon_data(category=args.category)
+    with profiler.stage('load_data'):
+        if args.mysql:
+            logger.info("Loading data from MySQL database...")
+            interactions_df = load_mysql_data(incremental=args.incremental)
+        elif args.synthetic:
+            interactions_df = load_synthetic_data()
+        else:
+            interactions_df = load_amazon_data(category=args.category)
+        
+        # Optionally merge with database data
+        if args.include_db and not args.mysql:
+            db_df = load_database_data()
+            interactions_df = merge_datasets(interactions_df, db_df)
     
-    # Optionally merge with database data
-    if args.include_db and not args.mysql:
-        db_df = load_database_data()
-        interactions_df = merge_datasets(interactions_df, db_df)
+    profiler.record_dataset(interactions_df)
     
     logger.info(f"Dataset statistics:")
     logger.info(f"  - Total interactions: {len(interactions_df)}")
@@ -249,27 +252,42 @@ def main():
     model = train_model(
         train_df,
         n_factors=args.factors,
-        n_iterations=args.iterations
+        n_iterations=args.iterations,
+        n_neighbors=args.neighbors,
+        build_ann=args.ann,
+        algorithm=args.algorithm,
+        profiler=profiler
     )
+    profiler.record_model(model)
     
     logger.info(f"Model stats: {model.get_stats()}")
     
     # 4. Evaluate
     if args.evaluate and test_df is not None:
         logger.info("\n📈 Step 3: Evaluating model...")
-        metrics = evaluate_model(model, test_df, k=10)
+        with profiler.stage('evaluate'):
+            metrics = evaluate_model(model, test_df, k=10)
         logger.info(f"Final metrics: {metrics}")
     
     # 5. Save model
     output_path = args.output or settings.MODEL_PATH
     logger.info(f"\n💾 Step 4: Saving model to {output_path}...")
     
-    model.save(output_path)
+    with profiler.stage('save'):
+        model.save(output_path)
+    
+    saved_path = HybridRecommender.resolve_path(output_path)
+    profiler.record_artifact(saved_path)
+    profiler.write(
+        saved_path,
+        history_path=Path("logs") / "training_history.jsonl",
+        arguments=vars(args)
+    )
     
     # 6. Quick test
     logger.info("\n🧪 Step 5: Quick recommendation test...")
     
-    test_user = list(model.user_id_map.keys())[0]
+    test_user = model.idx_to_user[0]
     recs = model.recommend_for_user(test_user, n_recommendations=5)
     
     logger.info(f"Sample recommendations for user '{test_user}':")
@@ -98,7 +98,7 @@ def main():
     model = HybridRecommender(n_factors=32, n_iterations=20)
     model.fit(interactions_df, products_df)
     
-    model_path = "models/recommender_model.joblib"
+    model_path = "models/recommender_model"
     model.save(model_path)
     print(f"\nModel saved to: {model_path}")
     
@@ -106,7 +106,7 @@ def main():
     print("  Testing Recommendations")
     print("=" * 60)
     
-    test_user = list(model.user_id_map.keys())[0]
+    test_user = model.idx_to_user[0]
     user_recs = model.recommend_for_user(test_user, n_recommendations=5)
     
     print(f"\nTop 5 recommendations for user {test_user}:")
@@ -120,7 +120,7 @@ def main():
         print(f"  {i}. Product ID: {rec['product_id']}, Score: {rec['score']:.4f}")
     
     # Test similar products
-    test_product = list(model.product_id_map.keys())[0]
+    test_product = model.idx_to_product[0]
     similar = model.recommend_similar_products(test_product, n_recommendations=3)
     
     print(f"\nProducts similar to product {test_product}:")